@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+PostToolUse hook for Bash commands.
+Runs AFTER a Bash command Claude Code was allowed to execute.
+
+If the PreToolUse hooks asked about this exact call earlier in the session,
+it ran because the user approved it: the approval is learned for the
+project (see safety_hooks/approvals.py). Does nothing unless "approvals"
+is enabled in config.json.
+
+Output:
+  Exit 0 always; this hook never changes the outcome
+"""
+from safety_hooks.approvals import confirm, get_approval_config
+from safety_hooks.hook_utils import output_allow, parse_input
+
+
+def main():
+    config = get_approval_config()
+    if config["enabled"]:
+        hook_input = parse_input(("command",))
+        if hook_input:
+            confirm(hook_input.tool_name, hook_input.tool_input, hook_input.cwd, hook_input.session_id, config)
+    output_allow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+PreToolUse hook for the WebFetch tool.
+Checks the host a fetch goes to against the egress rules in config.json.
+The rules live in safety_hooks/egress_policy.py, shared with the Bash
+hook's checks of curl, wget, ssh and git remotes.
+
+Output:
+  Exit 0 = allow
+  Exit 2 = block
+  JSON with "decision": "ask" = prompt user for confirmation
+"""
+from safety_hooks.engine import check
+from safety_hooks.hook_utils import (
+    DeadlineExceeded,
+    start_deadline,
+    output_deadline_exceeded,
+    parse_input,
+    output_allow,
+    output_block,
+    output_ask,
+)
+
+
+def main():
+    deadline = start_deadline()
+    try:
+        hook_input = parse_input(("url",))
+        deadline.check("input parsing")
+        if not hook_input:
+            output_allow()
+
+        decision, message, _ = check("egress", hook_input.tool_name, hook_input.tool_input,
+                                     hook_input.cwd, deadline, hook_input.session_id, shadow=True)
+    except DeadlineExceeded as exc:
+        output_deadline_exceeded(deadline, exc)
+
+    if decision == "block":
+        output_block(message)
+    elif decision == "ask":
+        output_ask(f"Safety check: {message}")
+
+    output_allow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Zero-import fast path for trivially safe Bash commands.
+
+Runs at the top of a hook, before json, re or any rule table is imported
+(io, os and sys are loaded by the interpreter anyway). The command string
+is located in the raw stdin bytes. If it is one plain command - a small
+character set, no quotes, expansions, redirections or separators, nothing
+that runs nested code or writes files - and contains none of the policy's keywords, no
+rule can match it and the hook exits with allow. Otherwise stdin is
+replayed unchanged and the hook continues with its full checks.
+
+Keywords are read from the sidecar that policy_table writes next to a
+compiled table, so patterns added in config.json are honoured; a missing
+or stale sidecar disables the fast path until the full path rebuilds it.
+"""
+import io
+import os
+import sys
+
+# Larger inputs go straight to the full path
+MAX_INPUT_BYTES = 64 * 1024
+
+# Bytes allowed in a plain command: no quoting, expansion or shell syntax
+PLAIN_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -_./=:,+@%*")
+
+# Programs that run one of their arguments as code (see safety_hooks/bash_policy.py)
+NESTING_PROGRAMS = frozenset({b"sh", b"bash", b"zsh", b"dash", b"ksh", b"mksh", b"ash", b"fish",
+                              b"eval", b"xargs", b"find"})
+INTERPRETER_PREFIXES = (b"python", b"node", b"perl", b"ruby", b"php")
+
+# Programs whose operands go through the path policy (see safety_hooks/bash_policy.py)
+WRITING_PROGRAMS = frozenset({b"tee", b"touch", b"truncate", b"rm", b"rmdir", b"unlink", b"shred",
+                              b"cp", b"mv", b"ln", b"install", b"rsync", b"scp",
+                              b"chmod", b"chown", b"chgrp", b"sed", b"dd"})
+
+# Where compiled tables live; must match policy_table.cache_dir()
+CACHE_DIR_ENV = "SAFETY_HOOKS_CACHE_DIR"
+
+# Package holding the policy modules, next to this file; tables are keyed by its path
+POLICY_PACKAGE = "safety_hooks"
+SIDECAR_SUFFIX = ".keywords"
+
+# Leading field of a sidecar fingerprint; must match policy_table.FORMAT_VERSION
+FINGERPRINT_VERSION = "v2"
+
+
+def read_command(data: bytes) -> bytes | None:
+    """
+    Return the raw "command" string value from hook input JSON, or None
+    unless it occurs exactly once and contains no escape sequences.
+    """
+    key = b'"command"'
+    start = data.find(key)
+    if start < 0 or data.find(key, start + 1) >= 0:
+        return None
+    i = start + len(key)
+    while i < len(data) and data[i] in b" \t\r\n":
+        i += 1
+    if data[i:i + 1] != b":":
+        return None
+    i += 1
+    while i < len(data) and data[i] in b" \t\r\n":
+        i += 1
+    if data[i:i + 1] != b'"':
+        return None
+    end = data.find(b'"', i + 1)
+    if end < 0:
+        return None
+    command = data[i + 1:end]
+    return None if b"\\" in command else command
+
+
+def is_plain(command: bytes) -> bool:
+    """True if command is one simple command that canonicalizes to a subset of its own words."""
+    if not command or not PLAIN_BYTES.issuperset(command):
+        return False
+    if command[:1] == b" " or command[-1:] == b" " or b"  " in command:
+        return False
+    for word in command.split(b" "):
+        name = word.rsplit(b"/", 1)[-1]
+        if name in NESTING_PROGRAMS or name in WRITING_PROGRAMS or name.startswith(INTERPRETER_PREFIXES):
+            return False
+    return True
+
+
+def sidecar_path(name: str, package_dir: str) -> str:
+    """Path of a policy's keyword sidecar; must match policy_table.table_path()."""
+    import zlib
+
+    base = os.environ.get(CACHE_DIR_ENV)
+    if not base:
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        base = os.path.join(cache, "safety-hooks")
+    key = zlib.crc32(package_dir.encode("utf-8"))
+    return os.path.join(base, f"{name}-{key:08x}{SIDECAR_SUFFIX}")
+
+
+def _is_fresh(fingerprint: str) -> bool:
+    """Check a policy_table.source_fingerprint() string against the files it names."""
+    version, *sources = fingerprint.split("|")
+    if version != FINGERPRINT_VERSION or not sources:
+        return False
+    for source in sources:
+        if source.endswith(":missing"):
+            if os.path.exists(source[:-len(":missing")]):
+                return False
+            continue
+        parts = source.rsplit(":", 2)
+        if len(parts) != 3:
+            return False
+        path, size, mtime = parts
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if size != str(st.st_size) or mtime != str(st.st_mtime_ns):
+            return False
+    return True
+
+
+def load_keywords(name: str, package_dir: str) -> list[bytes] | None:
+    """Return the policy's keywords from a fresh sidecar, or None."""
+    try:
+        with open(sidecar_path(name, package_dir), "rb") as f:
+            fingerprint, *keywords = f.read().decode("utf-8").split("\n")
+    except (OSError, UnicodeDecodeError, ValueError):
+        return None
+    if not _is_fresh(fingerprint) or "" in keywords:
+        # "" is the keyword of rules that can match anything
+        return None
+    return [keyword.encode("utf-8") for keyword in keywords]
+
+
+def is_trivially_safe(command: bytes, keywords: list[bytes]) -> bool:
+    """True if command is plain and contains none of the keywords (case-insensitively)."""
+    if not is_plain(command):
+        return False
+    lowered = command.lower()
+    return not any(keyword in lowered for keyword in keywords)
+
+
+class _Replay(io.RawIOBase):
+    """Raw stream that yields already-read bytes, then the rest of the original stream."""
+
+    def __init__(self, prefix: bytes, rest):
+        self.prefix = memoryview(prefix)
+        self.rest = rest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        if self.prefix:
+            n = min(len(buf), len(self.prefix))
+            buf[:n] = self.prefix[:n]
+            self.prefix = self.prefix[n:]
+            return n
+        data = self.rest.read1(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+
+def allow_trivially_safe(policy: str | None = None, words: tuple[bytes, ...] = ()) -> None:
+    """
+    Exit with allow if the Bash command in stdin is trivially safe: plain,
+    and free of the given words and of the named policy's keywords.
+    Otherwise put stdin back for the full path and return.
+    """
+    stream = sys.stdin.buffer
+    data = stream.read(MAX_INPUT_BYTES + 1)
+    if len(data) <= MAX_INPUT_BYTES:
+        command = read_command(data)
+        if command is not None:
+            keywords = list(words)
+            if policy is not None:
+                package_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), POLICY_PACKAGE)
+                policy_keywords = load_keywords(policy, package_dir)
+                keywords = None if policy_keywords is None else keywords + policy_keywords
+            if keywords is not None and is_trivially_safe(command, keywords):
+                sys.exit(0)
+    sys.stdin = io.TextIOWrapper(io.BufferedReader(_Replay(data, stream)), encoding="utf-8")
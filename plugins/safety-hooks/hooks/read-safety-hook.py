@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+PreToolUse hook for Read/Grep/Glob tools.
+Asks before credentials are read into context. The rules live in
+safety_hooks/read_policy.py, which reuses the credential rules guarding
+writes and classifies Grep/Glob patterns without touching the filesystem.
+
+Output:
+  Exit 0 = allow
+  Exit 2 = block (a burst of asks in one session)
+  JSON with "decision": "ask" = prompt user for confirmation
+"""
+from safety_hooks.engine import check
+from safety_hooks.hook_utils import (
+    DeadlineExceeded,
+    start_deadline,
+    output_deadline_exceeded,
+    parse_input,
+    output_allow,
+    output_block,
+    output_ask,
+)
+
+# What each tool does with the paths it reaches, for the prompt
+READ_VERBS = {"Read": "reading", "Grep": "searching", "Glob": "listing"}
+
+
+def main():
+    deadline = start_deadline()
+    try:
+        hook_input = parse_input(("file_path", "path", "pattern", "glob"))
+        deadline.check("input parsing")
+        if not hook_input:
+            output_allow()
+
+        decision, message, _ = check("read", hook_input.tool_name, hook_input.tool_input,
+                                     hook_input.cwd, deadline, hook_input.session_id, shadow=True)
+    except DeadlineExceeded as exc:
+        output_deadline_exceeded(deadline, exc)
+
+    if decision == "block":
+        output_block(f"{READ_VERBS[hook_input.tool_name].capitalize()} {message}")
+    elif decision == "ask":
+        output_ask(f"Safety check: {READ_VERBS[hook_input.tool_name]} {message}")
+
+    output_allow()
+
+
+if __name__ == "__main__":
+    main()
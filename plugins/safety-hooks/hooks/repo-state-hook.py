@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+PostToolUse hook for Bash commands.
+Runs AFTER a Bash command Claude Code was allowed to execute.
+
+After a git command that may move HEAD (checkout, switch, commit, branch,
+worktree, ...), reads the session directory's branch again and refreshes
+the repo state cache, so the next branch protection check is served from
+it instead of running git (see safety_hooks/repo_state.py).
+
+Plain commands that don't mention git exit before anything is imported.
+
+Output:
+  Exit 0 always; this hook never changes the outcome
+"""
+import fast_path
+
+if __name__ == "__main__":
+    fast_path.allow_trivially_safe(words=(b"git",))
+
+from safety_hooks.git_policy import get_current_branch  # noqa: E402
+from safety_hooks.hook_utils import DeadlineExceeded, output_allow, parse_input, start_deadline  # noqa: E402
+from safety_hooks.repo_state import changes_head, get_repo_state_config  # noqa: E402
+
+
+def main():
+    deadline = start_deadline()
+    if get_repo_state_config()["enabled"]:
+        hook_input = parse_input(("command",))
+        command = hook_input.tool_input.get("command", "") if hook_input else ""
+        if hook_input and hook_input.cwd and isinstance(command, str) and changes_head(command):
+            try:
+                get_current_branch(deadline, hook_input.cwd, cached=False)
+            except DeadlineExceeded:
+                pass
+    output_allow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Safety policy engine behind the hook scripts, importable in-process.
+
+    from safety_hooks import evaluate
+    evaluate("Write", {"file_path": "/etc/hosts", "content": ""}).tier  # "block"
+
+Names are resolved lazily so hook scripts importing one policy module
+don't load the others.
+"""
+
+__all__ = ["Decision", "Deadline", "Verdict", "check", "evaluate"]
+
+
+def __getattr__(name: str):
+    if name in ("Decision", "check", "evaluate"):
+        from . import engine
+        return getattr(engine, name)
+    if name in ("Deadline", "Verdict"):
+        from . import hook_utils
+        return getattr(hook_utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
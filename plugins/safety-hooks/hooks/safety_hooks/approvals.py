@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Learned approvals: ask once per project for the same command.
+
+Opt-in ("approvals" in config.json). When a Bash call gets an ask verdict
+from a rule, the PreToolUse hook notes it as pending for the session. If
+the user approves, the call runs and the PostToolUse hook
+(approval-learning-hook.py) finds the pending note and learns the
+approval: the exact normalized command, within its project (the enclosing
+git worktree, else the cwd).
+Later identical calls in that project get a warning instead of a prompt
+until the approval expires.
+
+Only rule asks are learned and relaxed. Blocks are never consulted, nor
+deadline fail-safes, nor asks that depend on more than the command and
+its project (CONTEXT_RULES: the branch a commit or push lands on, what a
+hard reset or rm -r would discard); and a relaxed call is still counted
+as a warning by burst_counter, so a runaway loop of approved commands
+asks again.
+
+Approvals and pending notes are 64-bit hashes in one memory-mapped open
+addressing table shared by all hook processes: a lookup probes at most
+PROBES slots whatever the number of entries. The table holds max_entries
+slots; when every probed slot is live, the one expiring soonest is evicted.
+
+Layout (little-endian):
+  header    magic, version, slot count
+  slots     key hash (u64), expires (u32 epoch seconds), learned (u32)
+"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: approvals are best-effort without a lock
+    fcntl = None
+
+from .hook_utils import DEADLINE_RULE, Verdict, load_config, normalize_command
+from .policy_table import cache_dir
+
+MAGIC = b"SHAP"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHI")
+SLOT = struct.Struct("<QII")
+PROBES = 8
+
+STORE_NAME = "approvals.set"
+
+# Rule ID prefixes whose asks depend on state outside the command (the
+# current branch, the worktree, the filesystem): never learned
+CONTEXT_RULES = ("git.commit", "git.push", "git.merge", "bash.lossy.", "bash.rm.")
+
+# Input field whose exact value an approval covers, per tool
+SUBJECT_FIELDS = {"Bash": "command"}
+
+DEFAULT_APPROVAL_CONFIG = {
+    "enabled": False,
+    "ttl_days": 30,
+    "max_entries": 4096,
+    "pending_seconds": 900,
+}
+
+
+def get_approval_config() -> dict:
+    """Approval settings merged over defaults."""
+    return {**DEFAULT_APPROVAL_CONFIG, **load_config().get("approvals", {})}
+
+
+def store_path() -> Path:
+    """File holding the shared approval set."""
+    return cache_dir() / STORE_NAME
+
+
+def project_root(cwd: str) -> str:
+    """The git worktree enclosing cwd, else cwd itself."""
+    path = os.path.abspath(cwd)
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return os.path.abspath(cwd)
+        path = parent
+
+
+def fingerprint(tool_name: str, tool_input: dict, cwd: str) -> str | None:
+    """Project and normalized subject of a call, or None if it can't be learned."""
+    subject = tool_input.get(SUBJECT_FIELDS.get(tool_name, ""), "")
+    if not cwd or not subject or not isinstance(subject, str):
+        return None
+    return f"{project_root(cwd)}\0{tool_name}\0{normalize_command(subject)}"
+
+
+def _key(*parts: str) -> int:
+    """Stable 64-bit hash of a key; 0 marks an empty slot."""
+    data = "\0\0".join(parts).encode("utf-8", "replace")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") or 1
+
+
+def _open_store(path: Path, slot_count: int, exclusive: bool):
+    """Open (creating or resetting if needed) and map the store. Returns (fd, mmap) or None."""
+    size = HEADER.size + slot_count * SLOT.size
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, slot_count)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return None
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        if os.fstat(fd).st_size != size or os.pread(fd, HEADER.size, 0) != header:
+            if not exclusive:
+                os.close(fd)
+                return None  # nothing learned yet (or under another size): nothing to find
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+        return fd, mmap.mmap(fd, size, access=mmap.ACCESS_WRITE if exclusive else mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        os.close(fd)
+        return None
+
+
+def _probe(buf, key: int, slot_count: int, now: int):
+    """
+    Find key's slot. Returns (index of key or None, index to insert at):
+    a free or expired slot, else the one expiring soonest.
+    """
+    free, soonest = None, None
+    for probe in range(PROBES):
+        index = (key + probe) % slot_count
+        slot_key, expires, _ = SLOT.unpack_from(buf, HEADER.size + index * SLOT.size)
+        if slot_key == key and expires > now:
+            return index, index
+        if free is None and (slot_key == 0 or expires <= now):
+            free = index
+        if soonest is None or expires < soonest[0]:
+            soonest = (expires, index)
+    return None, free if free is not None else soonest[1]
+
+
+def contains(key: int, config: dict, now: float | None = None, path: Path | None = None) -> bool:
+    """True if key is in the set and unexpired."""
+    opened = _open_store(path or store_path(), config["max_entries"], exclusive=False)
+    if opened is None:
+        return False
+    fd, buf = opened
+    try:
+        found, _ = _probe(buf, key, config["max_entries"], int(time.time() if now is None else now))
+        return found is not None
+    finally:
+        buf.close()
+        os.close(fd)
+
+
+def add(key: int, seconds: float, config: dict, now: float | None = None, path: Path | None = None,
+        remove: int = 0) -> None:
+    """Insert (or refresh) key for seconds; optionally remove another key in the same lock."""
+    opened = _open_store(path or store_path(), config["max_entries"], exclusive=True)
+    if opened is None:
+        return
+    fd, buf = opened
+    try:
+        now = int(time.time() if now is None else now)
+        if remove:
+            found, _ = _probe(buf, remove, config["max_entries"], now)
+            if found is not None:
+                SLOT.pack_into(buf, HEADER.size + found * SLOT.size, 0, 0, 0)
+        found, free = _probe(buf, key, config["max_entries"], now)
+        index = free if found is None else found
+        SLOT.pack_into(buf, HEADER.size + index * SLOT.size, key, min(now + int(seconds), 0xFFFFFFFF),
+                       now & 0xFFFFFFFF)
+    finally:
+        buf.close()
+        os.close(fd)
+
+
+def consult(verdict: Verdict, tool_name: str, tool_input: dict, cwd: str, session_id: str = "",
+            config: dict | None = None, now: float | None = None) -> Verdict:
+    """
+    Relax a rule's ask to a warning if the call was approved before in its
+    project; otherwise note it as pending for the session. Other verdicts,
+    and asks of CONTEXT_RULES, pass through untouched.
+    """
+    if verdict.decision != "ask" or verdict.rule_id in ("", DEADLINE_RULE) \
+            or verdict.rule_id.startswith(CONTEXT_RULES):
+        return verdict
+    config = config or get_approval_config()
+    subject = fingerprint(tool_name, tool_input, cwd) if config["enabled"] else None
+    if subject is None:
+        return verdict
+    if contains(_key("approved", subject), config, now):
+        return Verdict("warn", f"{verdict.message} (approved before in this project)", verdict.rule_id)
+    if session_id:
+        add(_key("pending", session_id, subject), config["pending_seconds"], config, now)
+    return verdict
+
+
+def confirm(tool_name: str, tool_input: dict, cwd: str, session_id: str,
+            config: dict | None = None, now: float | None = None) -> bool:
+    """
+    Learn the approval of a call that ran after an ask (PostToolUse).
+    Returns True if an approval was learned.
+    """
+    config = config or get_approval_config()
+    subject = fingerprint(tool_name, tool_input, cwd) if config["enabled"] and session_id else None
+    if subject is None:
+        return False
+    pending = _key("pending", session_id, subject)
+    if not contains(pending, config, now):
+        return False
+    add(_key("approved", subject), config["ttl_days"] * 86400, config, now, remove=pending)
+    return True
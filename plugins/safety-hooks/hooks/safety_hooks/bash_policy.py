@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+"""
+Bash command policy.
+
+Four levels:
+  ALWAYS_BLOCK - Catastrophic, never allow (rm -rf /, dd to devices, etc.)
+  ASK_PATTERNS - Dangerous but sometimes legitimate, prompt user
+  LOSSY_GIT_PATTERNS - Prompt only if uncommitted work would be lost
+  WARN_PATTERNS - Just log a warning, allow
+
+Safe patterns (ALLOWLIST) are checked first and bypass all restrictions
+when every segment of the command matches one and none redirects to a file.
+
+Commands nested inside `bash -c`, `eval`, `xargs`, `find -exec`, command
+substitutions and `python -c`/`node -e` scripts are extracted and checked
+recursively, within a depth limit and a total byte budget. Encoded data
+that a command decodes and runs (`echo ... | base64 -d | sh`, printf
+escapes, `exec(bytes.fromhex(...))`) is decoded by payload_decoder and
+checked the same way.
+
+Files a command writes to (redirections, tee, cp, mv, sed -i, chmod, ...)
+are checked against the same path policy as the Write/Edit tools, the
+hosts it connects to (curl, wget, ssh, git remotes, ...) against the
+egress policy, and container runs (docker/podman run, exec, compose)
+against the container policy. Recursive rm targets are resolved and
+probed for their blast radius (blast_radius.py). Enabled domain rule
+packs (terraform, kubectl, SQL clients, ...) are loaded only for
+commands that run one of their programs (rule_packs.py).
+"""
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from . import blast_radius, container_policy, egress_policy, policy_table, rule_packs, shadow, worktree_state
+from .hook_utils import (
+    ALLOW,
+    CONFIG_PATH,
+    NO_DEADLINE,
+    SEVERITY,
+    SHELLS,
+    Deadline,
+    Verdict,
+    decode_escapes,
+    interpreter_name,
+    normalize_command,
+    parse_command,
+    find_substitutions,
+    quote_word,
+    load_config,
+    render_segment,
+)
+from .path_policy import check_path
+from .payload_decoder import (
+    MAX_DECODE_SECONDS,
+    MAX_DECODED_BYTES,
+    decode_pipelines,
+    decode_script_literals,
+    script_substitutions,
+)
+from .policy_table import PolicyTable, Rule, load_policy, make_rules
+
+# =============================================================================
+# ALLOWLIST - Safe patterns that bypass restrictions
+# =============================================================================
+ALLOWLIST_PATTERNS = [
+    # Creating new branches is safe
+    r"git\s+checkout\s+(-b|--orphan)\s+",
+    # Unstaging files preserves work
+    r"git\s+restore\s+--staged\s+",
+    # Dry-run operations - but ONLY if -f/--force is NOT present
+    r"git\s+clean\s+(?!.*(-f|--force)).*(-n|--dry-run)",
+    # Deleting temp directories is fine
+    r"rm\s+.*(/tmp/|/var/tmp/|\$TMPDIR/)",
+    # Viewing permissions is safe
+    r"chmod\s+--help",
+    r"ls\s+-l",
+]
+
+# Pattern for rm flags: matches -r, -f, -R, -rf, --recursive, --force, --no-preserve-root
+RM_FLAGS = r"(['\"]?-[rfR]+['\"]?|--recursive|--force|--no-preserve-root)\s+"
+
+# =============================================================================
+# ALWAYS BLOCKED - No way to proceed, even if intentional
+# =============================================================================
+BLOCK_PATTERNS = [
+    # --no-preserve-root is ALWAYS dangerous
+    (r"rm\s+.*--no-preserve-root",
+     "rm --no-preserve-root explicitly bypasses safety checks"),
+
+    # Catastrophic deletions - NEVER allow
+    (rf"rm\s+({RM_FLAGS})*(/|/\*)\s*$",
+     "rm on root directory - absolutely never allowed"),
+    (rf"rm\s+({RM_FLAGS})*/(etc|usr|bin|sbin|boot|lib|lib64|sys|proc)\b",
+     "rm on critical system directory"),
+
+    # Raw disk writes
+    (r"\bdd\s+.*of=/dev/[sh]d",
+     "dd write to disk device"),
+    (r"\bmkfs\b",
+     "filesystem format command"),
+
+    # Credential exfiltration attempts
+    (r"curl.+(-d|--data).+[@<].*(\.env|credentials|\.aws|\.ssh)",
+     "potential credential exfiltration via curl"),
+
+    # Remote code execution - piping downloads to shell
+    (r"curl\s+.*\|\s*(ba)?sh",
+     "piping curl output to shell - remote code execution risk"),
+    (r"wget\s+.*\|\s*(ba)?sh",
+     "piping wget output to shell - remote code execution risk"),
+    (r"curl\s+.*>\s*/tmp/.*&&.*sh\s+/tmp/",
+     "download and execute pattern"),
+
+    # Environment variable exfiltration
+    (r"(env|printenv)\s*\|.*curl",
+     "environment variable exfiltration via curl"),
+    (r"(env|printenv)\s*\|.*wget",
+     "environment variable exfiltration via wget"),
+    (r"(env|printenv)\s*\|.*nc\b",
+     "environment variable exfiltration via netcat"),
+]
+
+# =============================================================================
+# ASK USER - Dangerous but sometimes legitimate
+# =============================================================================
+ASK_PATTERNS = [
+    # Home directory operations
+    (rf"rm\s+({RM_FLAGS})*(~|\$HOME)(/|\s|$)",
+     "delete files in home directory"),
+
+    # Shell config modifications (legitimate when user asks)
+    (r">\s*~/?\.(bashrc|zshrc|profile|bash_profile|zprofile)",
+     "overwrite shell config file"),
+
+    # SSH config changes
+    (r">\s*~/?\.ssh/(config|authorized_keys|known_hosts)",
+     "modify SSH configuration"),
+
+    # Git history rewriting - force push
+    (r"git\s+push\s+.*(-f|--force)\b",
+     "force push (rewrites remote history)"),
+
+    (r"git\s+reset\s+--merge",
+     "merge reset (risks data loss)"),
+
+    # Git rebase
+    (r"git\s+rebase\s+",
+     "rebase (rewrites commit history)"),
+
+    # Git branch force delete
+    (r"git\s+branch\s+.*-D\b",
+     "branch -D (force-deletes without merge check)"),
+
+    # Mass process operations
+    (r"pkill\s+.*-9",
+     "force kill processes"),
+    (r"killall\s+",
+     "kill processes by name"),
+
+    # Cron modifications
+    (r"crontab\s+",
+     "modify scheduled tasks"),
+
+    # Package installation (can run arbitrary scripts)
+    (r"(npm|yarn|pnpm)\s+install\s+(?!-)",
+     "install npm packages (runs install scripts)"),
+    (r"pip\s+install\s+(?!-e\s+\.)",
+     "install pip packages"),
+
+    # Indirect rm via xargs/find -exec
+    (r"\|\s*xargs\s+.*\brm\b",
+     "piped rm via xargs (indirect delete)"),
+    (r"find\s+.*-exec\s+rm\b",
+     "find -exec rm (indirect delete)"),
+
+    # Overly permissive chmod
+    (r"chmod\s+777\s+",
+     "chmod 777 (world-writable)"),
+    (r"chmod\s+666\s+",
+     "chmod 666 (world-writable files)"),
+    (r"chmod\s+-R\s+777\s+",
+     "recursive chmod 777 (world-writable)"),
+    (r"chmod\s+a\+w\s+",
+     "chmod a+w (world-writable)"),
+
+    # Ownership changes
+    (r"chown\s+.*:",
+     "change file ownership"),
+    (r"chown\s+-R\s+",
+     "recursive ownership change"),
+
+    # Netcat - often used for reverse shells
+    (r"\bnc\s+.*-e\s+",
+     "netcat with command execution"),
+    (r"\bnetcat\s+.*-e\s+",
+     "netcat with command execution"),
+    (r"\bnc\s+-l.*\|.*sh",
+     "netcat listener piped to shell"),
+]
+
+# =============================================================================
+# ASK IF WORK IS AT RISK - Git commands that discard uncommitted work; they
+# ask only when worktree_state finds something they would lose
+# =============================================================================
+LOSSY_GIT_PATTERNS = [
+    (r"git\s+reset\s+--hard",
+     "hard reset (discards uncommitted changes)"),
+    (r"git\s+checkout\s+--\s+",
+     "checkout -- (discards local changes)"),
+    (r"git\s+restore\s+(?!--staged)",
+     "restore (permanent overwrites)"),
+    (r"git\s+clean\s+.*-f",
+     "clean -f (removes untracked files permanently)"),
+    (r"git\s+stash\s+(drop|clear)",
+     "stash drop/clear (permanently deletes stashed changes)"),
+]
+
+# =============================================================================
+# WARN ONLY - Log but allow
+# =============================================================================
+WARN_PATTERNS = [
+    (rf"rm\s+{RM_FLAGS}",
+     "recursive/force delete - verify path is intended"),
+]
+
+# =============================================================================
+# SCRIPT PAYLOADS - Checked in python -c / node -e / perl -e source
+# =============================================================================
+SCRIPT_DELETE_CALLS = r"(shutil\.rmtree|os\.removedirs|\.(rm|rmdir)Sync|\.promises\.rm|FileUtils\.rm_r|File::Path::(remove|rmtree)|\brmtree)"
+
+SCRIPT_BLOCK_PATTERNS = [
+    (rf"{SCRIPT_DELETE_CALLS}\s*\(\s*['\"]/+\*?['\"]",
+     "script deletes root directory"),
+    (rf"{SCRIPT_DELETE_CALLS}\s*\(\s*['\"]/(etc|usr|bin|sbin|boot|lib|lib64|sys|proc)\b",
+     "script deletes critical system directory"),
+]
+
+SCRIPT_ASK_PATTERNS = [
+    (rf"{SCRIPT_DELETE_CALLS}\s*\(\s*(['\"]~|os\.path\.expanduser|Path\.home|(os|require\(['\"]os['\"]\))\.homedir|os\.environ\[['\"]HOME|process\.env\.HOME|ENV\[['\"]HOME)",
+     "script deletes files in home directory"),
+]
+
+# String literals in script source, checked as shell commands
+SCRIPT_STRING_LITERAL = re.compile(r"""(['"])((?:\\.|(?!\1)[^\\\n])*)\1""")
+
+# =============================================================================
+# NESTED PAYLOADS - Programs that run a string argument as code
+# =============================================================================
+# Interpreter -> flags whose value is inline source code
+SCRIPT_FLAGS = {
+    "python": {"-c"},
+    "node": {"-e", "--eval", "-p", "--print"},
+    "perl": {"-e", "-E"},
+    "ruby": {"-e"},
+    "php": {"-r"},
+}
+
+# xargs options that consume a separate value
+XARGS_OPTIONS_WITH_VALUE = {"-a", "-d", "-E", "-I", "-L", "-n", "-P", "-s",
+                            "--arg-file", "--delimiter", "--max-lines", "--max-args",
+                            "--max-procs", "--max-chars", "--process-slot-var"}
+
+# Defaults for the nested scan budget (overridable in config.json)
+MAX_NESTING_DEPTH = 3
+MAX_NESTED_BYTES = 64 * 1024
+
+NESTED_TOO_LARGE = Verdict("ask", "nested commands too large to check", "bash.nesting.size")
+
+# Why decoded data couldn't be checked -> message (rule ID bash.decode.<problem>)
+DECODE_PROBLEMS = {
+    "opaque": "runs decoded data that can't be inspected",
+    "size": "decoded payload too large to check",
+    "time": "decoded payload took too long to decode",
+}
+
+# =============================================================================
+# WRITE TARGETS - Programs whose file operands are checked with path_policy
+# =============================================================================
+# Every operand is written (or removed)
+WRITES_ALL_OPERANDS = {"tee", "touch", "truncate", "rm", "rmdir", "unlink", "shred"}
+
+# The last operand (or -t DIR) is the destination; mv also removes its sources
+WRITES_DESTINATION = {"cp", "mv", "ln", "install", "rsync", "scp"}
+
+# The first operand is a mode/owner, the rest are written
+WRITES_AFTER_FIRST_OPERAND = {"chmod", "chown", "chgrp"}
+
+# Options that take a separate value, per program
+WRITE_OPTIONS_WITH_VALUE = {
+    "sed": {"-e", "-f", "-l", "--expression", "--file", "--line-length"},
+    "cp": {"-S", "-t", "--suffix", "--target-directory"},
+    "mv": {"-S", "-t", "--suffix", "--target-directory"},
+    "ln": {"-S", "-t", "--suffix", "--target-directory"},
+    "install": {"-S", "-t", "-g", "-m", "-o", "--suffix", "--target-directory", "--group", "--mode", "--owner"},
+    "truncate": {"-s", "-r", "--size", "--reference"},
+    "shred": {"-n", "-s", "--iterations", "--size"},
+    "tee": {"--output-error"},
+    "rsync": {"-e", "--rsh", "--exclude", "--include", "--filter"},
+    "scp": {"-P", "-i", "-o", "-F", "-l", "-c", "-J"},
+}
+
+# Redirection operators that write to their target
+WRITE_REDIRECTS = (">", ">>", ">|", "&>", "&>>", ">&", "<>")
+
+# Files whose changes invalidate the compiled policy table: this module, the
+# config, the table format, and every module contributing gate rules
+POLICY_SOURCES = [Path(__file__).resolve(), CONFIG_PATH, Path(policy_table.__file__).resolve(),
+                  *(Path(module.__file__).resolve()
+                    for module in (blast_radius, container_policy, egress_policy, rule_packs, shadow))]
+
+# Allowlist keywords can't turn an allow into anything else, so fast_path ignores them
+FAST_PATH_SKIP_TIERS = ("allow",)
+
+# Tiers checked only for whether any rule matches; the table orders them by observed cost
+ANY_MATCH_TIERS = ("allow", "rm", "container", "egress", "shadow")
+
+
+def build_rules() -> list[Rule]:
+    """Collect built-in and user-defined rules in evaluation order."""
+    bash_config = load_config().get("bash_safety", {})
+    return (make_rules("bash", "allow", ALLOWLIST_PATTERNS)
+            + make_rules("bash.extra", "allow", bash_config.get("extra_allowlist", []))
+            + make_rules("bash", "block", BLOCK_PATTERNS)
+            + make_rules("bash.extra", "block", bash_config.get("extra_block_patterns", []))
+            + make_rules("bash", "ask", ASK_PATTERNS)
+            + make_rules("bash.extra", "ask", bash_config.get("extra_ask_patterns", []))
+            + make_rules("bash", "lossy", LOSSY_GIT_PATTERNS)
+            + make_rules("bash", "warn", WARN_PATTERNS)
+            + make_rules("bash", "script_block", SCRIPT_BLOCK_PATTERNS)
+            + make_rules("bash", "script_ask", SCRIPT_ASK_PATTERNS)
+            + make_rules("bash", "rm", blast_radius.RM_PROGRAMS)
+            + make_rules("bash", "container", container_policy.CONTAINER_PROGRAMS)
+            + make_rules("bash", rule_packs.GATE_TIER, rule_packs.gate_rules())
+            + (make_rules("bash", "egress", egress_policy.EGRESS_PROGRAMS) if egress_policy.enabled() else [])
+            + (make_rules("bash", "shadow", shadow.FAST_PATH_GATE) if shadow.enabled() else []))
+
+
+@lru_cache(maxsize=1)
+def get_policy() -> PolicyTable:
+    """Attach to the shared compiled policy, building it if stale."""
+    sources = POLICY_SOURCES + rule_packs.sources()
+    return load_policy("bash", sources, build_rules, FAST_PATH_SKIP_TIERS, ANY_MATCH_TIERS)
+
+
+def script_flags(program: str) -> set[str]:
+    """Return the inline-source flags for an interpreter, e.g. python3.12 -> {-c}."""
+    return SCRIPT_FLAGS.get(interpreter_name(program), set())
+
+
+def _shell_payloads(segment) -> list[str]:
+    """Return the command strings a shell segment runs (-c, heredoc, here-string)."""
+    args = segment.argv[1:]
+    for i, arg in enumerate(args):
+        if arg == "--" or not arg.startswith(("-", "+")):
+            break
+        if arg.startswith("-") and not arg.startswith("--") and "c" in arg[1:]:
+            rest = [a for a in args[i + 1:] if not a.startswith("-")]
+            return rest[:1]
+    if any(not a.startswith("-") for a in args):
+        # Running a script file; its contents are not visible here
+        return []
+    payloads = list(segment.heredocs)
+    payloads.extend(target for op, target in segment.redirects if op == "<<<")
+    return payloads
+
+
+def _sub_command(words: tuple[str, ...]) -> str:
+    """Render an argv slice that another program will execute."""
+    return " ".join(quote_word(word) for word in words)
+
+
+def extract_payloads(command: str) -> list[tuple[str, str]]:
+    """
+    Find code hidden inside string arguments of a command.
+    The body of a process substitution is one of them; what it outputs
+    to a shell as a script (bash <(...), bash < <(...)) is emulated and
+    checked by extract_encoded_payloads.
+    Returns a list of (kind, payload) where kind is "shell" or "script".
+    """
+    payloads = []
+    for segment in parse_command(command):
+        argv = segment.argv
+        words = list(argv) + [target for _, target in segment.redirects]
+        for word in words:
+            payloads.extend(("shell", body) for body in find_substitutions(word))
+        if not argv:
+            continue
+
+        program = argv[0]
+        if program in SHELLS:
+            payloads.extend(("shell", p) for p in _shell_payloads(segment))
+        elif program == "eval" and len(argv) > 1:
+            payloads.append(("shell", " ".join(argv[1:])))
+        elif program == "xargs":
+            i = 1
+            while i < len(argv) and argv[i].startswith("-"):
+                i += 2 if argv[i] in XARGS_OPTIONS_WITH_VALUE else 1
+            if i < len(argv):
+                payloads.append(("shell", _sub_command(argv[i:])))
+        elif program == "find":
+            for i, arg in enumerate(argv):
+                if arg in ("-exec", "-execdir", "-ok", "-okdir"):
+                    end = i + 1
+                    while end < len(argv) and argv[end] not in (";", "+"):
+                        end += 1
+                    if end > i + 1:
+                        payloads.append(("shell", _sub_command(argv[i + 1:end])))
+        else:
+            flags = script_flags(program)
+            for i, arg in enumerate(argv[1:-1], start=1):
+                if arg in flags:
+                    payloads.append(("script", argv[i + 1]))
+    return payloads
+
+
+def _operands(program: str, args: tuple[str, ...]) -> tuple[list[str], dict[str, str]]:
+    """Split arguments into operands and {option: value} (value "" for flags)."""
+    with_value = WRITE_OPTIONS_WITH_VALUE.get(program, set())
+    operands, options = [], {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--":
+            operands.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and len(arg) > 1:
+            name, _, value = arg.partition("=")
+            if name in with_value and not value and i + 1 < len(args):
+                value = args[i + 1]
+                i += 1
+            options[name] = value
+        else:
+            operands.append(arg)
+        i += 1
+    return operands, options
+
+
+def _sed_in_place(options: dict[str, str]) -> bool:
+    """True if sed options include -i/--in-place (possibly combined, e.g. -ni, -i.bak)."""
+    return any(name == "--in-place" or (not name.startswith("--") and "i" in name[1:]) for name in options)
+
+
+def _destinations(operands: list[str], target_dir: str | None) -> list[str]:
+    """Files a cp/mv-style command creates: DEST, or DIR/<source name> per source."""
+    if target_dir:
+        sources, directory = operands, target_dir
+    elif len(operands) < 2:
+        return []
+    elif len(operands) == 2 and not operands[1].endswith("/"):
+        return operands[1:]
+    else:
+        sources, directory = operands[:-1], operands[-1]
+    return [os.path.join(directory, os.path.basename(source.rstrip("/"))) for source in sources] or [directory]
+
+
+def _redirect_targets(segment) -> list[str]:
+    """Files a segment's redirections write to."""
+    targets = []
+    for op, target in segment.redirects:
+        if not target or not any(op.endswith(w) for w in WRITE_REDIRECTS):
+            continue
+        if op.endswith("&") and (target.isdigit() or target == "-"):
+            continue  # fd duplication, not a file
+        targets.append(target)
+    return targets
+
+
+def extract_write_targets(command: str) -> list[str]:
+    """
+    Return the files a command writes to: redirection targets and the
+    operands of file-mutating programs, in command order.
+    """
+    targets = []
+    for segment in parse_command(command):
+        targets.extend(_redirect_targets(segment))
+        if not segment.argv:
+            continue
+
+        program, args = segment.argv[0], segment.argv[1:]
+        if program == "dd":
+            targets.extend(arg[3:] for arg in args if arg.startswith("of="))
+            continue
+        operands, options = _operands(program, args)
+        if program == "sed":
+            if _sed_in_place(options):
+                has_script = any(name in options for name in ("-e", "-f", "--expression", "--file"))
+                targets.extend(operands if has_script else operands[1:])
+        elif program in WRITES_ALL_OPERANDS:
+            targets.extend(operands)
+        elif program in WRITES_DESTINATION:
+            target_dir = options.get("-t") or options.get("--target-directory")
+            if program == "mv":
+                targets.extend(operands if target_dir else operands[:-1])
+            targets.extend(_destinations(operands, target_dir))
+        elif program in WRITES_AFTER_FIRST_OPERAND:
+            targets.extend(operands if "--reference" in options else operands[1:])
+    return targets
+
+
+def _resolve_target(target: str, cwd: str) -> str:
+    """Make a write target comparable with Write/Edit file paths."""
+    for home in ("$HOME", "${HOME}"):
+        if target == home or target.startswith(home + "/"):
+            target = "~" + target[len(home):]
+    if cwd and not target.startswith(("/", "~")):
+        target = os.path.join(cwd, target)
+    return target
+
+
+def check_write_targets(command: str, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check every file the command writes to against the shared path policy.
+    Returns: Verdict for the most severe target.
+    """
+    result = ALLOW
+    for target in extract_write_targets(command):
+        deadline.check("write target rules")
+        decision, message, rule_id = check_path(_resolve_target(target, cwd), deadline)
+        if decision != "allow":
+            result = _most_severe(result, Verdict(decision, f"writes to {message}: {target}", rule_id))
+            if result[0] == "block":
+                break
+    return result
+
+
+def _most_severe(current: Verdict, other: Verdict) -> Verdict:
+    """Return whichever verdict is more severe, preferring current on ties."""
+    return other if SEVERITY[other[0]] > SEVERITY[current[0]] else current
+
+
+def check_script(source: str, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """Check inline interpreter source against the script patterns."""
+    policy = get_policy()
+    candidates = policy.candidates(source)
+    for tier, decision in (("script_block", "block"), ("script_ask", "ask")):
+        deadline.check("script rules")
+        rule = policy.first_match(tier, source, candidates)
+        if rule:
+            return Verdict(decision, rule.message, rule.rule_id)
+    return ALLOW
+
+
+def check_command(command: str, deadline: Deadline = NO_DEADLINE, cwd: str = "") -> Verdict:
+    """
+    Check command, and any commands nested inside it, against patterns.
+    cwd resolves relative write targets. Raises DeadlineExceeded if the
+    deadline passes between stages.
+    Returns: Verdict
+      decision: "block", "ask", "warn", or "allow"
+    """
+    bash_config = load_config().get("bash_safety", {})
+    deadline.check("config loading")
+    budget = [bash_config.get("max_nested_bytes", MAX_NESTED_BYTES)]
+    return _check_nested(command, bash_config, 0, budget, deadline, cwd)
+
+
+def extract_encoded_payloads(command: str, limit: int = MAX_DECODED_BYTES,
+                             seconds: float = MAX_DECODE_SECONDS,
+                             deadline: Deadline = NO_DEADLINE) -> list[tuple[str, str]]:
+    """
+    Find encoded data a command decodes and runs: piped into a shell or
+    interpreter, substituted as the program to run, or given to a shell
+    as a process substitution script (whose output is run even if
+    nothing decodes it, as in a | bash pipeline).
+    Returns (kind, payload) like extract_payloads, plus ("undecodable", problem)
+    for data that couldn't be decoded within the caps.
+    """
+    found = decode_pipelines(command, limit, seconds, deadline)
+    for segment in parse_command(command):
+        if segment.argv:
+            for body in find_substitutions(segment.argv[0]):
+                found.extend(decode_pipelines(body, limit, seconds, deadline, stdout_kind="shell"))
+        for body in script_substitutions(segment):
+            found.extend(decode_pipelines(body, limit, seconds, deadline, stdout_kind="shell", executed=True))
+    return [(kind, text) if text is not None else ("undecodable", problem) for kind, text, problem in found]
+
+
+def _too_deep(max_depth: int) -> Verdict:
+    """Verdict for payloads nested past the depth limit."""
+    return Verdict("ask", f"commands nested more than {max_depth} levels deep", "bash.nesting.depth")
+
+
+def _decode_caps(bash_config: dict, budget: list[int]) -> tuple[int, float]:
+    """Byte and time caps for one decode, never more than the nested budget left."""
+    limit = min(bash_config.get("max_decoded_bytes", MAX_DECODED_BYTES), max(budget[0], 0))
+    return limit, bash_config.get("max_decode_seconds", MAX_DECODE_SECONDS)
+
+
+def _check_nested(command: str, bash_config: dict, depth: int, budget: list[int],
+                  deadline: Deadline = NO_DEADLINE, cwd: str = "") -> Verdict:
+    """
+    Check a command, then recurse into its nested and encoded payloads.
+    budget is a one-element list holding the bytes left to scan, shared by all levels.
+    """
+    result = check_single_command(command, deadline, cwd)
+    if result[0] == "block":
+        return result
+
+    max_depth = bash_config.get("max_nesting_depth", MAX_NESTING_DEPTH)
+    payloads = extract_payloads(command)
+    deadline.check("payload decoding")
+    payloads += extract_encoded_payloads(command, *_decode_caps(bash_config, budget), deadline)
+    for kind, payload in payloads:
+        deadline.check("nested command scan")
+        if kind == "undecodable":
+            result = _most_severe(result, Verdict("ask", DECODE_PROBLEMS[payload], f"bash.decode.{payload}"))
+            continue
+        if depth >= max_depth:
+            return _most_severe(result, _too_deep(max_depth))
+        budget[0] -= len(payload)
+        if budget[0] < 0:
+            return _most_severe(result, NESTED_TOO_LARGE)
+
+        if kind == "script":
+            nested = _check_script_payload(payload, bash_config, depth + 1, budget, deadline, cwd)
+        else:
+            nested = _check_nested(payload, bash_config, depth + 1, budget, deadline, cwd)
+
+        result = _most_severe(result, nested)
+        if result[0] == "block":
+            break
+    return result
+
+
+def _check_script_payload(source: str, bash_config: dict, depth: int, budget: list[int],
+                          deadline: Deadline = NO_DEADLINE, cwd: str = "") -> Verdict:
+    """
+    Check inline interpreter source, then its string literals as commands
+    and the literals it decodes (bytes.fromhex, b64decode, ...) as both.
+    """
+    result = check_script(source, deadline)
+    for match in SCRIPT_STRING_LITERAL.finditer(source):
+        if result[0] == "block":
+            return result
+        literal = match.group(2)
+        literal = decode_escapes(literal) if "\\" in literal else literal
+        budget[0] -= len(literal)
+        if budget[0] < 0:
+            return _most_severe(result, NESTED_TOO_LARGE)
+        result = _most_severe(result, _check_nested(literal, bash_config, depth, budget, deadline, cwd))
+
+    max_depth = bash_config.get("max_nesting_depth", MAX_NESTING_DEPTH)
+    for _, text, problem in decode_script_literals(source, *_decode_caps(bash_config, budget), deadline):
+        if result[0] == "block":
+            break
+        if text is None:
+            result = _most_severe(result, Verdict("ask", DECODE_PROBLEMS[problem], f"bash.decode.{problem}"))
+            continue
+        if depth >= max_depth:
+            return _most_severe(result, _too_deep(max_depth))
+        budget[0] -= len(text)
+        if budget[0] < 0:
+            return _most_severe(result, NESTED_TOO_LARGE)
+        result = _most_severe(result, _check_script_payload(text, bash_config, depth + 1, budget, deadline, cwd))
+        if result[0] != "block":
+            result = _most_severe(result, _check_nested(text, bash_config, depth + 1, budget, deadline, cwd))
+    return result
+
+
+def _allowlisted(command: str, policy: PolicyTable) -> bool:
+    """
+    True if every canonical segment of command matches the allowlist on
+    its own, with no heredoc and no redirection to a file: `ls -l; echo x
+    > /etc/hosts` is not allowlisted because `ls -l` is.
+    """
+    segments = [segment for segment in parse_command(command) if segment.argv or segment.redirects]
+    for segment in segments:
+        if segment.heredocs or _redirect_targets(segment):
+            return False
+        text = render_segment(segment)
+        if not policy.first_match("allow", text, policy.candidates(text)):
+            return False
+    return bool(segments)
+
+
+def check_single_command(command: str, deadline: Deadline = NO_DEADLINE, cwd: str = "") -> Verdict:
+    """
+    Check one command string against patterns and its write targets
+    against the path policy, without recursing.
+    Returns: Verdict
+    """
+    raw_command = command
+
+    # Normalize the command first
+    command = normalize_command(command)
+
+    # Only rules whose keywords occur in the command can match
+    policy = get_policy()
+    deadline.check("policy loading")
+    candidates = policy.candidates(command)
+
+    # Check allowlist first (built-in + user-defined) - bypasses all restrictions,
+    # but only when it covers every segment and nothing is redirected to a file
+    if policy.first_match("allow", command, candidates) and _allowlisted(raw_command, policy):
+        return ALLOW
+
+    # Then block, ask, lossy and warn tiers; built-in rules precede user-defined ones
+    result = ALLOW
+    for tier in ("block", "ask", "lossy", "warn"):
+        deadline.check(f"{tier} rules")
+        rule = policy.first_match(tier, command, candidates)
+        if not rule:
+            continue
+        if tier == "lossy":
+            # Asks only if the worktree holds work the git command would discard
+            result = worktree_state.check_command(raw_command, Verdict("ask", rule.message, rule.rule_id),
+                                                  cwd, deadline)
+        else:
+            result = Verdict(tier, rule.message, rule.rule_id)
+        if result[0] != "allow":
+            break
+
+    # Rules of the domain packs covering the programs the command runs
+    if result[0] != "block" and policy.first_match(rule_packs.GATE_TIER, command, candidates):
+        programs = rule_packs.command_programs(raw_command)
+        result = _most_severe(result, rule_packs.check_command(command, policy, candidates, programs, deadline))
+
+    # Files written through redirections or file-mutating programs
+    if result[0] != "block":
+        result = _most_severe(result, check_write_targets(raw_command, cwd, deadline))
+
+    # What recursive rm targets resolve to, and how much is under them
+    if result[0] != "block" and policy.first_match("rm", command, candidates):
+        result = _most_severe(result, blast_radius.check_command(raw_command, cwd, deadline))
+
+    # Privileges and mounts of container runs
+    if result[0] != "block" and policy.first_match("container", command, candidates):
+        result = _most_severe(result, container_policy.check_command(raw_command, cwd, deadline))
+
+    # Hosts reached by network programs; the egress tier only exists when configured
+    if result[0] != "block" and policy.first_match("egress", command, candidates):
+        result = _most_severe(result, egress_policy.check_command(raw_command, deadline))
+    return result
+
+
+def check_tool(tool_name: str, tool_input: dict, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check a Bash call's command.
+    Returns: Verdict
+    """
+    command = tool_input.get("command", "")
+    if tool_name != "Bash" or not command or not isinstance(command, str):
+        return ALLOW
+    return check_command(command, deadline, cwd)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Blast radius of recursive rm.
+
+The bash patterns see `rm -rf` text only: `rm -rf ./node_modules` and
+`rm -rf "$PROJECT_ROOT/.."` warn alike. Here the targets of a recursive
+rm are resolved the way the shell would (variables assigned in the
+command, $HOME, $PWD, ~, `cd` earlier in the command, globs) against the
+session's cwd, and the filesystem is probed to ask before deleting:
+  - a git repository root
+  - the working directory, the home directory or one of their parents
+  - a tree of more than max_files entries
+
+Globs are expanded with the same kind of os.scandir walk, under the same
+budget; a target whose glob can't be expanded in time asks as
+unresolvable instead.
+
+The size probe is an os.scandir walk that stops at max_files entries or
+max_seconds, whichever comes first, so a huge tree costs no more than a
+bounded one. Directories named in skip_dirs (node_modules, build output,
+caches) are regenerable and neither counted nor descended into.
+"""
+import fnmatch
+import math
+import os
+import re
+import time
+from typing import NamedTuple
+
+from .hook_utils import ALLOW, NO_DEADLINE, SEVERITY, Deadline, Verdict, load_config, parse_command, tokenize_command
+
+# Probe budget defaults (overridable in config.json)
+MAX_FILES = 10000
+MAX_PROBE_SECONDS = 0.2
+MAX_GLOB_MATCHES = 256
+
+# Regenerable directories: deleting them costs a rebuild, not work
+SKIP_DIRS = ["node_modules", "__pycache__", ".venv", "venv", ".tox", ".nox", ".pytest_cache",
+             ".mypy_cache", ".ruff_cache", ".next", ".parcel-cache", ".gradle", "target", "dist", "build"]
+
+# Programs the bash table gates the probe on (see bash_policy.build_rules)
+RM_PROGRAMS = [(r"\brm\s", "delete files")]
+
+# rm options that make it descend into directories
+RECURSIVE_OPTIONS = re.compile(r"-[a-zA-Z]*[rR][a-zA-Z]*|--recursive")
+
+# Words that stand for the working directory
+CWD_WORDS = ("$PWD", "${PWD}", "$(pwd)", "`pwd`")
+
+VARIABLE = re.compile(r"\$(?:\{([A-Za-z_]\w*)\}|([A-Za-z_]\w*))")
+ASSIGNMENT = re.compile(r"([A-Za-z_]\w*)=(.*)", re.DOTALL)
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class Probe(NamedTuple):
+    """Entries counted under a target; complete is False if the probe stopped early."""
+    entries: int
+    complete: bool
+
+
+def get_blast_config() -> dict:
+    """Get blast radius config with defaults."""
+    config = load_config().get("bash_safety", {}).get("blast_radius", {})
+    return {
+        "enabled": config.get("enabled", True),
+        "max_files": config.get("max_files", MAX_FILES),
+        "max_seconds": config.get("max_seconds", MAX_PROBE_SECONDS),
+        "skip_dirs": config.get("skip_dirs", SKIP_DIRS),
+    }
+
+
+# =============================================================================
+# Target resolution
+# =============================================================================
+
+def assignments(command: str) -> dict[str, str]:
+    """
+    Unquoted-name NAME=value assignments anywhere in a command, bare or
+    after export/declare/readonly/local; a later assignment wins. Values
+    that run a substitution are left out.
+    """
+    variables = {}
+    for token in tokenize_command(command):
+        match = ASSIGNMENT.fullmatch(token.text) if token.kind == "word" else None
+        if match and not (0 <= token.first_quote <= len(match.group(1))) and "$(" not in token.text \
+                and "`" not in token.text:
+            variables[match.group(1)] = match.group(2)
+    return variables
+
+
+def expand(word: str, cwd: str | None, variables: dict[str, str]) -> str | None:
+    """
+    Expand a target's variables, ~ and cwd words into an absolute path, or
+    None if it uses a variable the command doesn't set, or is relative to
+    a directory that isn't known (cwd None).
+    """
+    for cwd_word in CWD_WORDS:
+        if word == cwd_word or word.startswith(cwd_word + "/"):
+            if cwd is None:
+                return None
+            word = cwd + word[len(cwd_word):]
+    known = {"HOME": os.path.expanduser("~"), **({"PWD": cwd} if cwd else {}), **variables}
+
+    def substitute(match: re.Match) -> str:
+        name = match.group(1) or match.group(2)
+        if name not in known:
+            raise KeyError(name)
+        return known[name]
+
+    for _ in range(4):  # values may refer to other variables
+        try:
+            expanded = VARIABLE.sub(substitute, word)
+        except KeyError:
+            return None
+        if expanded == word:
+            break
+        word = expanded
+    if "$" in word or "`" in word:
+        return None
+    word = os.path.expanduser(word)
+    if cwd is None and not os.path.isabs(word):
+        return None
+    return os.path.normpath(os.path.join(cwd or "/", word))
+
+
+def rm_targets(args: tuple[str, ...]) -> tuple[bool, list[str]]:
+    """Split rm arguments into (recursive, operands)."""
+    recursive, operands = False, []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            operands.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and len(arg) > 1:
+            recursive = recursive or bool(RECURSIVE_OPTIONS.fullmatch(arg))
+        else:
+            operands.append(arg)
+    return recursive, operands
+
+
+def expand_glob(pattern: str, stop: float, limit: int = MAX_GLOB_MATCHES) -> list[str] | None:
+    """
+    Existing paths matching an absolute glob pattern, at most limit of them,
+    or None if time.monotonic() passes stop first. Walks one directory level
+    per pattern component, checking the time before every directory read;
+    like the shell, wildcards don't match a leading dot.
+    """
+    parts = [part for part in pattern.split("/") if part]
+    paths = ["/"]
+    for depth, part in enumerate(parts):
+        last = depth == len(parts) - 1
+        matched = []
+        for directory in paths:
+            if time.monotonic() >= stop:
+                return None
+            if not GLOB_CHARS.search(part):
+                path = os.path.join(directory, part)
+                if os.path.lexists(path) if last else os.path.isdir(path):
+                    matched.append(path)
+                continue
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.name.startswith(".") and not part.startswith("."):
+                            continue
+                        if not fnmatch.fnmatchcase(entry.name, part):
+                            continue
+                        try:
+                            if last or entry.is_dir():
+                                matched.append(entry.path)
+                        except OSError:
+                            pass
+            except OSError:
+                continue
+        paths = matched if not last else matched[:limit]
+        if not paths:
+            break
+    return paths
+
+
+def targets(command: str, cwd: str, stop: float = math.inf) -> list[tuple[str, str | None]]:
+    """
+    (word, path) for every target of a recursive rm in the command, in order.
+    `cd` segments move the directory later targets resolve against; globs
+    expand to at most MAX_GLOB_MATCHES existing paths. A target that can't
+    be resolved yields path None: one behind a variable the command doesn't
+    set, one relative to a `cd` that couldn't be followed, or a glob that
+    can't be expanded before time.monotonic() passes stop.
+    """
+    variables = assignments(command)
+    found = []
+    for segment in parse_command(command):
+        if not segment.argv:
+            continue
+        program, args = segment.argv[0], segment.argv[1:]
+        if program in ("cd", "pushd"):
+            operand = next((arg for arg in args if not arg.startswith("-")), "~")
+            cwd = expand(operand, cwd, variables)
+            continue
+        if program != "rm":
+            continue
+        recursive, operands = rm_targets(args)
+        if not recursive:
+            continue
+        for word in operands:
+            path = expand(word, cwd, variables)
+            if path is None:
+                found.append((word, None))
+            elif GLOB_CHARS.search(path):
+                matches = expand_glob(path, stop)
+                found.extend([(word, None)] if matches is None else ((word, match) for match in matches))
+            else:
+                found.append((word, path))
+    return found
+
+
+# =============================================================================
+# Probing
+# =============================================================================
+
+def probe(path: str, max_entries: int, stop: float, skip_dirs: frozenset[str] = frozenset()) -> Probe:
+    """
+    Count the entries rm -r would delete under path, without following
+    symlinks. Stops once more than max_entries are counted or
+    time.monotonic() passes stop.
+    """
+    if not os.path.isdir(path) or os.path.islink(path):
+        return Probe(1 if os.path.lexists(path) else 0, True)
+    entries = 1
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.name in skip_dirs:
+                        continue
+                    entries += 1
+                    if entries > max_entries or (entries % 64 == 0 and time.monotonic() >= stop):
+                        return Probe(entries, False)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+        if time.monotonic() >= stop:
+            return Probe(entries, not pending)
+    return Probe(entries, True)
+
+
+def _is_parent(path: str, of: str) -> bool:
+    """True if path is of or one of its parent directories."""
+    return of == path or of.startswith(path.rstrip("/") + "/")
+
+
+def check_target(word: str, path: str, cwd: str, config: dict, stop: float) -> Verdict:
+    """
+    Check one resolved rm target.
+    Returns: Verdict
+    """
+    home = os.path.expanduser("~")
+    if cwd and _is_parent(path, cwd):
+        return Verdict("ask", f"rm -r deletes the working directory or a parent of it: {word}",
+                       "bash.rm.working_directory")
+    if _is_parent(path, home):
+        return Verdict("ask", f"rm -r deletes the home directory or a parent of it: {word}", "bash.rm.home")
+    if os.path.lexists(os.path.join(path, ".git")) and not os.path.islink(path):
+        return Verdict("ask", f"rm -r deletes a git repository: {word}", "bash.rm.repository")
+    if os.path.basename(path) in config["skip_dirs"]:
+        return ALLOW
+    entries, complete = probe(path, config["max_files"], stop, frozenset(config["skip_dirs"]))
+    if entries > config["max_files"]:
+        return Verdict("ask", f"rm -r deletes more than {config['max_files']} files: {word}", "bash.rm.size")
+    if not complete:
+        return Verdict("ask", f"rm -r target too large to size within {config['max_seconds']:g}s: {word}",
+                       "bash.rm.size")
+    return ALLOW
+
+
+def check_command(command: str, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check the targets of every recursive rm in a command. Glob expansion
+    and the probes share one budget: max_seconds, cut to what is left of
+    the deadline. A target that can't be resolved (unset variable, unknown
+    directory, glob out of time) asks.
+    Returns: Verdict for the most severe target.
+    """
+    config = get_blast_config()
+    if not config["enabled"]:
+        return ALLOW
+    cwd = os.path.normpath(cwd or os.getcwd())
+    stop = time.monotonic() + min(config["max_seconds"], deadline.remaining())
+    result = ALLOW
+    for word, path in targets(command, cwd, stop):
+        deadline.check("rm targets")
+        if path is None:
+            verdict = Verdict("ask", f"rm -r target can't be resolved: {word}", "bash.rm.unresolved")
+        else:
+            verdict = check_target(word, path, cwd, config, stop)
+        if SEVERITY[verdict.decision] > SEVERITY[result.decision]:
+            result = verdict
+    return result
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Per-session sliding-window counters for repeated warn/ask verdicts.
+
+A single `rm -rf build/` warns; two hundred of them in a minute from one
+session are a runaway agent. Every warn or ask verdict is counted under
+(session_id, rule ID) in a small memory-mapped file shared by all hook
+processes, and a count crossing the configured threshold escalates the
+verdict: warn to ask, ask to block. Allowed calls never touch the store.
+
+Each counter is a ring of BUCKETS time buckets covering the window. An
+update locks the file, hashes its key to a slot, resets the current
+bucket if it belongs to an older period and sums the ring: constant work
+whatever the number of sessions. Slots whose buckets have all expired
+are reused; if every probed slot is live, the stalest is evicted.
+
+Layout (little-endian):
+  header    magic, version, slot count, buckets per slot
+  slots     key hash (u64), then BUCKETS x (period u32, count u32)
+"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: counts are best-effort without a lock
+    fcntl = None
+
+from .hook_utils import DEADLINE_RULE, Verdict, load_config
+from .policy_table import cache_dir
+
+MAGIC = b"SHBC"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHII")
+BUCKETS = 12
+SLOT = struct.Struct("<Q" + "II" * BUCKETS)
+SLOT_COUNT = 2048
+PROBES = 8
+
+STORE_NAME = "bursts.counters"
+
+# Verdicts a burst escalates, and what they become
+ESCALATIONS = {"warn": "ask", "ask": "block"}
+
+DEFAULT_BURST_CONFIG = {
+    "enabled": True,
+    "window_seconds": 60,
+    "warn_to_ask": 20,
+    "ask_to_block": 40,
+}
+
+
+def get_burst_config() -> dict:
+    """Burst settings merged over defaults."""
+    return {**DEFAULT_BURST_CONFIG, **load_config().get("burst", {})}
+
+
+def _key(session_id: str, rule_id: str) -> int:
+    """Stable 64-bit hash of a counter key; 0 marks an empty slot."""
+    data = f"{session_id}\0{rule_id}".encode("utf-8", "replace")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") or 1
+
+
+def store_path() -> Path:
+    """File holding the shared counters."""
+    return cache_dir() / STORE_NAME
+
+
+def _open_store(path: Path):
+    """Open (creating if needed) and map the store. Returns (fd, mmap) or None."""
+    size = HEADER.size + SLOT_COUNT * SLOT.size
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return None
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size != size or os.pread(fd, HEADER.size, 0) != HEADER.pack(
+                MAGIC, FORMAT_VERSION, 0, SLOT_COUNT, BUCKETS):
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, size)
+            os.pwrite(fd, HEADER.pack(MAGIC, FORMAT_VERSION, 0, SLOT_COUNT, BUCKETS), 0)
+        return fd, mmap.mmap(fd, size)
+    except (OSError, ValueError):
+        os.close(fd)
+        return None
+
+
+def _window_count(buckets: list[int], period: int) -> int:
+    """Sum the counts of buckets from the last BUCKETS periods."""
+    return sum(buckets[i + 1] for i in range(0, len(buckets), 2) if period - BUCKETS < buckets[i] <= period)
+
+
+def record(session_id: str, rule_id: str, window_seconds: float = 60, now: float | None = None,
+           path: Path | None = None) -> int:
+    """
+    Count one verdict for (session_id, rule_id) and return how many fell in
+    the last window_seconds, this one included. 0 if the store is unusable.
+    """
+    opened = _open_store(path or store_path())
+    if opened is None:
+        return 0
+    fd, buf = opened
+    try:
+        width = max(window_seconds, 0.001) / BUCKETS
+        period = int((time.time() if now is None else now) / width) & 0xFFFFFFFF
+        key = _key(session_id, rule_id)
+        home = key % SLOT_COUNT
+
+        # Find the key, else a free or expired slot, else evict the stalest
+        chosen, stalest = None, None
+        for probe in range(PROBES):
+            index = (home + probe) % SLOT_COUNT
+            slot_key, *buckets = SLOT.unpack_from(buf, HEADER.size + index * SLOT.size)
+            if slot_key == key:
+                chosen = (index, buckets)
+                break
+            newest = max(buckets[0::2])
+            if chosen is None and (slot_key == 0 or newest <= period - BUCKETS):
+                chosen = (index, [0] * (2 * BUCKETS))
+            if stalest is None or newest < stalest[0]:
+                stalest = (newest, index)
+        if chosen is None:
+            chosen = (stalest[1], [0] * (2 * BUCKETS))
+
+        index, buckets = chosen
+        i = 2 * (period % BUCKETS)
+        if buckets[i] != period:
+            buckets[i], buckets[i + 1] = period, 0
+        buckets[i + 1] = min(buckets[i + 1] + 1, 0xFFFFFFFF)
+        SLOT.pack_into(buf, HEADER.size + index * SLOT.size, key, *buckets)
+        return _window_count(buckets, period)
+    finally:
+        buf.close()
+        os.close(fd)
+
+
+def escalate(verdict: Verdict, session_id: str, config: dict | None = None,
+             now: float | None = None) -> Verdict:
+    """
+    Count a warn/ask verdict for the session and escalate it once its rule
+    has fired more than the configured threshold within the window.
+    """
+    if not session_id or verdict.decision not in ESCALATIONS or verdict.rule_id in ("", DEADLINE_RULE):
+        return verdict
+    config = config or get_burst_config()
+    threshold = config["warn_to_ask" if verdict.decision == "warn" else "ask_to_block"]
+    if not config["enabled"] or not threshold:
+        return verdict
+    window = config["window_seconds"]
+    count = record(session_id, verdict.rule_id, window, now)
+    if count <= threshold:
+        return verdict
+    message = f"{verdict.message} (repeated {count} times in {window:g}s)"
+    return Verdict(ESCALATIONS[verdict.decision], message, verdict.rule_id)
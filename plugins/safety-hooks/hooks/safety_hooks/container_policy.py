@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Container runtime policy.
+
+Parses `docker`/`podman`/`nerdctl` `run`, `create` and `exec` commands,
+and `compose run`/`exec`, into the flags that widen what a container can
+reach on the host, and asks before:
+  - --privileged
+  - sharing a host namespace (--pid=host, --network=host, --ipc=host, ...)
+  - adding powerful capabilities (--cap-add=SYS_ADMIN, ALL, ...)
+  - disabling confinement (--security-opt seccomp=unconfined, ...)
+  - passing host devices (--device)
+  - bind mounts (-v, --volume, --mount type=bind) of the root filesystem,
+    the container runtime socket, the home directory, or any path the
+    shared path policy protects (credentials for every mount, system
+    directories for writable ones)
+"""
+import os
+from typing import NamedTuple
+
+from .hook_utils import ALLOW, NO_DEADLINE, SEVERITY, Deadline, Verdict, normalize_path, parse_command
+from .path_policy import check_path, check_read_glob, check_read_path
+
+# =============================================================================
+# CLI SHAPE - Programs, subcommands and options that take a value
+# =============================================================================
+RUNTIMES = {"docker", "podman", "nerdctl"}
+COMPOSE_PROGRAMS = {"docker-compose", "podman-compose"}
+
+# Programs the bash table gates the container check on (see bash_policy.build_rules)
+CONTAINER_PROGRAMS = [
+    (r"\b(docker|podman|nerdctl)\b", "container runtime"),
+]
+
+# Subcommands that start or enter a container
+CONTAINER_COMMANDS = {"run", "create", "exec"}
+
+# Options before the subcommand that take a separate value
+GLOBAL_OPTIONS_WITH_VALUE = {"-H", "--host", "-c", "--context", "--config", "-l", "--log-level",
+                             "--tlscacert", "--tlscert", "--tlskey", "--connection", "--url", "--identity",
+                             "--root", "--runroot", "--storage-driver", "--cgroup-manager", "--namespace",
+                             "-n", "--address", "-a"}
+COMPOSE_OPTIONS_WITH_VALUE = {"-f", "--file", "-p", "--project-name", "--profile", "--env-file",
+                              "--project-directory", "--ansi", "--parallel", "--progress"}
+
+# run/create/exec options that take a separate value
+OPTIONS_WITH_VALUE = {
+    "-a", "--attach", "--add-host", "--annotation", "--blkio-weight", "--blkio-weight-device",
+    "--cap-add", "--cap-drop", "--cgroup-parent", "--cgroupns", "--cidfile", "-c", "--cpu-shares",
+    "--cpu-period", "--cpu-quota", "--cpu-rt-period", "--cpu-rt-runtime", "--cpus", "--cpuset-cpus",
+    "--cpuset-mems", "--detach-keys", "--device", "--device-cgroup-rule", "--device-read-bps",
+    "--device-read-iops", "--device-write-bps", "--device-write-iops", "--dns", "--dns-option",
+    "--dns-search", "--domainname", "--entrypoint", "-e", "--env", "--env-file", "--expose", "--gpus",
+    "--group-add", "--health-cmd", "--health-interval", "--health-retries", "--health-start-period",
+    "--health-start-interval", "--health-timeout", "-h", "--hostname", "--ip", "--ip6", "--ipc",
+    "--isolation", "--kernel-memory", "-l", "--label", "--label-file", "--link", "--link-local-ip",
+    "--log-driver", "--log-opt", "--mac-address", "-m", "--memory", "--memory-reservation",
+    "--memory-swap", "--memory-swappiness", "--mount", "--name", "--net", "--network", "--net-alias",
+    "--network-alias", "--oom-score-adj", "--pid", "--pids-limit", "--platform", "--pod", "-p",
+    "--publish", "--pull", "--restart", "--runtime", "--security-opt", "--shm-size", "--stop-signal",
+    "--stop-timeout", "--storage-opt", "--sysctl", "--tmpfs", "--ulimit", "-u", "--user", "--userns",
+    "--uts", "-v", "--volume", "--volume-driver", "--volumes-from", "-w", "--workdir", "--index",
+}
+
+# =============================================================================
+# RISKY SETTINGS
+# =============================================================================
+# Options whose value "host" shares that host namespace
+NAMESPACE_OPTIONS = {"--pid": "PID", "--network": "network", "--net": "network", "--ipc": "IPC",
+                     "--uts": "UTS", "--userns": "user", "--cgroupns": "cgroup"}
+
+# Capabilities that amount to (or lead straight to) root on the host
+RISKY_CAPABILITIES = {"ALL", "SYS_ADMIN", "SYS_MODULE", "SYS_PTRACE", "SYS_RAWIO", "SYS_BOOT",
+                      "DAC_READ_SEARCH", "NET_ADMIN", "BPF", "PERFMON"}
+
+# --security-opt values that switch off confinement
+UNCONFINED_OPTIONS = {"seccomp=unconfined", "seccomp:unconfined", "apparmor=unconfined",
+                      "apparmor:unconfined", "label=disable", "label:disable", "systempaths=unconfined"}
+
+# Sockets that control a container runtime
+RUNTIME_SOCKETS = ("docker.sock", "podman.sock", "containerd.sock", "crio.sock")
+
+# Mount sources that stand for the working directory
+CWD_SOURCES = {".", "$PWD", "${PWD}", "$(pwd)", "`pwd`"}
+
+
+class Mount(NamedTuple):
+    """A bind mount: host source, container target, read-only flag."""
+    source: str
+    target: str
+    read_only: bool
+
+
+class ContainerCall(NamedTuple):
+    """The host-facing settings of one run/create/exec invocation."""
+    command: str                    # "run", "create" or "exec"
+    privileged: bool
+    namespaces: tuple[str, ...]     # host namespaces shared
+    capabilities: tuple[str, ...]   # capabilities added
+    security_opts: tuple[str, ...]
+    devices: tuple[str, ...]
+    mounts: tuple[Mount, ...]
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+def _volume(value: str) -> Mount | None:
+    """Parse a -v/--volume value; None for named and anonymous volumes."""
+    parts = value.split(":")
+    if len(parts) < 2:
+        return None
+    source, target = parts[0], parts[1]
+    if not source.startswith(("/", "~", ".", "$", "`")):
+        return None
+    options = parts[2].split(",") if len(parts) > 2 else []
+    return Mount(source, target, "ro" in options or "readonly" in options)
+
+
+def _mount(value: str) -> Mount | None:
+    """Parse a --mount value; None unless it's a bind mount."""
+    fields = {}
+    for item in value.split(","):
+        key, eq, field = item.partition("=")
+        fields[key.strip().lower()] = field if eq else "true"
+    if fields.get("type") != "bind":
+        return None
+    source = fields.get("source") or fields.get("src") or ""
+    target = fields.get("target") or fields.get("destination") or fields.get("dst") or ""
+    read_only = any(fields.get(key, "false").lower() in ("true", "1") for key in ("readonly", "ro"))
+    return Mount(source, target, read_only) if source else None
+
+
+def _subcommand(argv: tuple[str, ...]) -> tuple[str, list[str]] | None:
+    """Find the run/create/exec subcommand and its arguments, or None."""
+    program, args = argv[0], list(argv[1:])
+    compose = program in COMPOSE_PROGRAMS
+    if not compose and program not in RUNTIMES:
+        return None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith("-"):
+            with_value = COMPOSE_OPTIONS_WITH_VALUE if compose else GLOBAL_OPTIONS_WITH_VALUE
+            i += 2 if arg in with_value else 1
+        elif arg == "compose" and not compose:
+            compose = True
+            i += 1
+        elif arg == "container" and not compose:
+            i += 1
+        elif arg in CONTAINER_COMMANDS:
+            return arg, args[i + 1:]
+        else:
+            return None
+    return None
+
+
+def parse_container_call(argv: tuple[str, ...]) -> ContainerCall | None:
+    """
+    Parse a runtime invocation into its host-facing settings, or None if
+    it doesn't start or enter a container. Options end at the image (or
+    container or service) name; what follows runs inside the container.
+    """
+    found = _subcommand(argv)
+    if found is None:
+        return None
+    command, args = found
+    privileged = False
+    namespaces, capabilities, security_opts, devices, mounts = [], [], [], [], []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--" or not arg.startswith("-") or arg == "-":
+            break
+        name, eq, value = arg.partition("=")
+        if not eq and not name.startswith("--") and len(name) > 2 and name[:2] in OPTIONS_WITH_VALUE:
+            # Attached short value: -v/src:/dst
+            name, value = name[:2], name[2:]
+        elif not eq and name in OPTIONS_WITH_VALUE:
+            value = args[i + 1] if i + 1 < len(args) else ""
+            i += 1
+        i += 1
+
+        if name == "--privileged":
+            privileged = value.lower() not in ("false", "0")
+        elif name in NAMESPACE_OPTIONS and value.lower() == "host":
+            namespaces.append(NAMESPACE_OPTIONS[name])
+        elif name == "--cap-add":
+            capabilities.extend(cap.strip().upper().removeprefix("CAP_") for cap in value.split(","))
+        elif name == "--security-opt":
+            security_opts.append(value)
+        elif name in ("--device", "--device-cgroup-rule"):
+            devices.append(value)
+        elif name in ("-v", "--volume"):
+            mounts.append(_volume(value))
+        elif name == "--mount":
+            mounts.append(_mount(value))
+    return ContainerCall(command, privileged, tuple(dict.fromkeys(namespaces)), tuple(capabilities),
+                         tuple(security_opts), tuple(devices), tuple(m for m in mounts if m))
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def _resolve_source(source: str, cwd: str) -> str | None:
+    """Host path of a mount source, or None if it depends on an unknown variable."""
+    for prefix in sorted(CWD_SOURCES, key=len, reverse=True):
+        if source == prefix or source.startswith(prefix + "/"):
+            source = (cwd or ".") + source[len(prefix):]
+            break
+    for home in ("$HOME", "${HOME}"):
+        if source == home or source.startswith(home + "/"):
+            source = "~" + source[len(home):]
+    if "$" in source or "`" in source:
+        return None
+    if not source.startswith(("/", "~")):
+        source = os.path.join(cwd or os.getcwd(), source)
+    return normalize_path(source)
+
+
+def check_mount(mount: Mount, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check one bind mount's source against the runtime socket, home directory
+    and path policy rules. Mounts only ever ask: the container may not use them.
+    Returns: Verdict
+    """
+    path = _resolve_source(mount.source, cwd)
+    if path is None:
+        return ALLOW
+    if path == "/":
+        return Verdict("ask", "mount root filesystem in container", "container.mount.root")
+    if path.endswith(RUNTIME_SOCKETS):
+        return Verdict("ask", f"mount container runtime socket {mount.source} (root on the host)",
+                       "container.mount.socket")
+    home = normalize_path("~")
+    if home == path or home.startswith(path.rstrip("/") + "/"):
+        return Verdict("ask", f"mount home directory in container: {mount.source}", "container.mount.home")
+
+    deadline.check("container mount rules")
+    result = ALLOW
+    if not mount.read_only:
+        decision, message, rule_id = check_path(path, deadline)
+        if decision != "allow":
+            result = Verdict("ask", f"mount {message} writable in container: {mount.source}", rule_id)
+    if result.decision == "allow":
+        # The source may be a credential file, or a directory like Grep's search root
+        decision, message, rule_id = check_read_path(path, deadline)
+        if decision == "allow":
+            decision, message, rule_id = check_read_glob(os.path.join(path, "**"), False, deadline)
+        if decision != "allow":
+            result = Verdict("ask", f"mount {message} in container: {mount.source}", rule_id)
+    return result
+
+
+def check_call(call: ContainerCall, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check the settings of one container invocation; the first risk found asks.
+    Returns: Verdict
+    """
+    if call.privileged:
+        return Verdict("ask", "run privileged container", "container.privileged")
+    if call.namespaces:
+        return Verdict("ask", f"container shares the host's {', '.join(call.namespaces)} namespace",
+                       "container.namespace")
+    risky = [cap for cap in call.capabilities if cap in RISKY_CAPABILITIES]
+    if risky:
+        return Verdict("ask", f"container adds capability {', '.join(risky)}", "container.capability")
+    unconfined = [opt for opt in call.security_opts if opt.lower() in UNCONFINED_OPTIONS]
+    if unconfined:
+        return Verdict("ask", f"container runs without confinement ({', '.join(unconfined)})",
+                       "container.security_opt")
+    if call.devices:
+        return Verdict("ask", f"container gets host device {', '.join(call.devices)}", "container.device")
+    for mount in call.mounts:
+        verdict = check_mount(mount, cwd, deadline)
+        if verdict.decision != "allow":
+            return verdict
+    return ALLOW
+
+
+def check_command(command: str, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check every container invocation in a command; the most severe wins.
+    Returns: Verdict
+    """
+    result = ALLOW
+    for segment in parse_command(command):
+        if not segment.argv:
+            continue
+        call = parse_container_call(segment.argv)
+        if call is None:
+            continue
+        deadline.check("container rules")
+        verdict = check_call(call, cwd, deadline)
+        if SEVERITY[verdict.decision] > SEVERITY[result.decision]:
+            result = verdict
+    return result
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Network egress policy.
+
+Checks the hosts a tool call connects to against the "egress" section of
+config.json: URLs and hosts given to curl, wget, nc, ssh, scp, rsync and
+git remotes in Bash commands, and the WebFetch tool's url. Rules are
+exact hosts or *.domain suffixes, compiled once into host_index's hashed
+table, so each host costs one lookup per label whatever the list size.
+Hosts no rule matches get the configured default ("allow" unless set).
+"""
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from . import host_index
+from .hook_utils import ALLOW, CONFIG_PATH, NO_DEADLINE, SEVERITY, Deadline, Verdict, load_config, parse_command
+from .host_index import HostIndex, HostRule, load_host_index, normalize_host
+
+# =============================================================================
+# HOST SOURCES - Where programs take the hosts they connect to
+# =============================================================================
+# Options whose value is a separate argument, per program
+OPTIONS_WITH_VALUE = {
+    "curl": {"-A", "-b", "-c", "-C", "-d", "-D", "-e", "-E", "-F", "-H", "-K", "-m", "-o", "-r", "-T",
+             "-u", "-U", "-w", "-X", "-Y", "-y", "-z", "--data", "--data-raw", "--data-binary",
+             "--data-urlencode", "--form", "--header", "--output", "--request", "--user", "--user-agent",
+             "--cookie", "--cookie-jar", "--config", "--max-time", "--connect-timeout", "--retry",
+             "--cert", "--key", "--cacert", "--upload-file", "--write-out", "--referer", "--range",
+             "--resolve", "--connect-to", "--output-dir", "--json", "-x", "--proxy", "--url"},
+    "wget": {"-O", "-o", "-a", "-e", "-i", "-P", "-t", "-T", "-U", "-w", "-Q", "--output-document",
+             "--output-file", "--header", "--user-agent", "--post-data", "--post-file", "--user",
+             "--password", "--directory-prefix", "--tries", "--timeout", "--input-file"},
+    "nc": {"-e", "-c", "-g", "-G", "-i", "-I", "-O", "-p", "-q", "-s", "-T", "-V", "-w", "-x", "-X"},
+    "telnet": {"-b", "-e", "-l", "-n"},
+    "ssh": {"-b", "-B", "-c", "-D", "-E", "-e", "-F", "-I", "-i", "-J", "-L", "-l", "-m", "-O", "-o",
+            "-p", "-P", "-Q", "-R", "-S", "-W", "-w"},
+    "scp": {"-c", "-D", "-F", "-i", "-J", "-l", "-o", "-P", "-S", "-X"},
+    "rsync": {"-e", "-f", "-B", "-T", "--rsh", "--filter", "--exclude", "--include", "--port",
+              "--partial-dir", "--temp-dir", "--log-file", "--password-file", "--exclude-from",
+              "--include-from", "--files-from"},
+    "git": {"-b", "-c", "-C", "-o", "--branch", "--depth", "--origin", "--reference", "--separate-git-dir",
+            "--template", "--config", "--upload-pack", "--receive-pack", "--exec", "--filter"},
+}
+OPTIONS_WITH_VALUE["ncat"] = OPTIONS_WITH_VALUE["netcat"] = OPTIONS_WITH_VALUE["nc"]
+OPTIONS_WITH_VALUE["sftp"] = OPTIONS_WITH_VALUE["ssh"] | {"-s"}
+
+# Options whose value is a host (or URL) the program also connects to
+HOST_OPTIONS = {"-x", "--proxy", "-J", "--url"}
+
+# git subcommands whose operands may name a remote
+GIT_REMOTE_COMMANDS = {"clone", "fetch", "pull", "push", "ls-remote", "archive", "remote", "submodule"}
+
+URL = re.compile(r"^[a-z][a-z0-9+.-]*://(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]*)", re.IGNORECASE)
+SCP_LIKE = re.compile(r"^(?:[^@/:]+@)?(\[[^\]]*\]|[^@/:]+):(?!//)")
+BARE_HOST = re.compile(r"^(?:[^@/:]+@)?([a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,})(?::\d+)?(?:[/?#]|$)", re.IGNORECASE)
+SOCAT_ADDRESS = re.compile(r"^(?:tcp|udp|ssl|openssl|sctp)[46]?(?:-connect)?:(\[[^\]]*\]|[^:,]+)", re.IGNORECASE)
+
+# Programs the bash table gates the egress check on (see bash_policy.build_rules)
+EGRESS_PROGRAMS = [
+    (r"\b(curl|wget|nc|ncat|netcat|telnet|socat|ssh|sftp|scp|rsync)\b", "network access"),
+    (r"\bgit\s+(.*\s)?(clone|fetch|pull|push|ls-remote|archive|remote|submodule)\b", "git remote access"),
+]
+
+EGRESS_DECISIONS = ("allow", "ask", "block")
+
+DEFAULT_EGRESS_CONFIG = {
+    "block_hosts": [],
+    "ask_hosts": [],
+    "allow_hosts": [],
+    "default": "allow",
+}
+
+
+def get_egress_config() -> dict:
+    """Egress settings merged over defaults."""
+    config = {**DEFAULT_EGRESS_CONFIG, **load_config().get("egress", {})}
+    if config["default"] not in EGRESS_DECISIONS:
+        config["default"] = "allow"
+    return config
+
+
+def enabled(config: dict | None = None) -> bool:
+    """True if any host rule or a non-allow default is configured."""
+    config = config or get_egress_config()
+    return bool(config["block_hosts"] or config["ask_hosts"] or config["allow_hosts"]) or config["default"] != "allow"
+
+
+def host_files(config: dict) -> list[Path]:
+    """Host list files named in the config (entries containing a "/")."""
+    return [CONFIG_PATH.parent / Path(entry).expanduser()
+            for tier in ("block", "ask", "allow") for entry in config[f"{tier}_hosts"] if "/" in entry]
+
+
+def _expand(entries: list[str]) -> list[str]:
+    """Replace host list files by their lines, skipping blanks and # comments."""
+    hosts = []
+    for entry in entries:
+        if "/" not in entry:
+            hosts.append(entry)
+            continue
+        try:
+            lines = (CONFIG_PATH.parent / Path(entry).expanduser()).read_text().splitlines()
+        except OSError:
+            continue
+        hosts.extend(line.split("#")[0].strip() for line in lines if line.split("#")[0].strip())
+    return hosts
+
+
+def build_rules() -> list[HostRule]:
+    """Collect host rules from config and host list files."""
+    config = get_egress_config()
+    rules = []
+    for tier in ("allow", "block", "ask"):
+        for index, pattern in enumerate(_expand(config[f"{tier}_hosts"])):
+            rules.append(HostRule(f"egress.{tier}.{index}", tier, pattern))
+    return rules
+
+
+@lru_cache(maxsize=1)
+def get_index() -> HostIndex:
+    """Attach to the shared compiled host index, building it if stale."""
+    sources = [Path(__file__).resolve(), CONFIG_PATH, Path(host_index.__file__).resolve(),
+               *host_files(get_egress_config())]
+    return load_host_index("egress", sources, build_rules)
+
+
+# =============================================================================
+# Host extraction
+# =============================================================================
+
+def url_host(value: str, bare: bool = False) -> str:
+    """
+    Host of a URL, user@host:path or (with bare) example.com/path value,
+    or "" if it names none.
+    """
+    for pattern in (URL, SCP_LIKE, BARE_HOST) if bare else (URL, SCP_LIKE):
+        match = pattern.match(value)
+        if match and match.group(1):
+            return normalize_host(match.group(1))
+    return ""
+
+
+def _login_host(value: str) -> str:
+    """Host of a [user@]host[:port] value."""
+    return normalize_host(value.rpartition("@")[2].partition(":")[0])
+
+
+def _split_args(program: str, args: tuple[str, ...]) -> tuple[list[str], list[str]]:
+    """Split arguments into operands and the values of HOST_OPTIONS."""
+    with_value = OPTIONS_WITH_VALUE.get(program, set())
+    operands, hosts = [], []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--":
+            operands.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and len(arg) > 1:
+            name, eq, value = arg.partition("=")
+            if not eq and not name.startswith("--") and len(name) > 2 and name[:2] in with_value:
+                name, value = name[:2], name[2:]
+            elif name in with_value and not eq and i + 1 < len(args):
+                value = args[i + 1]
+                i += 1
+            if name in HOST_OPTIONS and value:
+                hosts.extend(value.split(","))
+        else:
+            operands.append(arg)
+        i += 1
+    return operands, hosts
+
+
+def extract_hosts(command: str) -> list[str]:
+    """Hosts a command connects to, in order, without duplicates."""
+    hosts = []
+    for segment in parse_command(command):
+        if not segment.argv:
+            continue
+        program, args = segment.argv[0], segment.argv[1:]
+        if program == "socat":
+            hosts.extend(normalize_host(m.group(1)) for arg in args if (m := SOCAT_ADDRESS.match(arg)))
+            continue
+        if program not in OPTIONS_WITH_VALUE:
+            continue
+        operands, option_hosts = _split_args(program, args)
+        hosts.extend(url_host(value, bare=True) or _login_host(value) for value in option_hosts)
+
+        if program in ("curl", "wget"):
+            hosts.extend(url_host(operand, bare=True) for operand in operands)
+        elif program in ("nc", "ncat", "netcat", "telnet"):
+            listening = any(re.fullmatch(r"-[a-zA-Z]*l[a-zA-Z]*|--listen", arg) for arg in args)
+            if not listening:
+                hosts.extend(normalize_host(operand) for operand in operands[:1])
+        elif program in ("ssh", "sftp"):
+            hosts.extend(url_host(operand) or _login_host(operand) for operand in operands[:1])
+        elif program in ("scp", "rsync"):
+            hosts.extend(url_host(operand) for operand in operands)
+        elif program == "git" and operands and operands[0] in GIT_REMOTE_COMMANDS:
+            hosts.extend(url_host(operand) for operand in operands[1:])
+    return list(dict.fromkeys(host for host in hosts if host))
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def check_hosts(hosts: list[str], index: HostIndex, default: str = "allow",
+                deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check hosts against an index; the most severe result wins.
+    Returns: Verdict
+    """
+    result = ALLOW
+    for host in hosts:
+        deadline.check("egress rules")
+        rule = index.lookup(host)
+        if rule is None:
+            verdict = Verdict(default, f"network access to unlisted host {host}", "egress.default")
+        elif rule.tier == "allow":
+            continue
+        else:
+            verdict = Verdict(rule.tier, f"network access to {host} (egress rule {rule.pattern})", rule.rule_id)
+        if SEVERITY[verdict.decision] > SEVERITY[result.decision]:
+            result = verdict
+            if result.decision == "block":
+                break
+    return result
+
+
+def check_command(command: str, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check the hosts a Bash command connects to.
+    Returns: Verdict
+    """
+    config = get_egress_config()
+    if not enabled(config):
+        return ALLOW
+    hosts = extract_hosts(command)
+    if not hosts:
+        return ALLOW
+    index = get_index()
+    deadline.check("egress index loading")
+    return check_hosts(hosts, index, config["default"], deadline)
+
+
+def check_tool(tool_name: str, tool_input: dict, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check the host a WebFetch call fetches from.
+    Returns: Verdict
+    """
+    url = tool_input.get("url", "")
+    if tool_name != "WebFetch" or not url or not isinstance(url, str):
+        return ALLOW
+    config = get_egress_config()
+    if not enabled(config):
+        return ALLOW
+    host = url_host(url.strip(), bare=True)
+    if not host:
+        return ALLOW
+    index = get_index()
+    deadline.check("egress index loading")
+    return check_hosts([host], index, config["default"], deadline)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+In-process policy evaluation.
+
+evaluate() returns the decision Claude Code would reach from every hook
+registered for a tool, without spawning the hook scripts: policies run in
+hooks.json order, the most severe verdict wins and a block stops the rest.
+Policy modules are imported on first use and keep their compiled tables
+and config between calls, so a long-running caller pays setup once.
+Given a session_id, warn and ask verdicts are counted per session and
+escalated when they burst (see burst_counter); an ask the user approved
+before in the project is relaxed to a warning first, if learned
+approvals are enabled (see approvals). Hook scripts also pass
+shadow=True so a configured candidate policy is checked alongside (see
+shadow).
+
+    from safety_hooks import evaluate
+
+    decision = evaluate("Bash", {"command": "git push --force"}, cwd="/repo")
+    decision.tier, decision.rule_id, decision.message
+"""
+import importlib
+import time
+from typing import NamedTuple
+
+from .burst_counter import escalate
+from .hook_utils import ALLOW, NO_DEADLINE, SEVERITY, Deadline, DeadlineExceeded, Verdict, deadline_verdict
+
+# Policy name -> (module, tools it checks), in hooks.json order
+POLICIES = {
+    "bash": ("bash_policy", ("Bash",)),
+    "git": ("git_policy", ("Bash",)),
+    "file": ("file_policy", ("Write", "Edit")),
+    "read": ("read_policy", ("Read", "Grep", "Glob")),
+    "egress": ("egress_policy", ("WebFetch",)),
+}
+
+
+class Decision(NamedTuple):
+    """Combined outcome of every policy that checks a tool call."""
+    tier: str                   # "block", "ask", "warn" or "allow"
+    rule_id: str                # rule behind the tier ("" when allowed)
+    message: str
+    policy: str                 # policy that decided ("" when allowed)
+    timings: dict[str, float]   # seconds spent in each policy that ran
+
+
+def policy_module(policy: str):
+    """Import a policy's module."""
+    return importlib.import_module(f".{POLICIES[policy][0]}", __package__)
+
+
+def check(policy: str, tool_name: str, tool_input: dict, cwd: str = "",
+          deadline: Deadline = NO_DEADLINE, session_id: str = "", shadow: bool = False) -> Verdict:
+    """
+    Run one policy on a tool call, as its hook script does.
+    Given a session_id, a rule's ask is noted for learning on approval.
+    With shadow, the configured candidate policy is also checked and logged;
+    its result never changes the returned verdict.
+    Raises DeadlineExceeded if the deadline passes between stages.
+    """
+    if tool_name not in POLICIES[policy][1]:
+        return ALLOW
+    start = time.perf_counter()
+    verdict = policy_module(policy).check_tool(tool_name, tool_input, cwd, deadline)
+    if shadow:
+        # Imported here so hooks without a shadow section load nothing more
+        from .shadow import observe
+        observe(policy, tool_name, tool_input, cwd, verdict, time.perf_counter() - start, deadline, session_id)
+    if verdict.decision == "ask":
+        # Imported here so allowed calls load nothing more
+        from .approvals import consult
+        verdict = consult(verdict, tool_name, tool_input, cwd, session_id)
+    return escalate(verdict, session_id) if session_id else verdict
+
+
+def evaluate(tool_name: str, tool_input: dict, cwd: str = "",
+             deadline: Deadline = NO_DEADLINE, session_id: str = "") -> Decision:
+    """
+    Evaluate a tool call against every policy registered for the tool.
+    cwd resolves relative paths and is where git runs. A spent deadline
+    yields its fail-safe decision with rule ID "deadline" instead of raising.
+    session_id turns on burst escalation for the session.
+    """
+    result = ALLOW
+    decided_by = ""
+    timings = {}
+    for policy, (_, tools) in POLICIES.items():
+        if tool_name not in tools:
+            continue
+        start = time.perf_counter()
+        try:
+            verdict = check(policy, tool_name, tool_input, cwd, deadline, session_id)
+            spent = False
+        except DeadlineExceeded as exc:
+            verdict = deadline_verdict(deadline, exc)
+            spent = True
+        timings[policy] = time.perf_counter() - start
+        if SEVERITY[verdict.decision] > SEVERITY[result.decision]:
+            result, decided_by = verdict, policy
+        if spent or result.decision == "block":
+            break
+    return Decision(result.decision, result.rule_id, result.message, decided_by, timings)
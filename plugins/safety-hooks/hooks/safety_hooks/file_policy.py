@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Write/Edit policy.
+Protects sensitive file paths from modification (rules in path_policy.py,
+shared with the Bash policy), and asks before writing content that looks
+like it contains a secret (API keys, private key blocks, tokens).
+"""
+from .hook_utils import ALLOW, NO_DEADLINE, Deadline, Verdict, load_config
+from .path_policy import check_path
+from .secret_scanner import MAX_SCAN_BYTES, MAX_SCAN_SECONDS, scan_text
+
+# Tool input fields holding the text being written
+CONTENT_FIELDS = {"Write": "content", "Edit": "new_string"}
+
+
+def get_scan_config() -> dict:
+    """Get secret scan config with defaults."""
+    scan_config = load_config().get("file_safety", {}).get("secret_scan", {})
+    return {
+        "enabled": scan_config.get("enabled", True),
+        "max_bytes": scan_config.get("max_bytes", MAX_SCAN_BYTES),
+        "max_seconds": scan_config.get("max_seconds", MAX_SCAN_SECONDS),
+    }
+
+
+def check_content(content: str, scan_config: dict, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check content being written for secrets.
+    The scan stops at its own time budget or the deadline, whichever is
+    sooner; running into the deadline raises DeadlineExceeded.
+    Returns: Verdict
+    """
+    deadline.check("secret scan")
+    finding = scan_text(content, scan_config["max_bytes"],
+                        min(scan_config["max_seconds"], deadline.remaining()))
+    if finding:
+        return Verdict("ask", f"{finding.description} on line {finding.line} ({finding.detector})",
+                       f"secret.{finding.detector}")
+    deadline.check("secret scan")
+    return ALLOW
+
+
+def check_tool(tool_name: str, tool_input: dict, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check a Write/Edit call: its path, then the content it writes.
+    Content verdicts carry rule IDs starting with "secret.".
+    Returns: Verdict
+    """
+    file_path = tool_input.get("file_path", "")
+    if tool_name not in CONTENT_FIELDS or not file_path or not isinstance(file_path, str):
+        return ALLOW
+
+    verdict = check_path(file_path, deadline)
+    if verdict.decision != "allow":
+        return verdict
+
+    scan_config = get_scan_config()
+    content = tool_input.get(CONTENT_FIELDS[tool_name], "")
+    if scan_config["enabled"] and isinstance(content, str) and content:
+        return check_content(content, scan_config, deadline)
+    return ALLOW
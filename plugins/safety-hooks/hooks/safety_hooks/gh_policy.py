@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+GitHub CLI policy.
+
+Each `gh` invocation is parsed once into its command path (`pr merge`,
+`api`), flags and operands, and dispatched through CHECKS, a table of
+per-command checks; commands without an entry are allowed. Asks for
+confirmation when:
+  - Merging a PR (with --admin: bypassing branch protection)
+  - Retargeting a PR onto a protected branch (`gh pr edit --base main`)
+  - Deleting, archiving or publishing a repository
+  - Deleting a release or release asset
+  - Setting or deleting a secret
+  - Running a workflow that looks like a production deploy
+  - `gh api` calls that delete, that write to a protected branch, or
+    that run a GraphQL mutation
+"""
+import re
+from typing import Callable, NamedTuple
+
+from .hook_utils import ALLOW, Verdict
+
+# =============================================================================
+# CLI SHAPE - Command paths and flags that take a value
+# =============================================================================
+# Top-level commands that take no subcommand
+LEAF_COMMANDS = {"api", "browse", "status"}
+
+# Short flags, per command path; "-R" means --repo everywhere
+SHORT_FLAGS = {
+    (): {"-R": "--repo"},
+    ("api",): {"-X": "--method", "-f": "--raw-field", "-F": "--field", "-H": "--header",
+               "-q": "--jq", "-t": "--template", "-p": "--preview", "-i": "--include"},
+    ("pr", "create"): {"-B": "--base", "-b": "--body", "-F": "--body-file", "-t": "--title", "-H": "--head",
+                       "-a": "--assignee", "-l": "--label", "-m": "--milestone", "-p": "--project",
+                       "-r": "--reviewer", "-d": "--draft", "-f": "--fill", "-w": "--web"},
+    ("pr", "edit"): {"-B": "--base", "-b": "--body", "-F": "--body-file", "-t": "--title",
+                     "-m": "--milestone"},
+    ("pr", "merge"): {"-b": "--body", "-F": "--body-file", "-t": "--subject", "-A": "--author-email",
+                      "-d": "--delete-branch", "-m": "--merge", "-r": "--rebase", "-s": "--squash"},
+    ("secret", "set"): {"-b": "--body", "-e": "--env", "-o": "--org", "-a": "--app", "-v": "--visibility",
+                        "-r": "--repos", "-f": "--env-file", "-u": "--user"},
+    ("secret", "delete"): {"-e": "--env", "-o": "--org", "-a": "--app", "-u": "--user"},
+    ("workflow", "run"): {"-r": "--ref", "-f": "--raw-field", "-F": "--field", "-j": "--json"},
+}
+
+# Long flags that take a value (as --flag value or --flag=value)
+FLAGS_WITH_VALUE = {
+    "--repo", "--hostname", "--method", "--raw-field", "--field", "--header", "--jq", "--template",
+    "--preview", "--input", "--cache", "--base", "--body", "--body-file", "--title", "--head",
+    "--assignee", "--label", "--milestone", "--project", "--reviewer", "--subject", "--author-email",
+    "--match-head-commit", "--env", "--org", "--app", "--visibility", "--repos", "--env-file",
+    "--ref", "--add-label", "--remove-label", "--add-reviewer", "--remove-reviewer", "--add-assignee",
+    "--remove-assignee", "--add-project", "--remove-project",
+}
+
+# =============================================================================
+# RISKY TARGETS
+# =============================================================================
+# Workflow names or inputs that look like a production deploy
+PRODUCTION = re.compile(r"prod|deploy|release|publish", re.IGNORECASE)
+
+# REST endpoints that write a branch (groups: branch name)
+BRANCH_ENDPOINT = re.compile(r"/(?:branches|git/refs/heads)/([^/?]+)")
+
+# Fields that make `gh api` default to POST
+BODY_FLAGS = ("--raw-field", "--field", "--input")
+
+
+class GhCall(NamedTuple):
+    """A parsed gh invocation."""
+    command: tuple[str, ...]        # command path, e.g. ("pr", "merge") or ("api",)
+    flags: dict[str, list[str]]     # long flag name -> values ("" for a switch)
+    operands: tuple[str, ...]
+
+    def flag(self, name: str) -> str | None:
+        """Last value of a flag, or None if not given."""
+        values = self.flags.get(name)
+        return values[-1] if values else None
+
+    def switch(self, name: str) -> bool:
+        """True if a boolean flag is set."""
+        value = self.flag(name)
+        return value is not None and value.lower() not in ("false", "0")
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+def _flags(arg: str, command: tuple[str, ...]) -> list[tuple[str, str | None]]:
+    """
+    (long name, attached value or None) of each flag in an argument;
+    grouped short switches (-sd) yield one entry each.
+    """
+    if arg.startswith("--"):
+        name, eq, value = arg.partition("=")
+        return [(name, value if eq else None)]
+    shorts = {**SHORT_FLAGS[()], **SHORT_FLAGS.get(command, {})}
+    flags = []
+    for i in range(1, len(arg)):
+        name = shorts.get(f"-{arg[i]}", f"-{arg[i]}")
+        if name in FLAGS_WITH_VALUE:
+            rest = arg[i + 1:].removeprefix("=")
+            flags.append((name, rest or None))
+            break
+        flags.append((name, None))
+    return flags
+
+
+def parse_gh_call(argv: tuple[str, ...]) -> GhCall | None:
+    """
+    Parse a gh invocation, or None if argv isn't one. Flags may come
+    before, between or after the command words, as cobra allows.
+    """
+    if not argv or argv[0] != "gh":
+        return None
+    args = argv[1:]
+    words, flags, operands = [], {}, []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if arg == "--":
+            operands.extend(args[i:])
+            break
+        depth = 1 if words[:1] and words[0] in LEAF_COMMANDS else 2
+        if arg.startswith("-") and arg != "-":
+            for name, value in _flags(arg, tuple(words)):
+                if value is None and name in FLAGS_WITH_VALUE:
+                    value = args[i] if i < len(args) else ""
+                    i += 1
+                flags.setdefault(name, []).append("" if value is None else value)
+        elif len(words) < depth:
+            words.append(arg)
+        else:
+            operands.append(arg)
+    if not words:
+        return None
+    return GhCall(tuple(words), flags, tuple(operands))
+
+
+# =============================================================================
+# Checks - one per command path
+# =============================================================================
+
+def _target(call: GhCall) -> str:
+    """What a command acts on, for messages: its first operand or --repo."""
+    target = call.operands[0] if call.operands else call.flag("--repo")
+    return f" '{target}'" if target else ""
+
+
+def _always(message: str, rule_id: str) -> Callable[[GhCall, dict], Verdict]:
+    """A check that asks whenever its command runs."""
+    def check(call: GhCall, config: dict) -> Verdict:
+        return Verdict("ask", f"{message}{_target(call)}", rule_id)
+    return check
+
+
+def check_pr_merge(call: GhCall, config: dict) -> Verdict:
+    """Merging a PR lands it on its base branch; --admin skips the branch's rules."""
+    if call.switch("--admin"):
+        return Verdict("ask", "merging PR with --admin (bypasses branch protection)", "gh.pr.merge.admin")
+    return Verdict("ask", "merging PR to target branch", "git.pr_merge")
+
+
+def check_pr_base(call: GhCall, config: dict) -> Verdict:
+    """Retargeting an existing PR onto a protected branch."""
+    base = call.flag("--base")
+    if base in config["protected_branches"]:
+        return Verdict("ask", f"retargeting PR onto '{base}' branch", "gh.pr.base")
+    return ALLOW
+
+
+def check_repo_edit(call: GhCall, config: dict) -> Verdict:
+    """Publishing a repository."""
+    if (call.flag("--visibility") or "").lower() == "public":
+        return Verdict("ask", f"making repository{_target(call)} public", "gh.repo.visibility")
+    return ALLOW
+
+
+def check_workflow_run(call: GhCall, config: dict) -> Verdict:
+    """Dispatching a workflow whose name or inputs look like a production deploy."""
+    inputs = call.flags.get("--field", []) + call.flags.get("--raw-field", [])
+    if any(PRODUCTION.search(value) for value in (*call.operands[:1], *inputs)):
+        ref = call.flag("--ref")
+        on = f" on '{ref}'" if ref else ""
+        return Verdict("ask", f"running production workflow{_target(call)}{on}", "gh.workflow.run")
+    return ALLOW
+
+
+def check_api(call: GhCall, config: dict) -> Verdict:
+    """Raw API calls that delete, write a protected branch, or mutate through GraphQL."""
+    endpoint = call.operands[0] if call.operands else ""
+    default = "POST" if any(flag in call.flags for flag in BODY_FLAGS) else "GET"
+    method = (call.flag("--method") or default).upper()
+    if endpoint == "graphql":
+        fields = call.flags.get("--field", []) + call.flags.get("--raw-field", [])
+        if any(re.match(r"query=\s*mutation\b", field) for field in fields):
+            return Verdict("ask", "GitHub GraphQL mutation", "gh.api.mutation")
+        return ALLOW
+    if method == "GET":
+        return ALLOW
+    if method == "DELETE":
+        return Verdict("ask", f"GitHub API DELETE {endpoint}", "gh.api.delete")
+    match = BRANCH_ENDPOINT.search(endpoint)
+    if match and match.group(1) in config["protected_branches"]:
+        return Verdict("ask", f"changing '{match.group(1)}' branch through the GitHub API ({method} {endpoint})",
+                       "gh.api.protected_branch")
+    return ALLOW
+
+
+# Command path -> check(call, git protection config)
+CHECKS: dict[tuple[str, ...], Callable[[GhCall, dict], Verdict]] = {
+    ("pr", "merge"): check_pr_merge,
+    ("pr", "edit"): check_pr_base,
+    ("repo", "delete"): _always("deleting repository", "gh.repo.delete"),
+    ("repo", "archive"): _always("archiving repository", "gh.repo.archive"),
+    ("repo", "edit"): check_repo_edit,
+    ("release", "delete"): _always("deleting release", "gh.release.delete"),
+    ("release", "delete-asset"): _always("deleting release asset from", "gh.release.delete"),
+    ("secret", "set"): _always("setting secret", "gh.secret.set"),
+    ("secret", "delete"): _always("deleting secret", "gh.secret.delete"),
+    ("workflow", "run"): check_workflow_run,
+    ("api",): check_api,
+}
+
+
+def check_call(argv: tuple[str, ...], config: dict) -> Verdict:
+    """
+    Check one simple command's argv if it runs gh.
+    Returns: Verdict
+    """
+    call = parse_gh_call(argv)
+    check = CHECKS.get(call.command) if call else None
+    return check(call, config) if check else ALLOW
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Git branch protection policy.
+Prevents committing directly to main/master, merging without approval,
+and deleting release tags.
+
+Asks for user confirmation when:
+  - Committing while on main/master branch
+  - Pushing to main/master branch
+  - Merging into main/master branch
+  - Deleting release tags (v*, release-*)
+  - Risky gh commands: merging PRs, deleting repositories or releases,
+    setting secrets, raw API writes (see gh_policy)
+
+Compound commands are walked segment by segment from a single read of the
+current branch: `git checkout`/`git switch` move the simulated branch,
+`git worktree add` records the branch of a new worktree, and `cd` or
+`git -C` select which worktree later segments run in. So
+`git checkout main && git commit -am x` asks even when run from a
+feature branch. The branch read is cached per directory until HEAD
+changes (see repo_state).
+"""
+import os
+import re
+import subprocess
+
+from . import gh_policy, repo_state
+from .hook_utils import (
+    ALLOW,
+    NO_DEADLINE,
+    Deadline,
+    DeadlineExceeded,
+    Verdict,
+    Segment,
+    normalize_command,
+    load_config,
+    parse_command,
+    render_segment,
+)
+
+# Default protected branches (can be overridden in config)
+DEFAULT_PROTECTED_BRANCHES = ["main", "master"]
+DEFAULT_PROTECTED_TAG_PREFIXES = ["v", "release-"]
+
+# Upper bound for the git subprocess; the invocation deadline may cut it shorter
+GIT_TIMEOUT = 5
+
+# =============================================================================
+# BRANCH SIMULATION - How segments of a compound command move HEAD
+# =============================================================================
+# git options before the subcommand that take a separate value
+GIT_GLOBAL_OPTIONS_WITH_VALUE = {"-C", "-c", "--git-dir", "--work-tree", "--namespace", "--config-env"}
+
+# Options naming a branch to create and switch to, per subcommand
+CREATE_OPTIONS = {
+    "checkout": {"-b", "-B", "--orphan"},
+    "switch": {"-c", "-C", "--create", "--force-create", "--orphan"},
+    "worktree": {"-b", "-B", "--orphan"},
+}
+DETACH_OPTIONS = {
+    "checkout": {"--detach"},
+    "switch": {"-d", "--detach"},
+    "worktree": {"--detach"},
+}
+# Other options that take a separate value
+OPTIONS_WITH_VALUE = {
+    "checkout": set(),
+    "switch": set(),
+    "worktree": {"--reason"},
+}
+
+# Segments that need the branch they run on
+BRANCH_CHECKED = re.compile(r"\bgit\s+(commit|push|merge)\b", re.IGNORECASE)
+
+# A gh command inside a string argument
+GH_IN_STRING = re.compile(r"(?:^|[\s;&|(`])gh\s")
+
+# Simulated branch of a detached HEAD, as `git rev-parse --abbrev-ref` reports it
+DETACHED = "HEAD"
+
+# Branch state not yet known: the branch read from git when first needed
+UNREAD = object()
+
+
+def get_config():
+    """Get git protection config with defaults."""
+    config = load_config()
+    git_config = config.get("git_protection", {})
+    return {
+        "protected_branches": git_config.get("protected_branches", DEFAULT_PROTECTED_BRANCHES),
+        "protected_tag_prefixes": git_config.get("protected_tag_prefixes", DEFAULT_PROTECTED_TAG_PREFIXES),
+        "ask_on_merge_to_protected": git_config.get("ask_on_merge_to_protected", True),
+        "ask_on_tag_delete": git_config.get("ask_on_tag_delete", True),
+    }
+
+
+def get_current_branch(deadline: Deadline = NO_DEADLINE, cwd: str = "", cached: bool = True) -> str | None:
+    """
+    Get the current git branch name in cwd (default: the process's working
+    directory), or None if not in a git repo. Served from the repo state
+    cache while the repository's HEAD is unchanged (see repo_state); with
+    cached=False git is always asked and the cache refreshed.
+    Raises DeadlineExceeded if git doesn't answer within the deadline.
+    """
+    deadline.check("git branch lookup")
+    directory = cwd or os.getcwd()
+    if cached:
+        state = repo_state.lookup(directory)
+        if state is not None:
+            return state.branch
+    # Stat HEAD before asking git, so a checkout racing the read leaves a stale signature
+    state = repo_state.probe(directory)
+    timeout = min(GIT_TIMEOUT, deadline.remaining())
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=cwd or None,
+        )
+        if result.returncode == 0:
+            branch = result.stdout.strip()
+            if state is not None:
+                repo_state.store(directory, state._replace(branch=branch))
+            return branch
+    except subprocess.TimeoutExpired:
+        if timeout < GIT_TIMEOUT:
+            raise DeadlineExceeded("git branch lookup")
+    except FileNotFoundError:
+        pass
+    return None
+
+
+# =============================================================================
+# Branch simulation
+# =============================================================================
+
+def _join(directory: str | None, path: str) -> str | None:
+    """Directory reached from directory by path, or None if it can't be known."""
+    if not path or path == "-" or "$" in path or "`" in path:
+        return None
+    path = os.path.expanduser(path)
+    if directory is None and not os.path.isabs(path):
+        return None
+    return os.path.normpath(os.path.join(directory or "", path))
+
+
+def _parse_switch(subcommand: str, args: list[str]) -> tuple[str | None, bool, list[str]]:
+    """Split checkout/switch/worktree-add args into (created branch, detach, operands)."""
+    created, detach, operands = None, False, []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        name, eq, value = arg.partition("=")
+        if arg == "--":
+            operands.append(arg)
+            operands.extend(args[i + 1:])
+            break
+        if name in CREATE_OPTIONS[subcommand]:
+            if not eq and i + 1 < len(args):
+                value = args[i + 1]
+                i += 1
+            created = value or created
+        elif arg in DETACH_OPTIONS[subcommand]:
+            detach = True
+        elif arg in OPTIONS_WITH_VALUE[subcommand]:
+            i += 1
+        elif not arg.startswith("-") or arg == "-":
+            operands.append(arg)
+        i += 1
+    return created, detach, operands
+
+
+class BranchSimulation:
+    """
+    Simulated HEAD of each worktree while walking a compound command.
+    The real branch is read from git at most once, the first time a
+    segment needs the branch of a worktree no segment has switched.
+    """
+
+    def __init__(self, config: dict, deadline: Deadline = NO_DEADLINE, cwd: str = ""):
+        self.config = config
+        self.deadline = deadline
+        self.cwd = cwd
+        self.home = os.path.abspath(cwd or ".")
+        self.directory = self.home
+        self.branches = {}
+        self.previous = {}
+        self._initial = UNREAD
+
+    def initial_branch(self) -> str | None:
+        """The branch checked out before the command runs (one git call)."""
+        if self._initial is UNREAD:
+            self._initial = get_current_branch(self.deadline, self.cwd)
+        return self._initial
+
+    def worktree(self, directory: str | None) -> str:
+        """
+        Worktree a directory belongs to: the nearest enclosing worktree the
+        command added, else the one the command started in.
+        """
+        path = directory
+        while path:
+            if path in self.branches:
+                return path
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return self.home
+
+    def branch(self, directory: str | None) -> str | None:
+        """Simulated branch of the worktree containing directory."""
+        branch = self.branches.get(self.worktree(directory), UNREAD)
+        return self.initial_branch() if branch is UNREAD else branch
+
+    def switch(self, directory: str | None, branch: str):
+        """Move the worktree containing directory to branch ("-" for the previous one)."""
+        key = self.worktree(directory)
+        current = self.branches.get(key, UNREAD)
+        if branch == "-":
+            branch = self.previous.get(key, UNREAD)
+        self.previous[key] = current
+        if branch is UNREAD:
+            self.branches.pop(key, None)
+        else:
+            self.branches[key] = branch
+
+    def _checkout(self, subcommand: str, args: list[str], directory: str | None):
+        """Apply a checkout or switch; path checkouts leave HEAD alone."""
+        created, detach, operands = _parse_switch(subcommand, args)
+        if created:
+            self.switch(directory, created)
+        elif detach:
+            self.switch(directory, DETACHED)
+        elif len(operands) == 1:
+            target = operands[0]
+            if subcommand == "checkout" and target not in self.config["protected_branches"] and target != "-":
+                # git checkout <name> restores a file when no such branch exists
+                if os.path.exists(_join(directory or self.home, target) or ""):
+                    return
+            self.switch(directory, target)
+
+    def _add_worktree(self, args: list[str], directory: str | None):
+        """Record the branch a `git worktree add` checks out in its new directory."""
+        created, detach, operands = _parse_switch("worktree", args)
+        operands = [operand for operand in operands if operand != "--"]
+        path = _join(directory or self.home, operands[0]) if operands else None
+        if path is None:
+            return
+        if detach:
+            self.branches[path] = DETACHED
+        else:
+            self.branches[path] = created or (operands[1] if len(operands) > 1 else os.path.basename(path))
+
+    def _git_args(self, args: tuple[str, ...]) -> tuple[str | None, list[str]]:
+        """Split git's arguments into the directory it runs in and the subcommand onward."""
+        directory = self.directory
+        i = 0
+        while i < len(args) and args[i].startswith("-"):
+            name, eq, value = args[i].partition("=")
+            if name in GIT_GLOBAL_OPTIONS_WITH_VALUE and not eq:
+                value = args[i + 1] if i + 1 < len(args) else ""
+                i += 1
+            if name in ("-C", "--work-tree"):
+                directory = _join(directory, value)
+            i += 1
+        return directory, list(args[i:])
+
+    def step(self, segment: Segment) -> Verdict:
+        """Check one segment against its simulated branch, then apply its effect."""
+        if not segment.argv:
+            return ALLOW
+        program, args = segment.argv[0], segment.argv[1:]
+        if program in ("cd", "pushd"):
+            operands = [arg for arg in args if not arg.startswith("-") or arg == "-"]
+            self.directory = _join(self.directory, operands[0] if operands else "~")
+            return ALLOW
+
+        if program == "gh":
+            return gh_policy.check_call(segment.argv, self.config)
+        if program != "git" and "gh" in args:
+            # Run by another program: xargs gh ..., find -exec gh ..., ssh host gh ...
+            verdict = gh_policy.check_call(args[args.index("gh"):], self.config)
+            if verdict.decision != "allow":
+                return verdict
+        for arg in args:
+            if GH_IN_STRING.search(arg):
+                # A string another program runs: bash -c "gh ...", ssh host 'gh ...'
+                directory = self.directory
+                verdict = self.run(arg)
+                self.directory = directory
+                if verdict.decision != "allow":
+                    return verdict
+
+        directory, git_args = self.directory, []
+        text = render_segment(segment)
+        if program == "git":
+            directory, git_args = self._git_args(args)
+            text = render_segment(segment._replace(argv=("git", *git_args)))
+
+        if BRANCH_CHECKED.search(text):
+            branch = self.branch(directory)
+            for checker in (check_commit_on_protected_branch, check_push_to_protected_branch,
+                            check_merge_to_protected_branch):
+                verdict = checker(text, branch, self.config)
+                if verdict.decision != "allow":
+                    return verdict
+
+        if git_args[:1] in (["checkout"], ["switch"]):
+            self._checkout(git_args[0], git_args[1:], directory)
+        elif git_args[:2] == ["worktree", "add"]:
+            self._add_worktree(git_args[2:], directory)
+        return ALLOW
+
+    def run(self, command: str) -> Verdict:
+        """Walk a command's segments (and heredoc bodies) in order."""
+        for segment in parse_command(command):
+            self.deadline.check("branch simulation")
+            verdict = self.step(segment)
+            if verdict.decision != "allow":
+                return verdict
+            for body in segment.heredocs:
+                directory = self.directory
+                verdict = self.run(body)
+                self.directory = directory
+                if verdict.decision != "allow":
+                    return verdict
+        return ALLOW
+
+
+def check_commit_on_protected_branch(command: str, current_branch: str | None, config: dict) -> Verdict:
+    """Check if this is a commit on a protected branch."""
+    if not re.search(r"\bgit\s+commit\b", command, re.IGNORECASE):
+        return ALLOW
+
+    protected = config["protected_branches"]
+    if current_branch in protected:
+        return Verdict("ask", f"committing directly to '{current_branch}' branch", "git.commit")
+
+    return ALLOW
+
+
+def check_push_to_protected_branch(command: str, current_branch: str | None, config: dict) -> Verdict:
+    """Check if pushing to a protected branch."""
+    push_match = re.search(r"\bgit\s+push\b(.*)$", command, re.IGNORECASE)
+    if not push_match:
+        return ALLOW
+
+    push_args = push_match.group(1).strip()
+    protected = config["protected_branches"]
+
+    # Check for explicit push to protected branch: git push origin main
+    for branch in protected:
+        if re.search(rf"\b{re.escape(branch)}\b", push_args):
+            return Verdict("ask", f"pushing to '{branch}' branch", "git.push")
+
+    # Check for push without explicit branch (uses current branch)
+    if not push_args or re.match(r"^(-[a-zA-Z]+\s+)*\w+$", push_args):
+        if current_branch in protected:
+            return Verdict("ask", f"pushing to '{current_branch}' branch (current branch)", "git.push")
+
+    return ALLOW
+
+
+def check_merge_to_protected_branch(command: str, current_branch: str | None, config: dict) -> Verdict:
+    """Check if merging into a protected branch."""
+    if not config.get("ask_on_merge_to_protected", True):
+        return ALLOW
+
+    # Check for git merge command
+    if not re.search(r"\bgit\s+merge\b", command, re.IGNORECASE):
+        return ALLOW
+
+    protected = config["protected_branches"]
+
+    # If we're on a protected branch and merging something into it
+    if current_branch in protected:
+        return Verdict("ask", f"merging into '{current_branch}' branch", "git.merge")
+
+    return ALLOW
+
+
+def check_tag_delete(command: str, config: dict) -> Verdict:
+    """Check if deleting a release tag."""
+    if not config.get("ask_on_tag_delete", True):
+        return ALLOW
+
+    # Check for git tag -d or git tag --delete
+    tag_delete_match = re.search(r"\bgit\s+tag\s+.*(-d|--delete)\s+(.+)", command, re.IGNORECASE)
+    if not tag_delete_match:
+        # Also check: git push origin --delete tag-name (for remote tag deletion)
+        push_delete_match = re.search(r"\bgit\s+push\s+\w+\s+--delete\s+(.+)", command, re.IGNORECASE)
+        if not push_delete_match:
+            # Also check: git push origin :refs/tags/tag-name
+            push_ref_match = re.search(r"\bgit\s+push\s+\w+\s+:refs/tags/(.+)", command, re.IGNORECASE)
+            if not push_ref_match:
+                return ALLOW
+            tag_name = push_ref_match.group(1).strip()
+        else:
+            tag_name = push_delete_match.group(1).strip()
+    else:
+        tag_name = tag_delete_match.group(2).strip()
+
+    # Check if tag matches protected prefixes
+    protected_prefixes = config["protected_tag_prefixes"]
+    for prefix in protected_prefixes:
+        if tag_name.startswith(prefix):
+            return Verdict("ask", f"deleting release tag '{tag_name}'", "git.tag_delete")
+
+    return ALLOW
+
+
+def check_command(command: str, deadline: Deadline = NO_DEADLINE, cwd: str = "") -> Verdict:
+    """
+    Check command for protected branch operations; git runs in cwd.
+    Raises DeadlineExceeded if the deadline passes between stages.
+    Returns: Verdict
+    """
+    command = normalize_command(command)
+
+    # Early exit: skip git subprocess for non-git commands
+    if not re.search(r"\b(git|gh)\b", command, re.IGNORECASE):
+        return ALLOW
+
+    config = get_config()
+    deadline.check("config loading")
+
+    # Check tag deletion
+    verdict = check_tag_delete(command, config)
+    if verdict.decision != "allow":
+        return verdict
+
+    # Check commit, push, and merge per segment against the simulated branch
+    # (at most one git call), and gh segments against the gh table
+    return BranchSimulation(config, deadline, cwd).run(command)
+
+
+def check_tool(tool_name: str, tool_input: dict, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check a Bash call's command.
+    Returns: Verdict
+    """
+    command = tool_input.get("command", "")
+    if tool_name != "Bash" or not command or not isinstance(command, str):
+        return ALLOW
+    return check_command(command, deadline, cwd)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Glob intersection without touching the filesystem.
+
+Decides whether any path matched by a glob could also be matched by a
+protected pattern. Both sides are lists of path components; a component is
+an fnmatch pattern (*, ?, [...]) or ** for any number of components. The
+test walks the two component lists together, and two components intersect
+if some name matches both, decided by walking their characters the same way.
+
+Globs follow shell semantics: wildcards don't match a leading dot, so
+`/repo/**/*.py` never reaches `.ssh`, while `~/.*/**` and `/home/*/.ssh/*` do.
+Protected globs are translated from the path policy's regexes and match
+dot names freely. Matching is case-insensitive, like the regexes.
+"""
+import os
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Upper bound on alternatives from brace or regex expansion
+MAX_EXPANSIONS = 64
+
+# Character sets are (negated, chars); ANY matches every character
+ANY = (True, frozenset())
+NOT_DOT = (True, frozenset("."))
+
+RECURSIVE = "**"
+
+
+# =============================================================================
+# Globs
+# =============================================================================
+
+def expand_braces(pattern: str) -> list[str]:
+    """Expand {a,b} alternatives, innermost first; unbalanced braces stay literal."""
+    results = [pattern]
+    expanded = []
+    while results and len(results) + len(expanded) <= MAX_EXPANSIONS:
+        current = results.pop()
+        close = current.find("}")
+        open_ = current.rfind("{", 0, close) if close >= 0 else -1
+        if open_ < 0:
+            expanded.append(current)
+            continue
+        head, body, tail = current[:open_], current[open_ + 1:close], current[close + 1:]
+        results.extend(head + option + tail for option in body.split(","))
+    return list(dict.fromkeys(expanded + results))
+
+
+def glob_components(pattern: str) -> list[tuple[str, ...]]:
+    """Split an absolute glob into component tuples, one per brace expansion."""
+    globs = []
+    for expanded in expand_braces(pattern):
+        parts = os.path.normpath(expanded).lower().split("/")
+        globs.append(tuple(part for part in parts if part))
+    return globs
+
+
+def literal_base(glob: tuple[str, ...]) -> str:
+    """The directory before a glob's first wildcard component, with a trailing slash."""
+    parts = []
+    for part in glob:
+        if any(char in part for char in "*?["):
+            break
+        parts.append(part)
+    return "/" + "".join(part + "/" for part in parts)
+
+
+def _char_set(component: str, i: int) -> tuple[tuple[bool, frozenset], int]:
+    """Parse a [...] class at component[i]; returns (char set, index after it)."""
+    j = i + 1
+    negated = j < len(component) and component[j] in "!^"
+    if negated:
+        j += 1
+    chars = set()
+    first = True
+    while j < len(component) and (first or component[j] != "]"):
+        if j + 2 < len(component) and component[j + 1] == "-" and component[j + 2] != "]":
+            lo, hi = component[j], component[j + 2]
+            if ord(hi) - ord(lo) > 256:
+                # Wide ranges behave like any character here
+                return ((True, frozenset()) if not negated else (False, frozenset())), component.find("]", j) + 1
+            chars.update(chr(c) for c in range(ord(lo), ord(hi) + 1))
+            j += 3
+        else:
+            chars.add(component[j])
+            j += 1
+        first = False
+    if j >= len(component):
+        # No closing bracket: a literal "["
+        return (False, frozenset("[")), i + 1
+    return (negated, frozenset(chars)), j + 1
+
+
+@lru_cache(maxsize=1024)
+def _tokens(component: str) -> tuple[tuple[bool, tuple[bool, frozenset]], ...]:
+    """Tokenize a component into (is_star, char set) pairs."""
+    tokens = []
+    i = 0
+    while i < len(component):
+        char = component[i]
+        if char == "*":
+            if not (tokens and tokens[-1][0]):
+                tokens.append((True, ANY))
+            i += 1
+        elif char == "?":
+            tokens.append((False, ANY))
+            i += 1
+        elif char == "[":
+            chars, i = _char_set(component, i)
+            tokens.append((False, chars))
+        else:
+            tokens.append((False, (False, frozenset(char))))
+            i += 1
+    return tuple(tokens)
+
+
+def _overlap(*sets: tuple[bool, frozenset]) -> bool:
+    """True if some character is in every set."""
+    excluded = frozenset().union(*(chars for negated, chars in sets if negated))
+    included = [chars for negated, chars in sets if not negated]
+    if not included:
+        return True
+    return bool(frozenset.intersection(*included) - excluded)
+
+
+@lru_cache(maxsize=4096)
+def components_intersect(glob: str, protected: str) -> bool:
+    """True if some name matches both the glob and the protected component."""
+    a, b = _tokens(glob), _tokens(protected)
+    # A glob only matches a leading dot with a literal one
+    hidden = not glob.startswith(".")
+
+    @lru_cache(maxsize=None)
+    def walk(i: int, j: int, started: bool) -> bool:
+        # Sets the next character must be in, besides the two tokens'
+        extra = (NOT_DOT,) if hidden and not started else ()
+        if i == len(a) and j == len(b):
+            return True
+        if i < len(a) and a[i][0]:
+            if walk(i + 1, j, started):
+                return True
+            if j < len(b) and not b[j][0] and _overlap(a[i][1], b[j][1], *extra) and walk(i, j + 1, True):
+                return True
+        if i < len(a) and j < len(b) and a[i][0] and b[j][0] and not started:
+            # Both stars produce the first character together
+            if _overlap(a[i][1], b[j][1], *extra) and walk(i, j, True):
+                return True
+        if j < len(b) and b[j][0]:
+            if walk(i, j + 1, started):
+                return True
+            if i < len(a) and not a[i][0] and _overlap(a[i][1], b[j][1], *extra) and walk(i + 1, j, True):
+                return True
+        if i < len(a) and j < len(b) and not a[i][0] and not b[j][0]:
+            return _overlap(a[i][1], b[j][1], *extra) and walk(i + 1, j + 1, True)
+        return False
+
+    return walk(0, 0, False)
+
+
+def glob_intersects(glob: tuple[str, ...], protected: tuple[str, ...]) -> bool:
+    """True if some path matches both component tuples."""
+    @lru_cache(maxsize=None)
+    def walk(i: int, j: int) -> bool:
+        if i == len(glob):
+            return all(part == RECURSIVE for part in protected[j:])
+        if j == len(protected):
+            return all(part == RECURSIVE for part in glob[i:])
+        part, other = glob[i], protected[j]
+        if other == RECURSIVE and (walk(i, j + 1) or walk(i + 1, j)):
+            return True
+        if part == RECURSIVE:
+            # ** in a glob skips dot directories, like *
+            return walk(i + 1, j) or (other != RECURSIVE and components_intersect("*", other) and walk(i, j + 1))
+        return other != RECURSIVE and components_intersect(part, other) and walk(i + 1, j + 1)
+
+    return walk(0, 0)
+
+
+# =============================================================================
+# Protected globs from path regexes
+# =============================================================================
+
+def _expand_regex(items) -> list[str] | None:
+    """Strings matched by a parsed regex of literals, groups, alternations and literal sets."""
+    strings = [""]
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            options = [chr(arg)]
+        elif op is sre_constants.SUBPATTERN:
+            options = _expand_regex(arg[-1])
+        elif op is sre_constants.BRANCH:
+            options = []
+            for branch in arg[1]:
+                expanded = _expand_regex(branch)
+                if expanded is None:
+                    return None
+                options.extend(expanded)
+        elif op is sre_constants.IN and all(kind is sre_constants.LITERAL for kind, _ in arg):
+            options = [chr(value) for _, value in arg]
+        else:
+            return None
+        if options is None or len(strings) * len(options) > MAX_EXPANSIONS:
+            return None
+        strings = [string + option for string in strings for option in options]
+    return strings
+
+
+def _escape(text: str) -> str:
+    """Escape glob metacharacters in a literal component."""
+    return "".join(f"[{char}]" if char in "*?[" else char for char in text)
+
+
+def regex_globs(pattern: str) -> list[tuple[str, ...]] | None:
+    """
+    Translate a path regex into protected component tuples, or None if it
+    uses anything beyond literals, groups, alternations and ^/$ anchors.
+    """
+    try:
+        items = list(sre_parse.parse(pattern))
+    except Exception:
+        return None
+    anchored_start = bool(items) and items[0] == (sre_constants.AT, sre_constants.AT_BEGINNING)
+    anchored_end = bool(items) and items[-1] == (sre_constants.AT, sre_constants.AT_END)
+    strings = _expand_regex(items[anchored_start:len(items) - anchored_end])
+    if not strings:
+        return None
+
+    globs = []
+    for string in strings:
+        parts = [_escape(part) for part in string.lower().split("/")]
+        if anchored_start:
+            if parts[0]:
+                return None
+            parts = parts[1:]
+        else:
+            # Unanchored: the first part ends some component at any depth
+            parts = [RECURSIVE] + ([] if not parts[0] and len(parts) > 1 else ["*" + parts[0]]) + parts[1:]
+        if not anchored_end:
+            # The last part starts a component, which may have more below it
+            if parts[-1]:
+                parts[-1] += "*"
+            else:
+                parts[-1] = "*"
+            parts.append(RECURSIVE)
+        globs.append(tuple(part for part in parts if part))
+    return globs
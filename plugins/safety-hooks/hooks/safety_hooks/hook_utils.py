@@ -0,0 +1,990 @@
+#!/usr/bin/env python3
+"""
+Shared utilities for safety hooks.
+
+Provides common functionality:
+- JSON input parsing (full or streaming)
+- Decision output formatting
+- Pattern compilation and matching
+- Configuration loading
+- Per-invocation deadlines
+- Command canonicalization
+"""
+import io
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+
+class Pattern(NamedTuple):
+    """A compiled pattern with its message."""
+    regex: re.Pattern
+    message: str
+
+
+class HookInput(NamedTuple):
+    """Parsed input from Claude Code."""
+    tool_name: str
+    tool_input: dict
+    session_id: str
+    cwd: str
+
+
+class Verdict(NamedTuple):
+    """Outcome of a check: decision, message, and the ID of the rule behind it."""
+    decision: str
+    message: str
+    rule_id: str = ""
+
+
+# Verdict of a check that found nothing
+ALLOW = Verdict("allow", "")
+
+# Decisions from least to most severe; the most severe verdict wins
+SEVERITY = {"allow": 0, "warn": 1, "ask": 2, "block": 3}
+
+
+def parse_input(fields: tuple[str, ...] | None = None,
+                limits: dict[str, int] | None = None) -> HookInput | None:
+    """
+    Parse JSON input from stdin.
+    Returns None if parsing fails or input is invalid.
+
+    If fields is given, stdin is parsed incrementally and only those
+    tool_input keys are kept; every other value (such as a Write tool's
+    file content) is skipped without being materialized. limits caps the
+    raw bytes kept for a string field; the rest of it is skipped.
+    """
+    if fields is not None:
+        stream = getattr(sys.stdin, "buffer", None)
+        if stream is None:
+            stream = io.BytesIO(sys.stdin.read().encode("utf-8"))
+        return parse_input_stream(stream, fields, limits=limits)
+
+    try:
+        data = json.load(sys.stdin)
+        return HookInput(
+            tool_name=data.get("tool_name", ""),
+            tool_input=data.get("tool_input", {}),
+            session_id=data.get("session_id", ""),
+            cwd=data.get("cwd", ""),
+        )
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+# Bytes read from stdin per chunk by the streaming parser
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Top-level keys the streaming parser keeps
+HOOK_INPUT_KEYS = ("tool_name", "session_id", "cwd")
+
+# String body up to (not including) the closing quote, escapes included
+JSON_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+JSON_WHITESPACE = b" \t\r\n"
+
+
+class _JsonStream:
+    """
+    Incremental JSON reader over a binary stream.
+    Holds at most one chunk plus the value being captured in memory.
+    """
+
+    def __init__(self, stream, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        """Read the next chunk, keeping any unconsumed bytes. False at EOF."""
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> int:
+        """Skip whitespace and return the next byte without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("unexpected end of input")
+
+    def expect(self, char: bytes) -> None:
+        """Consume the next non-whitespace byte, which must be char."""
+        if self.peek() != char[0]:
+            raise ValueError(f"expected {char!r}")
+        self.pos += 1
+
+    def skip_string(self, capture: bytearray | None = None, limit: int | None = None) -> None:
+        """
+        Consume a string whose opening quote was already consumed.
+        Raw bytes are appended to capture (if given, up to limit bytes)
+        but never otherwise kept.
+        """
+        while True:
+            end = JSON_STRING_BODY.match(self.buf, self.pos).end()
+            if capture is not None:
+                if limit is None:
+                    capture += self.buf[self.pos:end]
+                elif len(capture) < limit:
+                    capture += self.buf[self.pos:min(end, self.pos + limit - len(capture))]
+            self.pos = end
+            if end < len(self.buf) and self.buf[end] == 0x22:
+                self.pos += 1
+                return
+            # Chunk ended mid-string (possibly on a lone backslash)
+            if not self._fill():
+                raise ValueError("unterminated string")
+
+    def read_string(self, limit: int | None = None) -> str:
+        """Read and decode a string value, keeping at most limit raw bytes."""
+        self.expect(b'"')
+        raw = bytearray()
+        self.skip_string(raw, limit)
+        if limit is None:
+            return json.loads(b'"' + bytes(raw) + b'"')
+        # A cut can split an escape or a UTF-8 sequence; drop the partial tail
+        for trim in range(min(len(raw), 11) + 1):
+            try:
+                return json.loads(b'"' + bytes(raw[:len(raw) - trim]) + b'"')
+            except ValueError:
+                continue
+        raise ValueError("invalid string")
+
+    def skip_value(self, capture: bytearray | None = None) -> None:
+        """Consume any value, appending its raw bytes to capture if given."""
+        depth = 0
+        while True:
+            byte = self.peek()
+            if byte == 0x22:
+                self.pos += 1
+                if capture is not None:
+                    capture += b'"'
+                self.skip_string(capture)
+                if capture is not None:
+                    capture += b'"'
+            elif byte in b"{[":
+                depth += 1
+                self.pos += 1
+                if capture is not None:
+                    capture.append(byte)
+            elif byte in b"}]":
+                if depth == 0:
+                    return
+                depth -= 1
+                self.pos += 1
+                if capture is not None:
+                    capture.append(byte)
+            elif byte in b",:":
+                if depth == 0:
+                    return
+                self.pos += 1
+                if capture is not None:
+                    capture.append(byte)
+            else:
+                # Scalar: runs until a delimiter or whitespace
+                start = self.pos
+                while self.pos < len(self.buf) and self.buf[self.pos] not in b",:}] \t\r\n":
+                    self.pos += 1
+                if capture is not None:
+                    capture += self.buf[start:self.pos]
+                if self.pos >= len(self.buf) and self._fill():
+                    continue
+            if depth == 0 and byte not in b"{[":
+                return
+
+    def read_value(self, limit: int | None = None):
+        """Read and decode any value. limit applies to strings only."""
+        if self.peek() == 0x22:
+            return self.read_string(limit)
+        raw = bytearray()
+        self.skip_value(raw)
+        return json.loads(bytes(raw))
+
+    def members(self):
+        """Iterate over the keys of an object, leaving each value unread."""
+        self.expect(b"{")
+        if self.peek() == 0x7D:
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(b":")
+            yield key
+            byte = self.peek()
+            self.pos += 1
+            if byte == 0x7D:
+                return
+            if byte != 0x2C:
+                raise ValueError("expected ',' or '}'")
+
+
+def parse_input_stream(stream, fields: tuple[str, ...],
+                       chunk_size: int = STREAM_CHUNK_SIZE,
+                       limits: dict[str, int] | None = None) -> HookInput | None:
+    """
+    Incrementally parse hook input from a binary stream.
+    Keeps only the requested tool_input fields, each truncated to its
+    limit if one is given; memory use does not grow with the size of
+    skipped values. Returns None on invalid input.
+    """
+    limits = limits or {}
+    reader = _JsonStream(stream, chunk_size)
+    values = {"tool_name": "", "session_id": "", "cwd": ""}
+    tool_input = {}
+    try:
+        for key in reader.members():
+            if key in HOOK_INPUT_KEYS:
+                values[key] = reader.read_value()
+            elif key == "tool_input" and reader.peek() == 0x7B:
+                for field in reader.members():
+                    if field in fields:
+                        tool_input[field] = reader.read_value(limits.get(field))
+                    else:
+                        reader.skip_value()
+            else:
+                reader.skip_value()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return HookInput(tool_input=tool_input, **values)
+
+
+def output_allow() -> None:
+    """Exit with allow decision (exit code 0, no output)."""
+    sys.exit(0)
+
+
+def output_block(message: str) -> None:
+    """Exit with block decision (exit code 2, message to stderr)."""
+    print(f"BLOCKED: {message}", file=sys.stderr)
+    sys.exit(2)
+
+
+def output_ask(reason: str) -> None:
+    """Exit with ask decision (exit code 0, JSON to stdout)."""
+    response = {
+        "hookSpecificOutput": {
+            "hookEventName": "PreToolUse",
+            "permissionDecision": "ask",
+            "permissionDecisionReason": reason,
+        }
+    }
+    print(json.dumps(response))
+    sys.exit(0)
+
+
+def output_warn(message: str) -> None:
+    """Output warning and allow (exit code 0, message to stderr)."""
+    print(f"Warning: {message}", file=sys.stderr)
+    sys.exit(0)
+
+
+def compile_patterns(patterns: list[tuple[str, str]]) -> list[Pattern]:
+    """
+    Compile a list of (pattern_str, message) tuples into Pattern objects.
+    Patterns are compiled with IGNORECASE flag.
+    """
+    compiled = []
+    for pattern_str, message in patterns:
+        try:
+            compiled.append(Pattern(
+                regex=re.compile(pattern_str, re.IGNORECASE),
+                message=message
+            ))
+        except re.error as e:
+            print(f"Warning: Invalid pattern '{pattern_str}': {e}", file=sys.stderr)
+    return compiled
+
+
+def match_patterns(text: str, patterns: list[Pattern]) -> tuple[bool, str]:
+    """
+    Check if text matches any pattern.
+    Returns (matched, message) tuple.
+    """
+    for pattern in patterns:
+        if pattern.regex.search(text):
+            return True, pattern.message
+    return False, ""
+
+
+def match_allowlist(text: str, patterns: list[re.Pattern]) -> bool:
+    """Check if text matches any allowlist pattern."""
+    for pattern in patterns:
+        if pattern.search(text):
+            return True
+    return False
+
+
+def compile_allowlist(patterns: list[str]) -> list[re.Pattern]:
+    """Compile allowlist patterns."""
+    compiled = []
+    for pattern_str in patterns:
+        try:
+            compiled.append(re.compile(pattern_str, re.IGNORECASE))
+        except re.error as e:
+            print(f"Warning: Invalid allowlist pattern '{pattern_str}': {e}", file=sys.stderr)
+    return compiled
+
+
+# User configuration, next to the hook scripts
+CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+
+
+def load_config() -> dict:
+    """
+    Load configuration from config.json in the hooks directory.
+    Returns empty dict if file doesn't exist or is invalid.
+    The parsed file is reused until its size or mtime changes; treat it as read-only.
+    """
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return {}
+    return _read_config(str(CONFIG_PATH), st.st_size, st.st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _read_config(config_path: str, size: int, mtime_ns: int) -> dict:
+    """Parse config.json; size and mtime_ns only key the cache."""
+    try:
+        with open(config_path) as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Warning: Failed to load config: {e}", file=sys.stderr)
+        return {}
+
+
+# =============================================================================
+# Deadlines
+# =============================================================================
+
+# Earliest point of the full path; deadlines count from here
+STARTED = time.monotonic()
+
+# Defaults for the per-invocation budget (hooks.json kills a hook after 5s)
+DEADLINE_SECONDS = 4.0
+DEADLINE_FAIL_SAFE = "ask"
+FAIL_SAFE_DECISIONS = ("allow", "ask", "block")
+
+# Rule ID of verdicts reached by running out of time
+DEADLINE_RULE = "deadline"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a hook runs out of time; stage names the step it was in."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"out of time during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget of one hook invocation, checked between stages."""
+
+    def __init__(self, seconds: float = DEADLINE_SECONDS, fail_safe: str = DEADLINE_FAIL_SAFE,
+                 started: float | None = None):
+        self.seconds = seconds
+        self.expires = (STARTED if started is None else started) + seconds
+        self.fail_safe = fail_safe if fail_safe in FAIL_SAFE_DECISIONS else DEADLINE_FAIL_SAFE
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if the budget is spent."""
+        if time.monotonic() >= self.expires:
+            raise DeadlineExceeded(stage)
+
+
+# Deadline for callers that don't impose one
+NO_DEADLINE = Deadline(float("inf"))
+
+
+def start_deadline() -> Deadline:
+    """Build this invocation's deadline from the "deadline" config section."""
+    config = load_config().get("deadline", {})
+    return Deadline(config.get("seconds", DEADLINE_SECONDS), config.get("fail_safe", DEADLINE_FAIL_SAFE))
+
+
+def deadline_verdict(deadline: Deadline, exc: DeadlineExceeded) -> Verdict:
+    """The configured fail-safe verdict; "allow" still warns."""
+    message = f"Safety check timed out during {exc.stage} ({deadline.seconds:g}s budget)"
+    decision = "warn" if deadline.fail_safe == "allow" else deadline.fail_safe
+    return Verdict(decision, message, DEADLINE_RULE)
+
+
+def output_deadline_exceeded(deadline: Deadline, exc: DeadlineExceeded) -> None:
+    """Exit with the configured fail-safe decision; "allow" still warns on stderr."""
+    decision, message, _ = deadline_verdict(deadline, exc)
+    if decision == "block":
+        output_block(message)
+    elif decision == "ask":
+        output_ask(message)
+    output_warn(message)
+
+
+# =============================================================================
+# Command canonicalization
+# =============================================================================
+
+class Token(NamedTuple):
+    """A lexed shell token: a word, an operator, or a heredoc body."""
+    kind: str           # "word", "op" or "heredoc"
+    text: str           # decoded text (quotes and escapes removed)
+    first_quote: int    # index in text where quoting began, -1 if unquoted
+
+
+class Segment(NamedTuple):
+    """A simple command with wrappers stripped and argv[0] reduced to a basename."""
+    argv: tuple[str, ...]
+    redirects: tuple[tuple[str, str], ...]
+    heredocs: tuple[str, ...]
+    separator: str
+
+
+# Longest operators first so "&&" wins over "&"
+OPERATORS = ("&>>", "<<<", "<<-", "&&", "||", ";;", "|&", ">>", ">|", ">&", "<&",
+             "<<", "<>", "&>", ";", "&", "|", "<", ">", "(", ")")
+SEPARATORS = frozenset({"&&", "||", ";;", "|&", ";", "&", "|", "(", ")"})
+
+# Reserved words that may precede a command without being the command
+RESERVED_WORDS = frozenset({"!", "{", "}", "if", "then", "else", "elif", "fi",
+                            "do", "done", "while", "until"})
+
+# Programs that just run their remaining arguments as a command, mapped to
+# the options that consume a separate value.
+WRAPPERS = {
+    "sudo": {"-u", "-g", "-h", "-p", "-C", "-D", "-r", "-t", "-U", "-T",
+             "--user", "--group", "--host", "--prompt", "--chdir", "--close-from",
+             "--role", "--type", "--other-user", "--command-timeout"},
+    "doas": {"-u", "-C"},
+    "env": {"-u", "-C", "-S", "--unset", "--chdir", "--split-string"},
+    "command": set(),
+    "builtin": set(),
+    "exec": {"-a"},
+    "nohup": set(),
+    "time": {"-f", "-o", "--format", "--output"},
+    "nice": {"-n", "--adjustment"},
+    "ionice": {"-c", "-n", "--class", "--classdata"},
+    "timeout": {"-s", "-k", "--signal", "--kill-after"},
+    "stdbuf": {"-i", "-o", "-e", "--input", "--output", "--error"},
+}
+
+# Wrappers that take one positional argument before the command
+WRAPPER_POSITIONALS = {"timeout": 1}
+
+# Programs that run shell code from -c, a heredoc or stdin
+SHELLS = frozenset({"sh", "bash", "zsh", "dash", "ksh", "mksh", "ash", "fish"})
+
+# Interpreters that run inline source, by name without version suffix
+INTERPRETERS = ("python", "node", "perl", "ruby", "php")
+
+ANSI_C_ESCAPES = {
+    "a": "\a", "b": "\b", "e": "\x1b", "E": "\x1b", "f": "\f", "n": "\n",
+    "r": "\r", "t": "\t", "v": "\v", "\\": "\\", "'": "'", '"': '"', "?": "?",
+}
+
+# Characters that force a canonical word to be re-quoted when rendered
+NEEDS_QUOTING = frozenset(" \t\n;&|<>()'\"\\`")
+
+HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+def _skip_balanced(text: str, i: int) -> int:
+    """
+    Return the index just past the bracket group opening at text[i].
+    Quotes and escapes inside the group are skipped, not counted.
+    """
+    opener = text[i]
+    closer = ")" if opener == "(" else "}"
+    depth = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "'":
+            j = text.find("'", i + 1)
+            i = n if j < 0 else j + 1
+            continue
+        if c == '"':
+            i = _read_double_quoted(text, i + 1)[1]
+            continue
+        if c == opener:
+            depth += 1
+        elif c == closer:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return n
+
+
+def _read_backticks(text: str, i: int) -> int:
+    """Return the index just past the backtick group opening at text[i]."""
+    n = len(text)
+    i += 1
+    while i < n:
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == "`":
+            return i + 1
+        i += 1
+    return n
+
+
+def _read_double_quoted(text: str, i: int) -> tuple[str, int]:
+    """
+    Decode a double-quoted string starting after the opening quote.
+    Returns (decoded, index past the closing quote). Substitutions are kept raw.
+    """
+    out = []
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            return "".join(out), i + 1
+        if c == "\\" and i + 1 < n:
+            nxt = text[i + 1]
+            if nxt == "\n":
+                i += 2
+                continue
+            if nxt in '$`"\\':
+                out.append(nxt)
+                i += 2
+                continue
+        if c == "$" and i + 1 < n and text[i + 1] in "({":
+            end = _skip_balanced(text, i + 1)
+            out.append(text[i:end])
+            i = end
+            continue
+        if c == "`":
+            end = _read_backticks(text, i)
+            out.append(text[i:end])
+            i = end
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out), n
+
+
+def _read_ansi_c(text: str, i: int, quote: str = "'") -> tuple[str, int]:
+    """
+    Decode a $'...' string starting after the opening quote.
+    Returns (decoded, index past the closing quote). An empty quote
+    decodes to the end of text.
+    """
+    out = []
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == quote:
+            return "".join(out), i + 1
+        if c != "\\" or i + 1 >= n:
+            out.append(c)
+            i += 1
+            continue
+        esc = text[i + 1]
+        i += 2
+        if esc in ANSI_C_ESCAPES:
+            out.append(ANSI_C_ESCAPES[esc])
+        elif esc in "xuU":
+            width = {"x": 2, "u": 4, "U": 8}[esc]
+            j = i
+            while j < n and j - i < width and text[j] in HEX_DIGITS:
+                j += 1
+            if j == i:
+                out.append("\\" + esc)
+            else:
+                try:
+                    out.append(chr(int(text[i:j], 16)))
+                except (ValueError, OverflowError):
+                    pass
+                i = j
+        elif esc in "01234567":
+            j = i
+            while j < n and j - i < 2 and text[j] in "01234567":
+                j += 1
+            out.append(chr(int(text[i - 1:j], 8) & 0xFF))
+            i = j
+        elif esc == "c" and i < n:
+            out.append(chr(ord(text[i]) & 0x1F))
+            i += 1
+        else:
+            out.append("\\" + esc)
+    return "".join(out), n
+
+
+def decode_escapes(text: str) -> str:
+    """Decode backslash escapes (\\n, \\x72, \\162, \\u00e9) as printf and echo -e do."""
+    return _read_ansi_c(text, 0, quote="")[0]
+
+
+def _match_operator(text: str, i: int) -> str:
+    """Return the longest shell operator starting at text[i]."""
+    for op in OPERATORS:
+        if text.startswith(op, i):
+            return op
+    return text[i]
+
+
+def tokenize_command(command: str) -> list[Token]:
+    """
+    Split a shell command into tokens in a single left-to-right pass.
+
+    Quotes, backslash escapes and ANSI-C $'...' strings are decoded.
+    Command and process substitutions are kept raw inside their word.
+    Newlines become ";" operators and heredoc bodies become "heredoc" tokens.
+    """
+    tokens = []
+    pieces = []
+    first_quote = -1
+    in_word = False
+    length = 0
+    heredoc_ops = []       # heredoc operators waiting for their delimiter word
+    pending_heredocs = []  # (delimiter, strip_tabs) waiting for the next newline
+    n = len(command)
+    i = 0
+
+    def quote_here():
+        nonlocal first_quote
+        if first_quote < 0:
+            first_quote = length
+
+    def flush():
+        nonlocal pieces, first_quote, in_word, length
+        if in_word:
+            text = "".join(pieces)
+            tokens.append(Token("word", text, first_quote))
+            if heredoc_ops:
+                pending_heredocs.append((text, heredoc_ops.pop() == "<<-"))
+        pieces, first_quote, in_word, length = [], -1, False, 0
+
+    def add(piece):
+        nonlocal in_word, length
+        pieces.append(piece)
+        length += len(piece)
+        in_word = True
+
+    while i < n:
+        c = command[i]
+
+        if c in " \t\r":
+            flush()
+            i += 1
+            continue
+
+        if c == "\n":
+            flush()
+            i += 1
+            for delimiter, strip_tabs in pending_heredocs:
+                body = []
+                while i < n:
+                    j = command.find("\n", i)
+                    j = n if j < 0 else j
+                    line = command[i:j]
+                    i = j + 1
+                    if (line.lstrip("\t") if strip_tabs else line) == delimiter:
+                        break
+                    body.append(line)
+                tokens.append(Token("heredoc", "\n".join(body), -1))
+            pending_heredocs.clear()
+            tokens.append(Token("op", ";", -1))
+            continue
+
+        if c == "#" and not in_word:
+            j = command.find("\n", i)
+            i = n if j < 0 else j
+            continue
+
+        if c == "\\":
+            if i + 1 < n and command[i + 1] == "\n":
+                i += 2
+                continue
+            quote_here()
+            add(command[i + 1:i + 2])
+            i += 2
+            continue
+
+        if c == "'":
+            j = command.find("'", i + 1)
+            j = n if j < 0 else j
+            quote_here()
+            add(command[i + 1:j])
+            i = j + 1
+            continue
+
+        if c == '"':
+            quote_here()
+            text, i = _read_double_quoted(command, i + 1)
+            add(text)
+            continue
+
+        if c == "$" and i + 1 < n:
+            nxt = command[i + 1]
+            if nxt == "'":
+                quote_here()
+                text, i = _read_ansi_c(command, i + 2)
+                add(text)
+                continue
+            if nxt == '"':
+                quote_here()
+                text, i = _read_double_quoted(command, i + 2)
+                add(text)
+                continue
+            if nxt in "({":
+                end = _skip_balanced(command, i + 1)
+                add(command[i:end])
+                i = end
+                continue
+
+        if c == "`":
+            end = _read_backticks(command, i)
+            add(command[i:end])
+            i = end
+            continue
+
+        if c in "<>" and i + 1 < n and command[i + 1] == "(":
+            end = _skip_balanced(command, i + 1)
+            add(command[i:end])
+            i = end
+            continue
+
+        if c in "|&;<>()":
+            op = _match_operator(command, i)
+            i += len(op)
+            fd_prefix = in_word and first_quote < 0 and "".join(pieces).isdigit()
+            if op not in SEPARATORS and fd_prefix:
+                op = "".join(pieces) + op
+                pieces, in_word, length = [], False, 0
+            else:
+                flush()
+            if op.endswith(("<&", ">&")):
+                j = i
+                while j < n and (command[j].isdigit() or command[j] == "-"):
+                    j += 1
+                op += command[i:j]
+                i = j
+            if op.endswith(("<<", "<<-")):
+                heredoc_ops.append("<<-" if op.endswith("-") else "<<")
+            tokens.append(Token("op", op, -1))
+            continue
+
+        add(c)
+        i += 1
+
+    flush()
+    return tokens
+
+
+def has_substitution(word: str) -> bool:
+    """True if word contains a command or process substitution."""
+    return "$(" in word or "`" in word or "<(" in word or ">(" in word
+
+
+def find_substitutions(word: str) -> list[str]:
+    """
+    Return the inner text of every $(...), `...`, <(...) and >(...) in word.
+    Nested substitutions are returned as part of their outer body.
+    """
+    bodies = []
+    n = len(word)
+    i = 0
+    while i < n:
+        c = word[i]
+        if c in "$<>" and word.startswith("(", i + 1):
+            end = _skip_balanced(word, i + 1)
+            closed = word[end - 1] == ")"
+            bodies.append(word[i + 2:end - 1 if closed else end])
+            i = end
+        elif c == "`":
+            end = _read_backticks(word, i)
+            closed = end > i + 1 and word[end - 1] == "`"
+            bodies.append(word[i + 1:end - 1 if closed else end].replace("\\`", "`"))
+            i = end
+        else:
+            i += 1
+    return bodies
+
+
+def _is_assignment(token: Token) -> bool:
+    """
+    True if token is an unquoted NAME=value environment assignment.
+    Assignments that run a substitution are kept so rules still see them.
+    """
+    eq = token.text.find("=")
+    if eq <= 0 or (0 <= token.first_quote <= eq) or has_substitution(token.text):
+        return False
+    return token.text[:eq].isidentifier()
+
+
+def interpreter_name(program: str) -> str:
+    """Reduce an interpreter such as python3.12 to its name, or "" if it isn't one."""
+    for name in INTERPRETERS:
+        if program == name or (program.startswith(name) and program[len(name):].replace(".", "").isdigit()):
+            return name
+    return ""
+
+
+@lru_cache(maxsize=256)
+def program_name(word: str) -> str:
+    """Reduce an absolute or relative program path to its basename."""
+    if "/" not in word or has_substitution(word):
+        return word
+    return os.path.basename(word.rstrip("/")) or word
+
+
+def _skip_wrapper(name: str, words: list[Token], i: int) -> tuple[int, list[Token]]:
+    """
+    Skip a wrapper's options (and positionals) starting at words[i].
+    Returns the index of the wrapped command and any words to splice in
+    (env -S splits its value into extra words).
+    """
+    takes_value = WRAPPERS[name]
+    spliced = []
+    while i < len(words):
+        word = words[i].text
+        if word == "--":
+            i += 1
+            break
+        if not word.startswith("-") or word == "-":
+            break
+        option, _, inline = word.partition("=")
+        if name == "env" and (word.startswith("-S") or option == "--split-string"):
+            value = inline if option == "--split-string" else word[2:]
+            if not value and i + 1 < len(words):
+                i += 1
+                value = words[i].text
+            spliced = [t for t in tokenize_command(value) if t.kind == "word"]
+        elif word in takes_value and i + 1 < len(words):
+            i += 1
+        i += 1
+    i += WRAPPER_POSITIONALS.get(name, 0)
+    return i, spliced
+
+
+def _canonical_argv(words: list[Token]) -> tuple[str, ...]:
+    """Strip reserved words, env assignments and wrapper programs from argv."""
+    words = list(words)
+    wrapper = None
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word.first_quote < 0 and word.text in RESERVED_WORDS:
+            i += 1
+            continue
+        if _is_assignment(word):
+            i += 1
+            continue
+        name = program_name(word.text)
+        if name in WRAPPERS:
+            wrapper = i
+            i, spliced = _skip_wrapper(name, words, i + 1)
+            words[i:i] = spliced
+            continue
+        break
+    if i >= len(words):
+        # A bare wrapper runs nothing else: `env` alone prints the environment
+        if wrapper is None:
+            return ()
+        i = wrapper
+    return (program_name(words[i].text),) + tuple(w.text for w in words[i + 1:])
+
+
+@lru_cache(maxsize=64)
+def parse_command(command: str) -> tuple[Segment, ...]:
+    """
+    Parse a shell command into canonical simple-command segments.
+
+    Each segment's argv has wrappers (sudo, env, command, nohup, timeout...),
+    leading NAME=value assignments and reserved words removed, quoting decoded,
+    and its program reduced to a basename.
+    """
+    segments = []
+    words, redirects, heredocs = [], [], []
+    pending_redirect = None
+
+    for token in tokenize_command(command):
+        if token.kind == "heredoc":
+            heredocs.append(token.text)
+        elif token.kind == "op":
+            if token.text in SEPARATORS:
+                segments.append(Segment(_canonical_argv(words), tuple(redirects),
+                                        tuple(heredocs), token.text))
+                words, redirects, heredocs = [], [], []
+                pending_redirect = None
+            else:
+                pending_redirect = token.text
+                if not token.text.endswith(("<&", ">&")) and "&" in token.text[1:]:
+                    # Fully formed fd duplication such as 2>&1 has no target word
+                    redirects.append((token.text, ""))
+                    pending_redirect = None
+        elif pending_redirect is not None:
+            redirects.append((pending_redirect, token.text))
+            pending_redirect = None
+        else:
+            words.append(token)
+
+    segments.append(Segment(_canonical_argv(words), tuple(redirects), tuple(heredocs), ""))
+    return tuple(s for s in segments if s.argv or s.redirects or s.heredocs)
+
+
+def quote_word(word: str) -> str:
+    """Quote a word for rendering only if it contains whitespace or shell syntax."""
+    if word and not NEEDS_QUOTING.intersection(word):
+        return word
+    return "'" + word.replace("'", "'\\''") + "'"
+
+
+def render_segment(segment: Segment) -> str:
+    """Render a canonical segment back to a single-line command string."""
+    parts = [quote_word(word) for word in segment.argv]
+    for op, target in segment.redirects:
+        parts.append(f"{op} {quote_word(target)}" if target else op)
+    return " ".join(parts)
+
+
+def normalize_command(command: str) -> str:
+    """
+    Canonicalize a command for consistent pattern matching.
+
+    Converts `sudo /usr/bin/git`, `env X=1 git`, `\\git`, `"g"it` and
+    `$'\\x67it'` to `git`, for any program path. Heredoc bodies are rendered
+    as follow-on commands so rules still see them.
+    """
+    parts = []
+    for segment in parse_command(command):
+        text = render_segment(segment)
+        for body in segment.heredocs:
+            text = f"{text} ; {normalize_command(body)}" if text else normalize_command(body)
+        if segment.separator:
+            text = f"{text} {segment.separator}" if text else segment.separator
+        parts.append(text)
+    if parts and parts[-1].endswith((";", "&")) and not parts[-1].endswith(("&&", "|&")):
+        # A trailing separator carries no meaning for rule matching
+        parts[-1] = parts[-1].rstrip(";& ")
+    return " ".join(parts).strip()
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize file path for consistent pattern matching.
+    Expands ~, resolves ../ traversal, and cleans up.
+    """
+    if path.startswith("~"):
+        path = os.path.expanduser(path)
+    return os.path.normpath(path)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Compiled host index for network egress rules.
+
+Host rules (exact hosts such as `paste.ee` and suffix rules such as
+`*.pastebin.com`) are compiled into an open-addressing hash table cached
+next to the policy tables. Hook processes map it read-only. A lookup hashes
+the host, then each of its parent domains, so it costs one probe per label
+of the host whatever the number of rules.
+
+Matching:
+  example.com      that host only
+  *.example.com    example.com and every subdomain
+The most specific key wins: an exact host, then the longest suffix. Of
+rules with the same key, allow beats block beats ask.
+
+The file records a fingerprint of its sources (like policy_table) and is
+rebuilt atomically when any of them changes.
+
+Layout (little-endian):
+  header    magic, version, counts, section offsets, fingerprint
+  slots     (hash, key offset, key length, entry index + 1); 0 marks an empty slot
+  entries   tier, then (offset, length) of rule ID and pattern
+  pool      UTF-8 strings
+"""
+import hashlib
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+from .policy_table import map_file, source_fingerprint, table_path, write_atomic
+
+MAGIC = b"SHHI"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHIIIIIH")
+SLOT = struct.Struct("<QIII")
+ENTRY = struct.Struct("<B3xIIII")
+
+# Tier precedence among rules with the same key, first wins
+TIERS = ("allow", "block", "ask")
+
+INDEX_SUFFIX = ".hosts"
+
+# A hostname, IPv4 or IPv6 address, after the optional "*." prefix
+HOST_PATTERN = re.compile(r"[a-z0-9_]([a-z0-9_.-]*[a-z0-9_])?|[0-9a-f:.]+")
+
+
+class HostRule(NamedTuple):
+    """An egress rule: a host or *.domain pattern in a tier."""
+    rule_id: str
+    tier: str
+    pattern: str
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase a host and drop IPv6 brackets and a trailing root dot."""
+    host = host.strip().lower()
+    if host.startswith("[") and host.endswith("]"):
+        host = host[1:-1]
+    return host.rstrip(".")
+
+
+def rule_key(pattern: str) -> str | None:
+    """
+    Index key of a rule pattern: the host for exact rules, "." + domain
+    for *.domain rules. None if the pattern isn't a host.
+    """
+    pattern = normalize_host(pattern)
+    suffix = pattern.startswith("*.")
+    host = pattern[2:] if suffix else pattern
+    if not HOST_PATTERN.fullmatch(host):
+        return None
+    return "." + host if suffix else host
+
+
+def lookup_keys(host: str) -> list[str]:
+    """Keys that can match a host, most specific first."""
+    host = normalize_host(host)
+    keys = [host]
+    if ":" in host:
+        # IPv6 addresses have no parent domains
+        return keys
+    labels = host.split(".")
+    keys.extend("." + ".".join(labels[i:]) for i in range(len(labels)))
+    return keys
+
+
+def _hash(key: bytes) -> int:
+    """Stable 64-bit hash of a key; 0 is reserved for empty slots."""
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+# =============================================================================
+# Building
+# =============================================================================
+
+def build_index(rules: list[HostRule], fingerprint: str) -> bytes:
+    """Compile host rules into the binary index format."""
+    pool = bytearray()
+    interned = {}
+
+    def intern(text: str) -> tuple[int, int]:
+        if text not in interned:
+            data = text.encode("utf-8")
+            interned[text] = (len(pool), len(data))
+            pool.extend(data)
+        return interned[text]
+
+    ordered = sorted((r for r in rules if r.tier in TIERS), key=lambda r: TIERS.index(r.tier))
+    keys = {}
+    for rule in ordered:
+        key = rule_key(rule.pattern)
+        if key is None:
+            print(f"Warning: Invalid host pattern '{rule.pattern}'", file=sys.stderr)
+            continue
+        keys.setdefault(key, rule)
+
+    slot_count = 8
+    while slot_count < 2 * len(keys):
+        slot_count *= 2
+    slots = [(0, 0, 0, 0)] * slot_count
+    entry_bytes = bytearray()
+    for index, (key, rule) in enumerate(keys.items()):
+        entry_bytes += ENTRY.pack(TIERS.index(rule.tier), *intern(rule.rule_id), *intern(rule.pattern))
+        data = key.encode("utf-8")
+        h = _hash(data)
+        i = h & (slot_count - 1)
+        while slots[i][3]:
+            i = (i + 1) & (slot_count - 1)
+        slots[i] = (h, *intern(key), index + 1)
+
+    fp = fingerprint.encode("utf-8")
+    slots_off = HEADER.size + len(fp)
+    entries_off = slots_off + slot_count * SLOT.size
+    pool_off = entries_off + len(entry_bytes)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, slot_count, len(keys), slots_off, entries_off, pool_off, len(fp))
+    slot_bytes = b"".join(SLOT.pack(*slot) for slot in slots)
+    return bytes(header + fp + slot_bytes + entry_bytes + pool)
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+
+class HostIndex:
+    """Read-only view over a compiled host index (an mmap or bytes)."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        (magic, version, self.slot_count, self.entry_count, self.slots_off,
+         self.entries_off, self.pool_off, fp_len) = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a host index")
+        self.fingerprint = bytes(buf[HEADER.size:HEADER.size + fp_len]).decode("utf-8")
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self.pool_off + offset
+        return bytes(self.buf[start:start + length])
+
+    def entry(self, index: int) -> HostRule:
+        """Decode a rule by entry index."""
+        tier, *refs = ENTRY.unpack_from(self.buf, self.entries_off + index * ENTRY.size)
+        rule_id, pattern = (self._bytes(refs[i], refs[i + 1]).decode("utf-8") for i in (0, 2))
+        return HostRule(rule_id, TIERS[tier], pattern)
+
+    def find(self, key: str) -> HostRule | None:
+        """Return the rule stored under an index key."""
+        data = key.encode("utf-8")
+        h = _hash(data)
+        mask = self.slot_count - 1
+        i = h & mask
+        while True:
+            slot_hash, offset, length, entry = SLOT.unpack_from(self.buf, self.slots_off + i * SLOT.size)
+            if not entry:
+                return None
+            if slot_hash == h and self._bytes(offset, length) == data:
+                return self.entry(entry - 1)
+            i = (i + 1) & mask
+
+    def lookup(self, host: str) -> HostRule | None:
+        """Return the most specific rule matching a host."""
+        if not self.entry_count:
+            return None
+        for key in lookup_keys(host):
+            rule = self.find(key)
+            if rule:
+                return rule
+        return None
+
+
+# =============================================================================
+# Loading
+# =============================================================================
+
+def load_host_index(name: str, sources: list[Path], build_rules) -> HostIndex:
+    """
+    Attach to the compiled index for a rule set, rebuilding it if stale.
+    build_rules() is only called when the index has to be rebuilt.
+    """
+    fingerprint = source_fingerprint(sources)
+    path = table_path(name, sources).with_suffix(INDEX_SUFFIX)
+
+    buf = map_file(path)
+    if buf is not None:
+        try:
+            index = HostIndex(buf)
+            if index.fingerprint == fingerprint:
+                return index
+        except (ValueError, struct.error):
+            pass
+        buf.close()
+
+    index = HostIndex(build_index(build_rules(), fingerprint))
+    if write_atomic(path, index.buf):
+        buf = map_file(path)
+        if buf is not None:
+            index = HostIndex(buf)
+    return index
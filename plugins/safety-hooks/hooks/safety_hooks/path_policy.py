@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Path policy shared by the Write/Edit and Bash policies.
+
+file_policy.py checks the file_path of Write/Edit calls against these
+rules; bash_policy.py checks every file a command writes to (redirection
+targets, tee, cp, mv, sed -i, chmod, ...). Both attach to the same compiled
+table, so a path is judged the same way whichever tool touches it.
+
+The credential rules also guard reads: read_policy.py checks Read paths
+against them, and Grep/Glob searches through glob_classifier.py.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from . import policy_table
+from .glob_classifier import RECURSIVE, glob_components, glob_intersects, literal_base, regex_globs
+from .hook_utils import ALLOW, CONFIG_PATH, NO_DEADLINE, Deadline, Verdict, normalize_path, load_config
+from .policy_table import PolicyTable, Rule, load_policy, make_rules
+
+# =============================================================================
+# ALWAYS BLOCKED - Never allow writing to these
+# =============================================================================
+BLOCK_PATTERNS = [
+    # System directories
+    (r"^/(etc|usr|bin|sbin|boot|lib|lib64|sys|proc)(/|$)",
+     "system directory"),
+    (r"^/var/(log|run|lock)(/|$)",
+     "system runtime directory"),
+]
+
+# =============================================================================
+# CREDENTIALS - Ask before writing (part of ASK_PATTERNS) and before reading
+# (read_policy.py)
+# =============================================================================
+CREDENTIAL_PATTERNS = [
+    # SSH
+    (r"/\.ssh/",
+     "SSH configuration"),
+
+    # AWS/Cloud credentials
+    (r"/\.(aws|gcp|azure)/",
+     "cloud credentials"),
+
+    # Environment files with secrets
+    (r"\.env$",
+     ".env file (may contain secrets)"),
+    (r"\.env\.(local|prod|production)$",
+     "environment file (may contain secrets)"),
+
+    # NPM/Yarn credentials
+    (r"/\.npmrc$",
+     ".npmrc (may contain auth tokens)"),
+    (r"/\.yarnrc$",
+     ".yarnrc (may contain auth tokens)"),
+    (r"/\.yarnrc\.yml$",
+     ".yarnrc.yml (may contain auth tokens)"),
+
+    # Docker credentials
+    (r"/\.docker/config\.json$",
+     "Docker config (contains registry auth)"),
+
+    # Network credentials
+    (r"/\.netrc$",
+     ".netrc (contains network credentials)"),
+
+    # Private keys
+    (r"\.pem$",
+     "PEM file (may be private key)"),
+    (r"\.key$",
+     "KEY file (may be private key)"),
+    (r"/id_rsa$",
+     "RSA private key"),
+    (r"/id_ed25519$",
+     "Ed25519 private key"),
+    (r"/id_ecdsa$",
+     "ECDSA private key"),
+    (r"/id_dsa$",
+     "DSA private key"),
+
+    # Kubernetes
+    (r"/\.kube/config$",
+     "Kubernetes config (contains cluster credentials)"),
+    (r"/kubeconfig$",
+     "Kubernetes config file"),
+
+    # Database configs
+    (r"/\.pgpass$",
+     "PostgreSQL password file"),
+    (r"/\.my\.cnf$",
+     "MySQL config (may contain credentials)"),
+]
+
+# =============================================================================
+# ASK USER - Sensitive but sometimes legitimate
+# =============================================================================
+ASK_PATTERNS = [
+    # Shell configs
+    (r"/\.(bashrc|zshrc|profile|bash_profile|zprofile)$",
+     "shell configuration file"),
+
+    # Git config
+    (r"/\.gitconfig$",
+     "global git configuration"),
+
+    # Claude config (prevent self-modification attacks)
+    (r"/\.claude/.*-hook\.py$",
+     "Claude safety hook"),
+    (r"/\.claude/settings\.json$",
+     "Claude settings"),
+] + CREDENTIAL_PATTERNS
+
+# Files whose changes invalidate the compiled policy table
+POLICY_SOURCES = [Path(__file__).resolve(), CONFIG_PATH, Path(policy_table.__file__).resolve()]
+
+
+def build_rules() -> list[Rule]:
+    """Collect built-in and user-defined path rules in evaluation order."""
+    file_config = load_config().get("file_safety", {})
+    return (make_rules("file", "block", BLOCK_PATTERNS)
+            + make_rules("file.extra", "block", file_config.get("extra_block_patterns", []))
+            + make_rules("file", "ask", ASK_PATTERNS)
+            + make_rules("file.extra", "ask", file_config.get("extra_ask_patterns", []))
+            + make_rules("file", "read", CREDENTIAL_PATTERNS)
+            + make_rules("file.extra", "read", file_config.get("extra_read_patterns", [])))
+
+
+@lru_cache(maxsize=1)
+def get_policy() -> PolicyTable:
+    """Attach to the shared compiled policy, building it if stale."""
+    return load_policy("file", POLICY_SOURCES, build_rules)
+
+
+def check_path(file_path: str, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check if path is sensitive.
+    Raises DeadlineExceeded if the deadline passes between stages.
+    Returns: Verdict
+    """
+    # Normalize path for consistent matching
+    path = normalize_path(file_path)
+
+    # Check always-block then ask; built-in rules precede user-defined ones
+    policy = get_policy()
+    deadline.check("policy loading")
+    candidates = policy.candidates(path)
+    for tier in ("block", "ask"):
+        deadline.check(f"{tier} rules")
+        rule = policy.first_match(tier, path, candidates)
+        if rule:
+            return Verdict(tier, rule.message, rule.rule_id)
+
+    return ALLOW
+
+
+@lru_cache(maxsize=1)
+def get_read_globs() -> tuple[list[tuple[tuple[str, ...], Rule]], list[int]]:
+    """
+    Split the read rules into protected globs and the indexes of rules the
+    classifier can't translate. Returns ([(glob, rule)], [rule index]).
+    """
+    policy = get_policy()
+    globs = []
+    untranslated = []
+    for index, rule in enumerate(policy.rules()):
+        if rule.tier != "read":
+            continue
+        translated = regex_globs(rule.pattern)
+        if translated is None:
+            untranslated.append(index)
+        else:
+            globs.extend((glob, rule) for glob in translated)
+    return globs, untranslated
+
+
+def check_read_path(file_path: str, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check if reading a path could expose credentials.
+    Returns: Verdict
+    """
+    path = normalize_path(file_path)
+    policy = get_policy()
+    deadline.check("policy loading")
+    rule = policy.first_match("read", path, policy.candidates(path))
+    if rule:
+        return Verdict("ask", rule.message, rule.rule_id)
+    return ALLOW
+
+
+def check_read_glob(pattern: str, contents: bool = False,
+                    deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check if an absolute glob can reach credentials, without expanding it.
+    Only directory rules apply unless contents is set: listing a key file
+    is harmless, reading it is not. Rules the classifier can't translate
+    are checked against the glob's literal base directory.
+    Returns: Verdict
+    """
+    globs, untranslated = get_read_globs()
+    deadline.check("policy loading")
+    candidates = glob_components(normalize_path(pattern))
+    for protected, rule in globs:
+        if not contents and protected[-1] != RECURSIVE:
+            continue
+        if any(glob_intersects(candidate, protected) for candidate in candidates):
+            return Verdict("ask", rule.message, rule.rule_id)
+    deadline.check("glob classification")
+
+    if untranslated:
+        policy = get_policy()
+        for candidate in candidates:
+            rule = policy.first_match("read", literal_base(candidate), untranslated)
+            if rule:
+                return Verdict("ask", rule.message, rule.rule_id)
+    return ALLOW
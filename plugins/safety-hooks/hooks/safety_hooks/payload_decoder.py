@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Decoding of encoded payloads a command runs.
+
+Finds data that is decoded and then executed:
+  echo <base64> | base64 -d | sh
+  printf '\\x72\\x6d ...' | bash
+  xxd -r -p <<< 726d... | python3
+  eval "$(echo <base64> | base64 -d)"
+  bash <(echo <base64> | base64 -d)
+  python -c 'exec(bytes.fromhex("..."))'
+
+Pipelines are emulated in pure Python over inline text only: nothing is
+read from disk or executed. Every decode is capped in output bytes and
+in time, so a large blob can't stall the hook; data that can't be
+decoded within the caps is reported instead of being guessed at.
+"""
+import base64
+import binascii
+import re
+import time
+import zlib
+from typing import NamedTuple
+
+from .hook_utils import (
+    NO_DEADLINE,
+    SHELLS,
+    Deadline,
+    DeadlineExceeded,
+    Segment,
+    decode_escapes,
+    has_substitution,
+    interpreter_name,
+    parse_command,
+)
+
+# =============================================================================
+# PIPELINE STAGES - Programs whose stdin/stdout are emulated
+# =============================================================================
+# Operands that name standard input
+STDIN_OPERANDS = {"-", "/dev/stdin", "/proc/self/fd/0", "/dev/fd/0"}
+
+# Stages that pass stdin through unchanged when given no file operands
+PASSTHROUGH = {"cat", "tee"}
+
+# Flags that make base64/base32/basenc decode rather than encode
+DECODE_FLAGS = {"-d", "--decode", "-D"}
+
+# basenc encoding flag -> codec
+BASENC_CODECS = {"--base64": "base64", "--base64url": "base64url", "--base32": "base32",
+                 "--base16": "hex"}
+
+# Defaults for the decode caps (overridable in config.json)
+MAX_DECODED_BYTES = 16 * 1024
+MAX_DECODE_SECONDS = 0.25
+
+# =============================================================================
+# SCRIPT DECODERS - Calls that decode a string literal inside inline source
+# =============================================================================
+SCRIPT_LITERAL = r"""[bu]?(['"])((?:\\.|(?!\1)[^\\\n])*)\1"""
+
+SCRIPT_DECODE_CALLS = [
+    (r"(?:bytes\.fromhex|unhexlify|a2b_hex)\s*\(\s*" + SCRIPT_LITERAL, "hex"),
+    (r"(?:b64decode|decodebytes|decodestring|a2b_base64|atob|decode64)\s*\(\s*" + SCRIPT_LITERAL,
+     "base64"),
+    (r"urlsafe_b64decode\s*\(\s*" + SCRIPT_LITERAL, "base64url"),
+    (r"b32decode\s*\(\s*" + SCRIPT_LITERAL, "base32"),
+    (r"Buffer\.from\s*\(\s*" + SCRIPT_LITERAL + r"""\s*,\s*['"](base64|hex)['"]""", None),
+    (r"""pack\s*\(?\s*['"]H\*['"]\s*,\s*""" + SCRIPT_LITERAL, "hex"),
+]
+SCRIPT_DECODE_PATTERNS = [(re.compile(pattern), codec) for pattern, codec in SCRIPT_DECODE_CALLS]
+
+# Quick test before any pattern runs
+SCRIPT_DECODE_HINT = re.compile(r"fromhex|unhexlify|a2b_|b64decode|b32decode|decodebytes|decodestring"
+                                r"|atob|decode64|Buffer\.from|pack")
+
+
+class Decoded(NamedTuple):
+    """Data a command decodes and runs; text is None when it couldn't be decoded."""
+    kind: str        # "shell" or "script", how the data is run
+    text: str | None
+    problem: str     # "size", "time" or "opaque" when text is None, else ""
+
+
+class _TooLarge(Exception):
+    """Decoded output would exceed the byte cap."""
+
+
+# =============================================================================
+# CODECS
+# =============================================================================
+
+def _strip(data: bytes) -> bytes:
+    """Drop the whitespace decoders ignore."""
+    return re.sub(rb"\s+", b"", data)
+
+
+def decode(codec: str, data: bytes, limit: int = MAX_DECODED_BYTES) -> bytes | None:
+    """
+    Decode data with a codec, or None if it isn't valid input.
+    Raises _TooLarge before decoding anything that would exceed limit bytes.
+    """
+    if codec == "gzip":
+        inflater = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        try:
+            out = inflater.decompress(data, limit + 1)
+        except zlib.error:
+            return None
+        if len(out) > limit:
+            raise _TooLarge()
+        return out
+
+    data = _strip(data)
+    ratio = {"hex": 2, "base32": 1.6}.get(codec, 4 / 3)
+    if len(data) / ratio > limit + 3:
+        raise _TooLarge()
+    try:
+        if codec == "hex":
+            return binascii.unhexlify(data)
+        if codec == "base32":
+            return base64.b32decode(data + b"=" * (-len(data) % 8), casefold=True)
+        if codec == "base64url":
+            return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+        return base64.b64decode(data + b"=" * (-len(data) % 4), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _tr_set(spec: str) -> str:
+    """Expand a tr set such as a-zA-Z into its characters."""
+    spec = decode_escapes(spec)
+    chars = []
+    i = 0
+    while i < len(spec):
+        if i + 2 < len(spec) and spec[i + 1] == "-" and spec[i] <= spec[i + 2]:
+            chars.extend(chr(c) for c in range(ord(spec[i]), ord(spec[i + 2]) + 1))
+            i += 3
+        else:
+            chars.append(spec[i])
+            i += 1
+    return "".join(chars)
+
+
+def _translate(data: bytes, source: str, target: str) -> bytes:
+    """Map characters the way tr SET1 SET2 does."""
+    source, target = _tr_set(source), _tr_set(target)
+    if not source or not target:
+        return data
+    target = target[:len(source)].ljust(len(source), target[-1])
+    table = {ord(a): b for a, b in zip(source, target)}
+    return data.decode("latin-1").translate(table).encode("latin-1", "replace")
+
+
+# =============================================================================
+# PIPELINE EMULATION
+# =============================================================================
+
+def _flags(args: tuple[str, ...]) -> set[str]:
+    """Single-letter flags, expanding clusters such as -di to -d and -i."""
+    flags = set()
+    for arg in args:
+        if arg.startswith("--"):
+            flags.add(arg.partition("=")[0])
+        elif arg.startswith("-") and len(arg) > 1:
+            flags.update(f"-{c}" for c in arg[1:])
+    return flags
+
+
+def _operands(args: tuple[str, ...]) -> list[str]:
+    """Non-flag arguments."""
+    return [arg for arg in args if not arg.startswith("-") or arg == "-"]
+
+
+def _stdin(segment: Segment) -> bytes | None:
+    """Inline text fed to a segment's stdin by a here-string or heredoc."""
+    for op, target in segment.redirects:
+        if op == "<<<":
+            return (target + "\n").encode()
+    if segment.heredocs:
+        return segment.heredocs[-1].encode()
+    return None
+
+
+def _echo(args: tuple[str, ...]) -> bytes | None:
+    """Output of echo or printf with literal arguments."""
+    if any("$" in arg or "`" in arg for arg in args):
+        # Expansions aren't evaluated, so the output is unknown
+        return None
+    if args and args[0] == "printf":
+        if len(args) < 2:
+            return None
+        fmt, values = args[1], list(args[2:])
+
+        def substitute(match):
+            if match.group(0) == "%%":
+                return "%"
+            value = values.pop(0) if values else ""
+            return decode_escapes(value) if match.group(1) == "b" else value
+        return re.sub(r"%%|%-?\d*([sb])", substitute, decode_escapes(fmt)).encode()
+
+    words = list(args[1:])
+    newline, escapes = True, False
+    while words and re.fullmatch(r"-[neE]+", words[0]):
+        flag = words.pop(0)
+        newline = newline and "n" not in flag
+        if "e" in flag or "E" in flag:
+            escapes = flag.rfind("e") > flag.rfind("E")
+    text = " ".join(words)
+    return ((decode_escapes(text) if escapes else text) + ("\n" if newline else "")).encode()
+
+
+def _codec(segment: Segment) -> str | None:
+    """The codec a pipeline stage decodes with, or None if it doesn't decode."""
+    program, args = segment.argv[0], segment.argv[1:]
+    flags = _flags(args)
+    if program in ("base64", "base32") and flags & DECODE_FLAGS:
+        return program
+    if program == "basenc" and flags & DECODE_FLAGS:
+        return next((codec for flag, codec in BASENC_CODECS.items() if flag in flags), "opaque")
+    if program == "xxd" and "-r" in flags:
+        return "hex" if flags & {"-p", "--ps", "--plain"} else "opaque"
+    if program == "openssl" and args[:1] in (("base64",), ("enc",)) and "-d" in flags:
+        return "base64" if args[0] == "base64" or flags & {"-a", "-A"} else "opaque"
+    if program in ("gunzip", "zcat") or (program == "gzip" and flags & {"-d", "--decompress"}):
+        return "gzip"
+    if program in ("bunzip2", "bzcat", "unxz", "xzcat", "unzstd", "zstdcat", "uudecode"):
+        return "opaque"
+    if program in ("bzip2", "xz", "zstd") and flags & {"-d", "--decompress"}:
+        return "opaque"
+    return None
+
+
+def _transform(segment: Segment, data: bytes | None, limit: int) -> tuple[bytes | None, bool]:
+    """
+    Run one pipeline stage over its stdin.
+    Returns (output or None if unknown, whether the stage decodes).
+    """
+    program, args = segment.argv[0], segment.argv[1:]
+    inline = _stdin(segment)
+    if inline is not None:
+        data = inline
+
+    codec = _codec(segment)
+    if codec is not None:
+        operands = [op for op in _operands(args) if op not in STDIN_OPERANDS]
+        if program == "openssl":
+            operands = [op for op in operands[1:] if op not in ("base64", "enc")]
+        if data is None or operands or codec == "opaque":
+            return None, True
+        return decode(codec, data, limit), True
+
+    if program in PASSTHROUGH and not [op for op in _operands(args) if op not in STDIN_OPERANDS]:
+        return data, False
+    if program == "rev" and not _operands(args) and data is not None:
+        return b"\n".join(line[::-1] for line in data.split(b"\n")), True
+    if program == "tr" and data is not None and len(args) == 2 and not _flags(args):
+        return _translate(data, *args), True
+    if program in ("echo", "printf"):
+        output = _echo(segment.argv)
+        return output, output is not None and "\\" in " ".join(args)
+    return None, False
+
+
+def sink_kind(segment: Segment) -> str | None:
+    """How a stage runs its stdin: "shell", "script", or None if it doesn't."""
+    program, args = segment.argv[0], segment.argv[1:]
+    if program in ("source", ".") and args[:1] and args[0] in STDIN_OPERANDS:
+        return "shell"
+    if program not in SHELLS and not interpreter_name(program):
+        return None
+    options = [arg for arg in args if arg.startswith(("-", "+")) and arg != "-"]
+    operands = _operands(args)
+    if program in SHELLS:
+        if any(not o.startswith("--") and "c" in o[1:] for o in options):
+            return None
+        if "-s" in _flags(options) or not operands or operands[0] in STDIN_OPERANDS:
+            return "shell"
+        return None
+    if any(o in ("-c", "-e", "-E", "-r", "-p", "--eval", "--print", "-m") for o in options):
+        return None
+    return "script" if not operands or operands[0] in STDIN_OPERANDS else None
+
+
+def script_substitutions(segment: Segment) -> list[str]:
+    """
+    Bodies of the process substitutions a shell, source or . runs as a
+    script: bash <(...), source <(...), and bash < <(...) on stdin.
+    """
+    if not segment.argv or (segment.argv[0] not in SHELLS and segment.argv[0] not in ("source", ".")):
+        return []
+    words = [*segment.argv[1:], *(target for op, target in segment.redirects if op == "<")]
+    return [word[2:-1] for word in words if word.startswith("<(") and word.endswith(")")]
+
+
+def _run_pipeline(pipeline: list[Segment], limit: int, deadline: Deadline,
+                  stdout_kind: str | None, executed: bool = False) -> list[Decoded]:
+    """
+    Emulate a pipeline, reporting decoded data that reaches a shell or
+    interpreter. stdout_kind treats the pipeline's output as run that way;
+    with executed, even output that nothing decoded.
+    """
+    data, decoded = None, False
+    for segment in pipeline:
+        deadline.check("payload decoding")
+        kind = sink_kind(segment)
+        if kind is not None:
+            if _stdin(segment) is not None:
+                # A shell's own heredoc or here-string is checked as a nested command
+                return []
+            if data is not None:
+                return [Decoded(kind, data.decode("utf-8", "replace"), "")]
+            return [Decoded(kind, None, "opaque")] if decoded else []
+        data, decodes = _transform(segment, data, limit)
+        decoded = decoded or decodes
+
+    if stdout_kind and data is not None and (decoded or executed):
+        return [Decoded(stdout_kind, data.decode("utf-8", "replace"), "")]
+    if stdout_kind and decoded:
+        return [Decoded(stdout_kind, None, "opaque")]
+    return []
+
+
+def _time_box(deadline: Deadline, seconds: float) -> Deadline:
+    """A deadline for one decode: the hook's, or seconds from now if sooner."""
+    return Deadline(min(seconds, deadline.remaining()), deadline.fail_safe, started=time.monotonic())
+
+
+def decode_pipelines(command: str, limit: int = MAX_DECODED_BYTES, seconds: float = MAX_DECODE_SECONDS,
+                     deadline: Deadline = NO_DEADLINE, stdout_kind: str | None = None,
+                     executed: bool = False) -> list[Decoded]:
+    """
+    Find data that a command's pipelines pipe into a shell or interpreter,
+    decoding it where a stage decodes (base64 -d, xxd -r -p, printf escapes,
+    gunzip, tr, rev). With stdout_kind, a pipeline that decodes and ends
+    without running anything reports its output as run that way, for
+    substitutions whose output is executed; with executed as well, output
+    that nothing decoded is reported too, as a script a shell runs is
+    (bash <(echo ...), like echo ... | bash).
+
+    Data that a decoder produces but can't be emulated (from a file, a
+    variable, an unsupported codec, invalid input) is reported with
+    problem "opaque"; data over limit bytes with "size"; a decode that
+    takes longer than seconds with "time". Raises DeadlineExceeded only
+    if the hook's own deadline passes.
+    """
+    box = _time_box(deadline, seconds)
+    results = []
+    pipeline = []
+    for segment in parse_command(command):
+        if not segment.argv:
+            continue
+        pipeline.append(segment)
+        if segment.separator in ("|", "|&"):
+            continue
+        try:
+            results.extend(_run_pipeline(pipeline, limit, box, stdout_kind, executed))
+        except _TooLarge:
+            kind = next((k for k in map(sink_kind, pipeline) if k), stdout_kind or "shell")
+            results.append(Decoded(kind, None, "size"))
+        except DeadlineExceeded:
+            deadline.check("payload decoding")
+            results.append(Decoded(stdout_kind or "shell", None, "time"))
+            break
+        pipeline = []
+    return results
+
+
+def decode_script_literals(source: str, limit: int = MAX_DECODED_BYTES, seconds: float = MAX_DECODE_SECONDS,
+                           deadline: Deadline = NO_DEADLINE) -> list[Decoded]:
+    """
+    Decode string literals that inline source passes to a decoding call
+    (bytes.fromhex, b64decode, Buffer.from(..., "base64"), pack("H*", ...)).
+    Returns Decoded entries of kind "script"; text that isn't a literal
+    (a variable, a concatenation) isn't followed.
+    """
+    if not SCRIPT_DECODE_HINT.search(source):
+        return []
+    box = _time_box(deadline, seconds)
+    results = []
+    for pattern, codec in SCRIPT_DECODE_PATTERNS:
+        for match in pattern.finditer(source):
+            try:
+                box.check("script payload decoding")
+            except DeadlineExceeded:
+                deadline.check("script payload decoding")
+                return results + [Decoded("script", None, "time")]
+            literal = decode_escapes(match.group(2)) if "\\" in match.group(2) else match.group(2)
+            if has_substitution(literal):
+                continue
+            try:
+                data = decode(codec or match.group(3), literal.encode("utf-8", "replace"), limit)
+            except _TooLarge:
+                results.append(Decoded("script", None, "size"))
+                continue
+            if data is not None:
+                results.append(Decoded("script", data.decode("utf-8", "replace"), ""))
+    return results
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Compiled policy table shared by concurrent hook processes.
+
+A hook's policy (built-in rules plus config.json extras) is compiled into a
+flat binary file holding rule metadata, a keyword index and a string pool.
+Every hook process maps the file read-only and decodes only what it touches:
+a check looks up which keywords occur in the text and compiles just the
+rules listed under them. Setup cost therefore stays flat no matter how many
+hooks run in parallel, and the OS shares the mapped pages between them.
+
+The file records a fingerprint of its sources (rule modules and config.json)
+and is rebuilt atomically (temp file + rename) when any of them changes.
+A policy can also get a plain-text keyword sidecar (fingerprint line, then
+one keyword per line) for fast_path, which must not import this module.
+
+Within a tier the first rule in source order wins, and source order is
+already the cheapest way to find it: every earlier rule has to be ruled out
+anyway. Tiers whose callers only ask whether any rule matches (an
+allowlist) are different, and for those the compiler stores an evaluation
+order. A sampled fraction of hook processes record how often each rule is
+tried, how often it hits and how long its regex takes, in a stats file
+next to the table; builds order any-match tiers by expected cost to the
+first hit (mean cost / hit rate, cheapest first), and the table is rebuilt
+with fresh statistics every REORDER_SECONDS.
+
+Layout (little-endian):
+  header    magic, version, counts, section offsets, fingerprint,
+            (offset, length) of tier names and of any-match tier names
+  rules     fixed-size records: tier, then (offset, length) of id/pattern/message
+  keywords  sorted (offset, length, first posting, posting count) records
+  postings  rule indexes (u32) per keyword, in source order
+  ranks     evaluation position (u32) per rule
+  pool      UTF-8 strings
+"""
+import atexit
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: statistics are best-effort without a lock
+    fcntl = None
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+MAGIC = b"SHPT"
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct("<4sHIIIIIIIH")
+RULE = struct.Struct("<B3xIIIIII")
+KEYWORD = struct.Struct("<IIII")
+POSTING = struct.Struct("<I")
+RANK = struct.Struct("<I")
+
+# Rule statistics: header (magic, version, rule count), then per rule
+# (key, tries, hits, regex nanoseconds)
+STATS_MAGIC = b"SHRS"
+STATS_VERSION = 1
+STATS_HEADER = struct.Struct("<4sHI")
+STAT = struct.Struct("<QQQQ")
+STATS_SUFFIX = ".stats"
+
+# One hook process in this many records rule statistics
+STATS_SAMPLE_EVERY = 16
+
+# Rebuild a table whose statistics are this much newer than its order
+REORDER_SECONDS = 3600
+
+# Keyword that every rule without an extractable literal is filed under
+ALWAYS = ""
+
+# Where compiled tables live (overridable for tests and read-only homes)
+CACHE_DIR_ENV = "SAFETY_HOOKS_CACHE_DIR"
+
+SIDECAR_SUFFIX = ".keywords"
+
+
+class Rule(NamedTuple):
+    """A policy rule: a regex in a tier, with a stable ID for reporting."""
+    rule_id: str
+    tier: str
+    pattern: str
+    message: str
+
+
+class RuleStats(NamedTuple):
+    """Observed evaluations of one rule."""
+    tries: int
+    hits: int
+    nanoseconds: int
+
+
+def stats_key(rule: Rule) -> int:
+    """Key a rule's statistics by tier and pattern, so they survive renumbering."""
+    data = f"{rule.tier}\0{rule.pattern}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def make_rules(prefix: str, tier: str, patterns: list) -> list[Rule]:
+    """
+    Build rules from (pattern, message) tuples or bare allowlist strings.
+    IDs are prefix.tier.index, so they stay stable if other tiers change.
+    """
+    rules = []
+    for index, entry in enumerate(patterns):
+        pattern, message = (entry, "") if isinstance(entry, str) else entry
+        rules.append(Rule(f"{prefix}.{tier}.{index}", tier, pattern, message))
+    return rules
+
+
+# =============================================================================
+# Keyword extraction
+# =============================================================================
+
+def _required_literals(items) -> list[str] | None:
+    """
+    Return literals one of which must appear in every match of a parsed
+    regex sequence, or None if no such set can be derived.
+    """
+    best = None
+    run = []
+
+    def consider(options):
+        nonlocal best
+        if options and all(options) and (best is None or min(map(len, options)) > min(map(len, best))):
+            best = options
+
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(arg))
+            continue
+        if op is sre_constants.AT:
+            # Zero-width: doesn't break a literal run
+            continue
+        consider(["".join(run)] if run else None)
+        run = []
+        if op is sre_constants.SUBPATTERN:
+            consider(_required_literals(arg[-1]))
+        elif op is sre_constants.BRANCH:
+            options = []
+            for branch in arg[1]:
+                literals = _required_literals(branch)
+                if literals is None:
+                    options = None
+                    break
+                options.extend(literals)
+            consider(options)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and arg[0] >= 1:
+            consider(_required_literals(arg[2]))
+    consider(["".join(run)] if run else None)
+    return best
+
+
+def extract_keywords(pattern: str) -> list[str]:
+    """
+    Return lowercase literals one of which occurs in any text the pattern
+    (compiled with IGNORECASE) can match. [ALWAYS] if none can be derived.
+    """
+    try:
+        literals = _required_literals(sre_parse.parse(pattern, re.IGNORECASE))
+    except (re.error, RecursionError, TypeError, ValueError):
+        return [ALWAYS]
+    if not literals:
+        return [ALWAYS]
+    return sorted({literal.lower() for literal in literals})
+
+
+# =============================================================================
+# Building
+# =============================================================================
+
+def evaluation_ranks(rules: list[Rule], any_match_tiers: tuple[str, ...],
+                     stats: dict[int, RuleStats] | None = None) -> list[int]:
+    """
+    Evaluation position of every rule. Rules of any-match tiers are ordered
+    by mean regex cost over hit rate, cheapest first; rules without
+    statistics count as average. Everything else keeps source order.
+    """
+    stats = stats or {}
+    observed = [s for s in (stats.get(stats_key(r)) for r in rules if r.tier in any_match_tiers) if s and s.tries]
+    average_cost = sum(s.nanoseconds / s.tries for s in observed) / len(observed) if observed else 1.0
+
+    def expected_cost(index: int) -> tuple[float, int]:
+        rule = rules[index]
+        if rule.tier not in any_match_tiers:
+            return 0.0, index
+        rule_stats = stats.get(stats_key(rule))
+        if not rule_stats or not rule_stats.tries:
+            return average_cost / 0.5, index
+        cost = max(rule_stats.nanoseconds / rule_stats.tries, 1.0)
+        hit_rate = (rule_stats.hits + 1) / (rule_stats.tries + 2)
+        return cost / hit_rate, index
+
+    ranks = [0] * len(rules)
+    for position, index in enumerate(sorted(range(len(rules)), key=expected_cost)):
+        ranks[index] = position
+    return ranks
+
+
+def build_table(rules: list[Rule], fingerprint: str, any_match_tiers: tuple[str, ...] = (),
+                stats: dict[int, RuleStats] | None = None) -> bytes:
+    """
+    Compile rules into the binary table format. Rules of any_match_tiers
+    get an evaluation order from stats (see evaluation_ranks).
+    """
+    pool = bytearray()
+    interned = {}
+
+    def intern(text: str) -> tuple[int, int]:
+        if text not in interned:
+            data = text.encode("utf-8")
+            interned[text] = (len(pool), len(data))
+            pool.extend(data)
+        return interned[text]
+
+    valid = []
+    for rule in rules:
+        try:
+            re.compile(rule.pattern, re.IGNORECASE)
+        except re.error as e:
+            print(f"Warning: Invalid pattern '{rule.pattern}': {e}", file=sys.stderr)
+            continue
+        valid.append(rule)
+
+    tiers = sorted({rule.tier for rule in valid})
+    postings = {}
+    rule_bytes = bytearray()
+    for index, rule in enumerate(valid):
+        rule_bytes += RULE.pack(tiers.index(rule.tier), *intern(rule.rule_id),
+                                *intern(rule.pattern), *intern(rule.message))
+        for keyword in extract_keywords(rule.pattern):
+            postings.setdefault(keyword, []).append(index)
+
+    # Tier names go in the pool, in index order, joined by newlines
+    tier_refs = intern("\n".join(tiers)) + intern("\n".join(any_match_tiers))
+    keyword_bytes = bytearray()
+    posting_bytes = bytearray()
+    for keyword in sorted(postings):
+        indexes = postings[keyword]
+        keyword_bytes += KEYWORD.pack(*intern(keyword), len(posting_bytes) // POSTING.size, len(indexes))
+        for index in indexes:
+            posting_bytes += POSTING.pack(index)
+    rank_bytes = b"".join(RANK.pack(rank) for rank in evaluation_ranks(valid, any_match_tiers, stats))
+
+    fp = fingerprint.encode("utf-8")
+    rules_off = HEADER.size + len(fp) + 16
+    keywords_off = rules_off + len(rule_bytes)
+    postings_off = keywords_off + len(keyword_bytes)
+    ranks_off = postings_off + len(posting_bytes)
+    pool_off = ranks_off + len(rank_bytes)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(valid), len(postings),
+                         rules_off, keywords_off, postings_off, ranks_off, pool_off, len(fp))
+    tier_pairs = struct.pack("<IIII", *tier_refs)
+    return bytes(header + fp + tier_pairs + rule_bytes + keyword_bytes + posting_bytes + rank_bytes + pool)
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+
+class PolicyTable:
+    """
+    Read-only view over a compiled table (an mmap or bytes).
+    Rules are decoded and compiled on first use, per process.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        (magic, version, self.rule_count, self.keyword_count, self.rules_off, self.keywords_off,
+         self.postings_off, self.ranks_off, self.pool_off, fp_len) = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a policy table")
+        self.fingerprint = bytes(buf[HEADER.size:HEADER.size + fp_len]).decode("utf-8")
+        tier_off, tier_len, any_off, any_len = struct.unpack_from("<IIII", buf, HEADER.size + fp_len)
+        self.tiers = self._string(tier_off, tier_len).split("\n")
+        self.any_match_tiers = frozenset(self._string(any_off, any_len).split("\n")) - {""}
+        self._keywords = None
+        self._rules = {}
+        self._compiled = {}
+        self._stats = None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.pool_off + offset
+        return bytes(self.buf[start:start + length]).decode("utf-8")
+
+    def keywords(self) -> list[tuple[str, int, int]]:
+        """Return (keyword, first posting, posting count) for every keyword."""
+        if self._keywords is None:
+            self._keywords = []
+            for i in range(self.keyword_count):
+                off, length, first, count = KEYWORD.unpack_from(self.buf, self.keywords_off + i * KEYWORD.size)
+                self._keywords.append((self._string(off, length), first, count))
+        return self._keywords
+
+    def rule(self, index: int) -> Rule:
+        """Decode rule metadata by index."""
+        if index not in self._rules:
+            tier, *refs = RULE.unpack_from(self.buf, self.rules_off + index * RULE.size)
+            rule_id, pattern, message = (self._string(refs[i], refs[i + 1]) for i in (0, 2, 4))
+            self._rules[index] = Rule(rule_id, self.tiers[tier], pattern, message)
+        return self._rules[index]
+
+    def rules(self) -> list[Rule]:
+        """Decode every rule, in source order."""
+        return [self.rule(i) for i in range(self.rule_count)]
+
+    def regex(self, index: int) -> re.Pattern:
+        """Compile a rule's pattern on first use."""
+        if index not in self._compiled:
+            self._compiled[index] = re.compile(self.rule(index).pattern, re.IGNORECASE)
+        return self._compiled[index]
+
+    def postings(self, first: int, count: int) -> list[int]:
+        """Return the rule indexes of a keyword's posting list."""
+        start = self.postings_off + first * POSTING.size
+        return [POSTING.unpack_from(self.buf, start + i * POSTING.size)[0] for i in range(count)]
+
+    def candidates(self, text: str) -> list[int]:
+        """Return indexes of rules whose keywords occur in text, in source order."""
+        lowered = text.lower()
+        indexes = set()
+        for keyword, first, count in self.keywords():
+            if keyword in lowered:
+                indexes.update(self.postings(first, count))
+        return sorted(indexes)
+
+    def rank(self, index: int) -> int:
+        """Evaluation position of a rule."""
+        return RANK.unpack_from(self.buf, self.ranks_off + index * RANK.size)[0]
+
+    def first_match(self, tier: str, text: str, candidates: list[int] | None = None) -> Rule | None:
+        """
+        Return the first rule in tier (source order) whose pattern matches
+        text. For an any-match tier, return the first match in evaluation
+        order instead.
+        """
+        if candidates is None:
+            candidates = self.candidates(text)
+        if tier in self.any_match_tiers:
+            candidates = sorted(candidates, key=self.rank)
+        for index in candidates:
+            rule = self.rule(index)
+            if rule.tier != tier:
+                continue
+            if self._stats is None:
+                if self.regex(index).search(text):
+                    return rule
+                continue
+            regex = self.regex(index)
+            start = time.perf_counter_ns()
+            matched = regex.search(text) is not None
+            tries, hits, nanoseconds = self._stats.get(index, (0, 0, 0))
+            self._stats[index] = (tries + 1, hits + matched, nanoseconds + time.perf_counter_ns() - start)
+            if matched:
+                return rule
+        return None
+
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+
+    def collect_stats(self, path: Path) -> None:
+        """Record rule statistics from now on; they are added to path at exit."""
+        if self._stats is None:
+            self._stats = {}
+            atexit.register(self.flush_stats, path)
+
+    def flush_stats(self, path: Path) -> None:
+        """Add the statistics recorded so far to the stats file at path."""
+        if not self._stats:
+            return
+        keys = [stats_key(self.rule(i)) for i in range(self.rule_count)]
+        size = STATS_HEADER.size + self.rule_count * STAT.size
+        header = STATS_HEADER.pack(STATS_MAGIC, STATS_VERSION, self.rule_count)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, size + 1, 0)
+            if len(data) != size or data[:STATS_HEADER.size] != header or any(
+                    STAT.unpack_from(data, STATS_HEADER.size + i * STAT.size)[0] != key
+                    for i, key in enumerate(keys)):
+                # New file, or the table was rebuilt with other rules: keep the
+                # totals of rules that are still there
+                old = _parse_stats(data)
+                data = header + b"".join(STAT.pack(key, *old.get(key, (0, 0, 0))) for key in keys)
+                os.ftruncate(fd, 0)
+            data = bytearray(data)
+            for index, (tries, hits, nanoseconds) in self._stats.items():
+                offset = STATS_HEADER.size + index * STAT.size
+                key, *totals = STAT.unpack_from(data, offset)
+                STAT.pack_into(data, offset, key, totals[0] + tries, totals[1] + hits, totals[2] + nanoseconds)
+            os.pwrite(fd, bytes(data), 0)
+            self._stats = {}
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+# =============================================================================
+# Loading
+# =============================================================================
+
+def cache_dir() -> Path:
+    """Directory holding compiled tables."""
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "safety-hooks"
+
+
+def source_fingerprint(sources: list[Path]) -> str:
+    """Fingerprint rule sources by path, size and mtime (stat only, no reads)."""
+    parts = [f"v{FORMAT_VERSION}"]
+    for source in sources:
+        try:
+            st = os.stat(source)
+            parts.append(f"{source}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{source}:missing")
+    return "|".join(parts)
+
+
+def table_path(name: str, sources: list[Path]) -> Path:
+    """Cache file for a policy, keyed by the directory of its first source."""
+    key = zlib.crc32(str(Path(sources[0]).parent).encode("utf-8")) if sources else 0
+    return cache_dir() / f"{name}-{key:08x}.policy"
+
+
+def sidecar_data(table: PolicyTable, skip_tiers: tuple[str, ...]) -> bytes:
+    """
+    Render the keyword sidecar: the fingerprint, then every keyword of rules
+    outside skip_tiers. Keywords that can't be stored on one line become ALWAYS.
+    """
+    keywords = set()
+    for keyword, first, count in table.keywords():
+        if any(table.rule(index).tier not in skip_tiers for index in table.postings(first, count)):
+            keywords.add(ALWAYS if "\n" in keyword else keyword)
+    return "\n".join([table.fingerprint, *sorted(keywords)]).encode("utf-8")
+
+
+def map_file(path: Path):
+    """Map a table file read-only, or return None."""
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path: Path, data: bytes) -> bool:
+    """Write data to path via a temp file and rename. False on failure."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def _parse_stats(data: bytes) -> dict[int, RuleStats]:
+    """Decode a stats file's contents by stats_key. Empty if malformed."""
+    try:
+        magic, version, count = STATS_HEADER.unpack_from(data, 0)
+        if magic != STATS_MAGIC or version != STATS_VERSION:
+            return {}
+        entries = [STAT.unpack_from(data, STATS_HEADER.size + i * STAT.size) for i in range(count)]
+    except struct.error:
+        return {}
+    return {key: RuleStats(*totals) for key, *totals in entries}
+
+
+def read_stats(path: Path) -> dict[int, RuleStats]:
+    """Rule statistics from a stats file, by stats_key. Empty if unreadable."""
+    try:
+        return _parse_stats(path.read_bytes())
+    except OSError:
+        return {}
+
+
+def _reorder_due(path: Path, stats_path: Path) -> bool:
+    """True if the statistics are REORDER_SECONDS newer than the table's order."""
+    try:
+        return os.stat(stats_path).st_mtime > os.stat(path).st_mtime + REORDER_SECONDS
+    except OSError:
+        return False
+
+
+def _sampled(table: PolicyTable, stats_path: Path, any_match_tiers: tuple[str, ...]) -> PolicyTable:
+    """Let one process in STATS_SAMPLE_EVERY record statistics for a table with any-match tiers."""
+    if any_match_tiers and int.from_bytes(os.urandom(2), "little") % STATS_SAMPLE_EVERY == 0:
+        table.collect_stats(stats_path)
+    return table
+
+
+def load_policy(name: str, sources: list[Path], build_rules,
+                sidecar_skip_tiers: tuple[str, ...] | None = None,
+                any_match_tiers: tuple[str, ...] = ()) -> PolicyTable:
+    """
+    Attach to the compiled table for a policy, rebuilding it if stale.
+    build_rules() is only called when the table has to be rebuilt.
+    If sidecar_skip_tiers is given, a keyword sidecar for every other tier
+    is kept next to the table. Rules of any_match_tiers, whose callers only
+    ask whether some rule matches, are ordered from recorded statistics.
+    """
+    fingerprint = source_fingerprint(sources)
+    path = table_path(name, sources)
+    sidecar = path.with_suffix(SIDECAR_SUFFIX)
+    stats_path = path.with_suffix(STATS_SUFFIX)
+
+    buf = map_file(path)
+    if buf is not None:
+        try:
+            table = PolicyTable(buf)
+            if table.fingerprint == fingerprint and not (any_match_tiers and _reorder_due(path, stats_path)):
+                if sidecar_skip_tiers is not None and not sidecar.exists():
+                    write_atomic(sidecar, sidecar_data(table, sidecar_skip_tiers))
+                return _sampled(table, stats_path, any_match_tiers)
+        except (ValueError, struct.error):
+            pass
+        buf.close()
+
+    stats = read_stats(stats_path) if any_match_tiers else None
+    table = PolicyTable(build_table(build_rules(), fingerprint, any_match_tiers, stats))
+    if write_atomic(path, table.buf):
+        buf = map_file(path)
+        if buf is not None:
+            table = PolicyTable(buf)
+    if sidecar_skip_tiers is not None:
+        write_atomic(sidecar, sidecar_data(table, sidecar_skip_tiers))
+    return _sampled(table, stats_path, any_match_tiers)
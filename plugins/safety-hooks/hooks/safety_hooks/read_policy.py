@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Read/Grep/Glob policy.
+Asks before credentials are read into context. Uses the credential rules
+in path_policy.py that also guard writes (SSH and cloud credentials, .env
+files, private keys, ...). Grep and Glob patterns are classified without
+expanding them against the filesystem: a search asks if it can reach a
+protected directory, or if its file filter can select a protected file.
+"""
+import os
+
+from .hook_utils import ALLOW, NO_DEADLINE, Deadline, Verdict
+from .path_policy import check_read_glob, check_read_path
+
+
+def resolve(path: str, cwd: str) -> str:
+    """Make a tool path absolute against the session's working directory."""
+    if path.startswith("~") or os.path.isabs(path):
+        return path
+    return os.path.join(cwd or os.getcwd(), path)
+
+
+def check_tool(tool_name: str, tool_input: dict, cwd: str = "", deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check if a Read/Grep/Glob call can reach credentials.
+    Returns: Verdict
+    """
+    if tool_name == "Read":
+        file_path = tool_input.get("file_path", "")
+        if not file_path or not isinstance(file_path, str):
+            return ALLOW
+        return check_read_path(resolve(file_path, cwd), deadline)
+
+    root = tool_input.get("path") or ""
+    root = resolve(root if isinstance(root, str) else "", cwd)
+
+    if tool_name == "Grep":
+        # The search path may be a single file
+        verdict = check_read_path(root, deadline)
+        if verdict.decision != "allow":
+            return verdict
+        # A file filter applies at any depth and selects files to read
+        file_filter = tool_input.get("glob") or ""
+        if file_filter and isinstance(file_filter, str):
+            return check_read_glob(os.path.join(root, "**", file_filter), True, deadline)
+        return check_read_glob(os.path.join(root, "**"), False, deadline)
+
+    if tool_name == "Glob":
+        pattern = tool_input.get("pattern", "")
+        if not pattern or not isinstance(pattern, str):
+            return ALLOW
+        return check_read_glob(resolve(pattern, root), False, deadline)
+
+    return ALLOW
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Cached repository root and current branch per working directory.
+
+Branch protection needs the branch a command starts on, and asking git
+(`git rev-parse --abbrev-ref HEAD`) costs a subprocess on every git
+command. The answer is cached per directory in the policy cache
+directory, together with the stat of the worktree's HEAD file: git
+rewrites HEAD (a new file, renamed over the old one) whenever the
+checked-out branch changes, so an entry whose HEAD no longer has the
+recorded inode, size and mtime is stale. A lookup is one dictionary
+probe and one stat; checkouts made outside the agent are caught the same
+way as the agent's own.
+
+The PostToolUse hook (repo-state-hook.py) refreshes the entry right after
+a command that moves HEAD (checkout, switch, commit, branch, worktree,
+...), so the next PreToolUse check finds it warm instead of paying for
+git itself.
+
+Directories whose repository git would locate differently from the
+walk up to `.git` (GIT_DIR and friends set, bare repositories) are
+never cached.
+"""
+import json
+import os
+import re
+from typing import NamedTuple
+
+from .hook_utils import load_config, parse_command
+from .policy_table import cache_dir, write_atomic
+
+STORE_NAME = "repo-state.json"
+FORMAT_VERSION = 1
+
+# Environment that makes git look somewhere other than the enclosing .git
+GIT_LOCATION_ENV = ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR", "GIT_CEILING_DIRECTORIES")
+
+# git subcommands after which the repository or its HEAD may have changed
+REFRESHING_SUBCOMMANDS = {"checkout", "switch", "commit", "branch", "worktree", "init",
+                          "rebase", "bisect", "merge", "reset", "stash"}
+
+# git options before the subcommand that take a separate value
+GIT_GLOBAL_OPTIONS_WITH_VALUE = {"-C", "-c", "--git-dir", "--work-tree", "--namespace", "--config-env"}
+
+DEFAULT_REPO_STATE_CONFIG = {
+    "enabled": True,
+    "max_entries": 256,
+}
+
+
+class RepoState(NamedTuple):
+    """Where a directory's repository is and what its HEAD was when read."""
+    root: str                        # worktree root
+    head: str                        # path of the worktree's HEAD file
+    signature: tuple[int, int, int]  # (inode, size, mtime_ns) of HEAD
+    branch: str                      # as `git rev-parse --abbrev-ref HEAD` reports it
+
+
+def get_repo_state_config() -> dict:
+    """Repo state cache settings merged over defaults."""
+    return {**DEFAULT_REPO_STATE_CONFIG, **load_config().get("repo_state", {})}
+
+
+def _signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def locate(directory: str) -> tuple[str, str] | None:
+    """
+    (worktree root, git dir) of the repository containing directory, found
+    by walking up to the nearest `.git` directory or `gitdir:` file.
+    """
+    path = os.path.abspath(directory)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git) as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                return path, os.path.normpath(os.path.join(path, line[7:].strip()))
+            return None
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def probe(directory: str) -> RepoState | None:
+    """
+    The repository state of directory before its branch is read (branch
+    left empty), or None if it can't be cached.
+    """
+    if any(os.environ.get(name) for name in GIT_LOCATION_ENV):
+        return None
+    located = locate(directory)
+    if located is None:
+        return None
+    root, git_dir = located
+    head = os.path.join(git_dir, "HEAD")
+    signature = _signature(head)
+    return RepoState(root, head, signature, "") if signature else None
+
+
+def _load() -> dict:
+    try:
+        data = json.loads((cache_dir() / STORE_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+        return {}
+    entries = data.get("entries")
+    return entries if isinstance(entries, dict) else {}
+
+
+def lookup(directory: str, config: dict | None = None) -> RepoState | None:
+    """The cached state of directory, if HEAD hasn't changed since it was read."""
+    config = config or get_repo_state_config()
+    if not config["enabled"] or any(os.environ.get(name) for name in GIT_LOCATION_ENV):
+        return None
+    entry = _load().get(os.path.abspath(directory))
+    try:
+        state = RepoState(entry[0], entry[1], tuple(entry[2]), entry[3])
+    except (TypeError, IndexError, KeyError):
+        return None
+    return state if _signature(state.head) == state.signature else None
+
+
+def store(directory: str, state: RepoState, config: dict | None = None) -> None:
+    """Cache state for directory, dropping the oldest entries past max_entries."""
+    config = config or get_repo_state_config()
+    if not config["enabled"]:
+        return
+    entries = _load()
+    key = os.path.abspath(directory)
+    entries.pop(key, None)
+    entries[key] = list(state)
+    for stale in list(entries)[:max(0, len(entries) - config["max_entries"])]:
+        del entries[stale]
+    write_atomic(cache_dir() / STORE_NAME,
+                 json.dumps({"version": FORMAT_VERSION, "entries": entries}).encode())
+
+
+def changes_head(command: str) -> bool:
+    """True if a command runs a git subcommand that may move HEAD or create a repository."""
+    if not re.search(r"\bgit\b", command):
+        return False
+    for segment in parse_command(command):
+        argv = segment.argv
+        if len(argv) < 2 or os.path.basename(argv[0]) != "git":
+            continue
+        i = 1
+        while i < len(argv) and argv[i].startswith("-"):
+            if argv[i] in GIT_GLOBAL_OPTIONS_WITH_VALUE:
+                i += 1
+            i += 1
+        if i < len(argv) and argv[i] in REFRESHING_SUBCOMMANDS:
+            return True
+    return False
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Domain rule packs, loaded only for the programs they cover.
+
+A pack is a JSON file declaring the programs it covers and block, ask and
+warn rules in the same [pattern, message] form as the extra_* settings:
+
+    {
+      "description": "Terraform and OpenTofu",
+      "programs": ["terraform", "tofu"],
+      "ask": [["\\\\bdestroy\\\\b", "terraform destroy"]]
+    }
+
+Built-in packs live in hooks/rule_packs/; "paths" in the rule_packs config
+adds directories searched first, and "enabled" names the packs in use.
+
+The Bash table holds one gate rule per enabled pack (tier "pack"), whose
+keywords are the pack's program names, so a command naming none of them
+never touches a pack, and fast_path still stands aside for one that does.
+Only when a program of the pack is the canonical argv[0] of a segment
+(wrappers stripped, paths reduced to their basename) is the pack loaded:
+each pack is compiled into its own policy table in the cache directory
+and rebuilt when its file changes, so a loaded pack costs one mmap.
+"""
+import json
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from . import policy_table
+from .hook_utils import ALLOW, NO_DEADLINE, SEVERITY, Deadline, Verdict, load_config, parse_command
+from .policy_table import PolicyTable, Rule, load_policy, make_rules
+
+# Packs shipped with the hooks
+BUILTIN_DIR = Path(__file__).resolve().parent.parent / "rule_packs"
+
+# Tier of the gate rules in the Bash table; their message is the pack name
+GATE_TIER = "pack"
+
+# Tiers a pack may define, most severe first
+PACK_TIERS = ("block", "ask", "warn")
+
+PACK_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+DEFAULT_PACK_CONFIG = {
+    "enabled": [],
+    "paths": [],
+}
+
+
+def get_pack_config() -> dict:
+    """Rule pack settings merged over defaults."""
+    return {**DEFAULT_PACK_CONFIG, **load_config().get("rule_packs", {})}
+
+
+def pack_path(name: str, config: dict | None = None) -> Path | None:
+    """File of a pack: the first <name>.json in the configured paths, then the built-ins."""
+    config = config or get_pack_config()
+    if not PACK_NAME.fullmatch(name):
+        return None
+    for directory in [*(Path(p).expanduser() for p in config["paths"]), BUILTIN_DIR]:
+        path = directory / f"{name}.json"
+        if path.is_file():
+            return path
+    return None
+
+
+def sources(config: dict | None = None) -> list[Path]:
+    """Files of the enabled packs, for the fingerprint of the Bash table."""
+    config = config or get_pack_config()
+    paths = (pack_path(name, config) for name in config["enabled"])
+    return [path for path in paths if path is not None]
+
+
+def read_pack(path: Path) -> dict:
+    """Parse a pack file; an unreadable pack is reported and covers nothing."""
+    try:
+        pack = json.loads(path.read_text())
+        if not isinstance(pack, dict):
+            raise ValueError("not an object")
+        return pack
+    except (OSError, ValueError) as e:
+        print(f"Warning: Failed to load rule pack {path}: {e}", file=sys.stderr)
+        return {}
+
+
+def gate_rules(config: dict | None = None) -> list[tuple[str, str]]:
+    """(pattern matching the pack's program names, pack name) for every enabled pack."""
+    config = config or get_pack_config()
+    gates = []
+    for name in config["enabled"]:
+        path = pack_path(name, config)
+        if path is None:
+            print(f"Warning: Unknown rule pack '{name}'", file=sys.stderr)
+            continue
+        programs = [p for p in read_pack(path).get("programs", []) if isinstance(p, str) and p]
+        if programs:
+            gates.append((f"(?:{'|'.join(re.escape(p) for p in programs)})", name))
+    return gates
+
+
+def build_pack_rules(name: str, path: Path) -> list[Rule]:
+    """Rules of one pack, as pack.<name>.<tier>.<index>."""
+    pack = read_pack(path)
+    rules = []
+    for tier in PACK_TIERS:
+        rules += make_rules(f"pack.{name}", tier, pack.get(tier, []))
+    return rules
+
+
+@lru_cache(maxsize=None)
+def load_pack(name: str) -> PolicyTable | None:
+    """Attach to a pack's compiled table, building it if stale."""
+    path = pack_path(name)
+    if path is None:
+        return None
+    sources = [path, Path(policy_table.__file__).resolve()]
+    return load_policy(f"pack-{name}", sources, lambda: build_pack_rules(name, path))
+
+
+def command_programs(command: str) -> set[str]:
+    """Canonical program names (argv[0] of every segment) a command runs."""
+    return {segment.argv[0] for segment in parse_command(command) if segment.argv}
+
+
+def matching_packs(policy: PolicyTable, candidates: list[int], programs: set[str]) -> list[str]:
+    """Names of the packs whose gate rule names one of the programs."""
+    names = []
+    for index in candidates:
+        rule = policy.rule(index)
+        if rule.tier == GATE_TIER and any(policy.regex(index).fullmatch(p) for p in programs):
+            names.append(rule.message)
+    return names
+
+
+def check_pack(name: str, command: str, deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check a normalized command against one pack; the most severe tier wins.
+    Returns: Verdict
+    """
+    table = load_pack(name)
+    deadline.check(f"rule pack {name}")
+    if table is None:
+        return ALLOW
+    candidates = table.candidates(command)
+    for tier in PACK_TIERS:
+        rule = table.first_match(tier, command, candidates)
+        if rule:
+            return Verdict(tier, rule.message, rule.rule_id)
+    return ALLOW
+
+
+def check_command(command: str, policy: PolicyTable, candidates: list[int], programs: set[str],
+                  deadline: Deadline = NO_DEADLINE) -> Verdict:
+    """
+    Check a normalized command against every pack covering one of its
+    programs (canonical argv[0] of its segments).
+    Returns: Verdict for the most severe pack.
+    """
+    result = ALLOW
+    for name in matching_packs(policy, candidates, programs):
+        verdict = check_pack(name, command, deadline)
+        if SEVERITY[verdict.decision] > SEVERITY[result.decision]:
+            result = verdict
+            if result.decision == "block":
+                break
+    return result
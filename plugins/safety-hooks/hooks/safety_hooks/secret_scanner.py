@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Secret detection for content written through Write/Edit.
+
+Every known key format starts with a literal anchor (AKIA, ghp_, -----BEGIN,
+...). All anchors are merged into one table, located with substring search,
+and the full signature is only checked where an anchor occurs. Generic
+`secret = "..."` assignments are found by keyword and only reported when the
+value has high Shannon entropy, so placeholders don't trigger.
+
+Scanning works on chunks that end at a line break, or mid-line with a
+short overlap when a line is longer than a chunk. Every pattern bounds
+its repetitions, and the time budget is checked between anchor and
+keyword hits, so one huge line costs no more than many short ones; the
+scan stops at a byte or time budget.
+"""
+import math
+import re
+import time
+from typing import NamedTuple
+
+# Scan budget defaults (overridable in config.json)
+MAX_SCAN_BYTES = 4 * 1024 * 1024
+MAX_SCAN_SECONDS = 1.0
+CHUNK_SIZE = 64 * 1024
+
+# Characters rescanned after a mid-line chunk cut: longer than any anchor or
+# keyword, so none straddles a cut unseen (matches themselves run past it)
+CHUNK_OVERLAP = 64
+
+# Minimum bits per character for a generic assignment to count as a secret
+MIN_ENTROPY = 3.5
+
+# =============================================================================
+# SIGNATURES - Known credential formats (name, anchors, pattern, description)
+# Each pattern must start with one of its literal anchors.
+# =============================================================================
+SIGNATURES = [
+    ("private_key", ("-----BEGIN ",),
+     r"-----BEGIN (?:[A-Z]+ )*PRIVATE KEY(?: BLOCK)?-----",
+     "private key block"),
+    ("aws_access_key", ("AKIA", "ASIA", "ABIA", "ACCA", "A3T"),
+     r"(?:AKIA|ASIA|ABIA|ACCA|A3T[A-Z0-9])[A-Z0-9]{16}\b",
+     "AWS access key ID"),
+    ("github_token", ("ghp_", "gho_", "ghu_", "ghs_", "ghr_"),
+     r"gh[pousr]_[A-Za-z0-9]{36,255}\b",
+     "GitHub token"),
+    ("github_pat", ("github_pat_",),
+     r"github_pat_[A-Za-z0-9_]{60,255}\b",
+     "GitHub fine-grained token"),
+    ("gitlab_token", ("glpat-",),
+     r"glpat-[A-Za-z0-9_\-]{20,512}",
+     "GitLab token"),
+    ("slack_token", ("xoxa-", "xoxb-", "xoxp-", "xoxo-", "xoxs-", "xoxr-"),
+     r"xox[abposr]-[A-Za-z0-9\-]{10,512}",
+     "Slack token"),
+    ("slack_webhook", ("hooks.slack.com/services/",),
+     r"hooks\.slack\.com/services/T[A-Za-z0-9_]{1,64}/B[A-Za-z0-9_]{1,64}/[A-Za-z0-9_]{1,64}",
+     "Slack webhook URL"),
+    ("stripe_key", ("sk_live_", "rk_live_"),
+     r"[sr]k_live_[A-Za-z0-9]{20,512}",
+     "Stripe live key"),
+    ("google_api_key", ("AIza",),
+     r"AIza[0-9A-Za-z_\-]{35}",
+     "Google API key"),
+    ("anthropic_key", ("sk-ant-",),
+     r"sk-ant-[A-Za-z0-9_\-]{32,512}",
+     "Anthropic API key"),
+    ("openai_key", ("sk-",),
+     r"sk-(?:proj-|svcacct-)?[A-Za-z0-9_\-]{20,512}T3BlbkFJ[A-Za-z0-9_\-]{20,512}",
+     "OpenAI API key"),
+    ("npm_token", ("npm_",),
+     r"npm_[A-Za-z0-9]{36}\b",
+     "npm token"),
+    ("pypi_token", ("pypi-AgEIcHlwaS5vcmc",),
+     r"pypi-AgEIcHlwaS5vcmc[A-Za-z0-9_\-]{50,512}",
+     "PyPI token"),
+    ("jwt", ("eyJ",),
+     r"eyJ[A-Za-z0-9_\-]{10,512}\.eyJ[A-Za-z0-9_\-]{10,512}\.[A-Za-z0-9_\-]{10,512}",
+     "JSON Web Token"),
+]
+
+SIGNATURE_DESCRIPTIONS = {name: description for name, _, _, description in SIGNATURES}
+
+# Merged anchor table: literal -> compiled signatures starting with it
+ANCHORS = {}
+for _name, _anchors, _pattern, _ in SIGNATURES:
+    for _anchor in _anchors:
+        ANCHORS.setdefault(_anchor, []).append((_name, re.compile(_pattern)))
+
+# Lowercase keywords that start a generic secret assignment
+GENERIC_KEYWORDS = ("secret", "token", "passw", "api_key", "apikey", "api-key",
+                    "access_key", "auth", "credential")
+
+# Generic assignment of a long token to a secret-sounding name
+GENERIC_ASSIGNMENT = re.compile(
+    r"[\w.\-]{0,64}['\"]?\s{0,16}[:=]\s{0,16}['\"]?([A-Za-z0-9+/=_\-]{20,512})"
+)
+
+
+class Finding(NamedTuple):
+    """A suspected secret in scanned content."""
+    detector: str
+    description: str
+    line: int
+
+
+def shannon_entropy(value: str) -> float:
+    """Return the Shannon entropy of value in bits per character."""
+    if not value:
+        return 0.0
+    counts = {}
+    for char in value:
+        counts[char] = counts.get(char, 0) + 1
+    length = len(value)
+    return -sum(n / length * math.log2(n / length) for n in counts.values())
+
+
+def _looks_random(value: str) -> bool:
+    """True if value mixes letters and digits with high entropy."""
+    has_digit = any(c.isdigit() for c in value)
+    has_alpha = any(c.isalpha() for c in value)
+    return has_digit and has_alpha and shannon_entropy(value) >= MIN_ENTROPY
+
+
+def _match_signature(text: str, start: int, end: int, limit: int, deadline: float) -> tuple[str, int] | None:
+    """
+    Return (signature name, offset) of the earliest signature with its anchor
+    in text[start:end]; matches may run on to limit. Gives up (None) past deadline.
+    """
+    best = None
+    for anchor, signatures in ANCHORS.items():
+        stop = end if best is None else best[1]
+        idx = text.find(anchor, start, stop)
+        while idx >= 0:
+            if time.monotonic() > deadline:
+                return best
+            hit = next((name for name, pattern in signatures if pattern.match(text, idx, limit)), None)
+            if hit:
+                best = (hit, idx)
+                break
+            idx = text.find(anchor, idx + 1, stop)
+    return best
+
+
+def _match_generic(text: str, start: int, end: int, limit: int, deadline: float) -> int | None:
+    """
+    Return the offset of a high-entropy secret assignment whose keyword is in
+    text[start:end]; the value may run on to limit. Gives up (None) past deadline.
+    """
+    lowered = text[start:end].lower()
+    for keyword in GENERIC_KEYWORDS:
+        idx = lowered.find(keyword)
+        while idx >= 0:
+            if time.monotonic() > deadline:
+                return None
+            match = GENERIC_ASSIGNMENT.match(text, start + idx + len(keyword), limit)
+            if match and _looks_random(match.group(1)):
+                return match.start(1)
+            idx = lowered.find(keyword, idx + 1)
+    return None
+
+
+def _scan_chunk(text: str, start: int, end: int, limit: int, deadline: float) -> tuple[str, str, int] | None:
+    """Return (detector, description, offset) for the first secret found in text[start:end]."""
+    hit = _match_signature(text, start, end, limit, deadline)
+    if hit:
+        name, offset = hit
+        return name, SIGNATURE_DESCRIPTIONS[name], offset
+    offset = _match_generic(text, start, end, limit, deadline)
+    if offset is not None:
+        return "high_entropy_assignment", "high-entropy secret assignment", offset
+    return None
+
+
+def scan_text(text: str, max_bytes: int = MAX_SCAN_BYTES,
+              max_seconds: float = MAX_SCAN_SECONDS,
+              chunk_size: int = CHUNK_SIZE) -> Finding | None:
+    """
+    Scan text for secrets in chunks of at most chunk_size characters, ending
+    at the chunk's last line break, else cut mid-line and overlapped.
+    Returns the first Finding, or None if nothing was found within budget.
+    """
+    deadline = time.monotonic() + max_seconds
+    limit = min(len(text), max_bytes)
+    overlap = min(CHUNK_OVERLAP, chunk_size // 2)
+    line = 1
+    start = 0
+    while start < limit:
+        end = next_start = min(start + chunk_size, limit)
+        if end < limit:
+            newline = text.rfind("\n", start, end)
+            if newline >= 0:
+                end = next_start = newline + 1
+            else:
+                next_start = end - overlap
+        hit = _scan_chunk(text, start, end, limit, deadline)
+        if hit:
+            detector, description, offset = hit
+            return Finding(detector, description, line + text.count("\n", start, offset))
+        if time.monotonic() > deadline:
+            break
+        line += text.count("\n", start, next_start)
+        start = next_start
+    return None
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Shadow evaluation of a candidate policy.
+
+With a "shadow" section in config.json, every hook run also checks the
+call against a candidate policy: another hooks directory (a checkout of a
+branch under review), the live one with another config.json, or both.
+The candidate never changes the live decision. It runs after the live
+check, in a forked child process that is killed when its time budget
+runs out, so even a regex that never finishes can't hold the hook past
+its deadline; one JSON line per call is appended to the shadow log: both
+verdicts, whether they diverge, and the milliseconds each took.
+
+The candidate's safety_hooks package is imported, in the child, under
+another name, so it keeps its own modules, config and compiled policy
+tables. A candidate config without a hooks directory is paired with a
+copy of the live package made once in the cache directory. Without
+os.fork (Windows) the candidate is not run and the call is logged as
+unsupported.
+"""
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import select
+import signal
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from .hook_utils import CONFIG_PATH, Deadline, Verdict, load_config
+from .policy_table import cache_dir, source_fingerprint
+
+# Name the candidate's package is imported under
+CANDIDATE_PACKAGE = "safety_hooks_shadow"
+
+# Input field a reader recognizes a call by; other fields (file content) are never logged
+SUBJECT_FIELDS = {"Bash": "command", "Write": "file_path", "Edit": "file_path",
+                  "Read": "file_path", "Grep": "path", "Glob": "pattern", "WebFetch": "url"}
+MAX_SUBJECT = 500
+
+DEFAULT_SHADOW_CONFIG = {
+    "hooks": "",
+    "config": "",
+    "seconds": 0.5,
+    "log": "",
+    "only_divergent": False,
+}
+
+LOG_NAME = "shadow.jsonl"
+
+# Rule the bash table gets while shadowing: it has no keyword, so fast_path
+# stands aside and every command reaches the candidate (see bash_policy.build_rules)
+FAST_PATH_GATE = [(r"", "shadow evaluation")]
+
+_candidate = {}
+
+
+def get_shadow_config() -> dict:
+    """Shadow settings merged over defaults."""
+    return {**DEFAULT_SHADOW_CONFIG, **load_config().get("shadow", {})}
+
+
+def enabled(config: dict | None = None) -> bool:
+    """True if a candidate hooks directory or config is configured."""
+    config = config or get_shadow_config()
+    return bool(config["hooks"] or config["config"])
+
+
+def _resolve(path: str) -> Path:
+    """Resolve a config-relative path."""
+    return (CONFIG_PATH.parent / Path(path).expanduser()).resolve()
+
+
+def log_path(config: dict) -> Path:
+    """File the shadow results are appended to."""
+    return _resolve(config["log"]) if config["log"] else cache_dir() / LOG_NAME
+
+
+def candidate_dir(config: dict) -> Path:
+    """
+    Hooks directory of the candidate. A candidate config is copied, with
+    the candidate's (or live) safety_hooks package, into the cache
+    directory; the copy is reused until any of its sources changes.
+    """
+    hooks = _resolve(config["hooks"]) if config["hooks"] else CONFIG_PATH.parent.resolve()
+    if not config["config"]:
+        return hooks
+    candidate_config = _resolve(config["config"])
+    package = hooks / "safety_hooks"
+    fingerprint = source_fingerprint([candidate_config, *sorted(package.glob("*.py"))])
+    dest = cache_dir() / f"shadow-{zlib.crc32(fingerprint.encode('utf-8')):08x}"
+    if not (dest / "config.json").exists():
+        import shutil
+
+        staging = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+        shutil.copytree(package, staging / "safety_hooks", ignore=shutil.ignore_patterns("__pycache__"))
+        shutil.copyfile(candidate_config, staging / "config.json")
+        try:
+            os.rename(staging, dest)
+        except OSError:
+            # Another hook made the same copy first
+            shutil.rmtree(staging, ignore_errors=True)
+    return dest
+
+
+def load_candidate(hooks_dir: Path):
+    """Import the candidate's policy engine under CANDIDATE_PACKAGE, once per process."""
+    if str(hooks_dir) not in _candidate:
+        package_dir = hooks_dir / "safety_hooks"
+        if not (package_dir / "engine.py").exists():
+            raise ImportError(f"no policy engine in {hooks_dir}")
+        spec = importlib.util.spec_from_file_location(
+            CANDIDATE_PACKAGE, package_dir / "__init__.py", submodule_search_locations=[str(package_dir)])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[CANDIDATE_PACKAGE] = package
+        spec.loader.exec_module(package)
+        _candidate[str(hooks_dir)] = importlib.import_module(f"{CANDIDATE_PACKAGE}.engine")
+    return _candidate[str(hooks_dir)]
+
+
+def _subject(tool_name: str, tool_input: dict) -> str:
+    subject = str(tool_input.get(SUBJECT_FIELDS.get(tool_name, ""), ""))
+    return subject if len(subject) <= MAX_SUBJECT else subject[:MAX_SUBJECT] + "..."
+
+
+def _append(path: Path, entry: dict) -> None:
+    """Append one JSON line; a single O_APPEND write keeps concurrent hooks' lines whole."""
+    data = (json.dumps(entry, sort_keys=True) + "\n").encode("utf-8")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _evaluate_here(policy: str, tool_name: str, tool_input: dict, cwd: str,
+                   config: dict, seconds: float, started: float) -> tuple[Verdict | None, str]:
+    """evaluate_candidate's work, in the process that runs the candidate."""
+    stderr = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(stderr):
+            engine = load_candidate(candidate_dir(config))
+            # The candidate raises its own DeadlineExceeded, so it gets its own Deadline
+            deadline = engine.Deadline(seconds, started=started)
+            deadline.check("shadow policy loading")
+            if policy not in engine.POLICIES:
+                return Verdict("allow", ""), ""
+            result = engine.check(policy, tool_name, tool_input, cwd, deadline)
+        return Verdict(*result[:3]), ""
+    except Exception as e:  # a broken candidate must never break the live hook
+        if type(e).__name__ == "DeadlineExceeded":
+            return None, "timeout"
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _read_until(fd: int, stop: float) -> bytes | None:
+    """Read fd to EOF, or None if stop (monotonic) comes first."""
+    data = b""
+    while True:
+        remaining = stop - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            return None
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return data
+        data += chunk
+
+
+def evaluate_candidate(policy: str, tool_name: str, tool_input: dict, cwd: str,
+                       config: dict, seconds: float) -> tuple[Verdict | None, str]:
+    """
+    Check a call with the candidate's policy within seconds, loading
+    included, in a forked child that is killed when they run out.
+    Returns (verdict, problem): the verdict is None when the candidate
+    timed out ("timeout") or failed (the exception).
+    """
+    started = time.monotonic()
+    if seconds <= 0:
+        return None, "timeout"
+    if not hasattr(os, "fork"):
+        return None, "unsupported: no os.fork"
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: nothing it prints may reach the hook's output, and it exits
+        # without flushing buffers or running cleanups it shares with the parent
+        status = 1
+        try:
+            os.close(read_fd)
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            verdict, problem = _evaluate_here(policy, tool_name, tool_input, cwd, config, seconds, started)
+            os.write(write_fd, json.dumps([list(verdict) if verdict else None, problem]).encode("utf-8"))
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    try:
+        data = _read_until(read_fd, started + seconds)
+    finally:
+        os.close(read_fd)
+        if data is None:
+            with contextlib.suppress(OSError):
+                os.kill(pid, signal.SIGKILL)
+        with contextlib.suppress(OSError):
+            os.waitpid(pid, 0)
+    if data is None:
+        return None, "timeout"
+    try:
+        verdict, problem = json.loads(data)
+        return (Verdict(*verdict) if verdict else None), problem
+    except (ValueError, TypeError):
+        return None, "candidate process exited without a verdict"
+
+
+def observe(policy: str, tool_name: str, tool_input: dict, cwd: str, live: Verdict,
+            live_seconds: float, deadline: Deadline, session_id: str = "") -> None:
+    """
+    Evaluate the candidate policy on a call the live policy decided, and
+    log the comparison. The budget is the configured "seconds", cut to
+    what is left of the live deadline.
+    """
+    config = get_shadow_config()
+    if not enabled(config):
+        return
+    seconds = min(config["seconds"], deadline.remaining())
+    start = time.perf_counter()
+    shadow, problem = evaluate_candidate(policy, tool_name, tool_input, cwd, config, seconds)
+    shadow_seconds = time.perf_counter() - start
+
+    diverged = shadow is None or (shadow.decision, shadow.rule_id) != (live.decision, live.rule_id)
+    if config["only_divergent"] and not diverged:
+        return
+    entry = {
+        "time": round(time.time(), 3),
+        "session_id": session_id,
+        "policy": policy,
+        "tool_name": tool_name,
+        "subject": _subject(tool_name, tool_input),
+        "live": {"decision": live.decision, "rule_id": live.rule_id, "ms": round(live_seconds * 1000, 3)},
+        "shadow": {"decision": shadow.decision if shadow else "", "rule_id": shadow.rule_id if shadow else "",
+                   "ms": round(shadow_seconds * 1000, 3)},
+        "diverged": diverged,
+    }
+    if problem:
+        entry["shadow"]["problem"] = problem
+    _append(log_path(config), entry)
@@ -0,0 +1,717 @@
+#!/usr/bin/env python3
+"""
+Uncommitted work a destructive git command would discard.
+
+`git reset --hard`, `git checkout -- <paths>`, `git restore`, `git clean -f`
+and `git stash drop/clear` only lose something when there is something to
+lose. (`git reset --hard <commit>` always may: it moves the branch, and
+the commits it leaves behind are not looked for.) This module answers that without running git: it reads the index
+file, compares each entry's stat data with the file on disk (hashing the
+content only where the stat data can't decide, as git does for "racy"
+entries), walks the worktree for untracked files with .gitignore rules
+applied, compares the index's cached root tree with HEAD's tree for staged
+changes, and looks for refs/stash.
+
+Everything runs under its own time budget. Whatever can't be decided in
+time, or at all (unsupported index formats, delta-compressed commits,
+unknown directories), counts as at risk, so the caller keeps asking.
+"""
+import hashlib
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from typing import NamedTuple
+
+from .hook_utils import ALLOW, NO_DEADLINE, Deadline, DeadlineExceeded, Verdict, load_config, parse_command
+
+# Check budget default (overridable in config.json)
+MAX_CHECK_SECONDS = 0.5
+
+# Paths named in a verdict message
+MAX_NAMED_PATHS = 3
+
+# Larger files whose stat data changed count as modified without hashing
+MAX_HASH_BYTES = 16 * 1024 * 1024
+
+# git options before the subcommand that take a separate value
+GIT_GLOBAL_OPTIONS_WITH_VALUE = {"-C", "-c", "--git-dir", "--work-tree", "--namespace", "--config-env"}
+
+# restore/clean options that take a separate value
+RESTORE_OPTIONS_WITH_VALUE = {"-s", "--source", "--pathspec-from-file"}
+CLEAN_OPTIONS_WITH_VALUE = {"-e", "--exclude"}
+
+PATHSPEC_MAGIC = re.compile(r"[*?\[]|^:")
+
+# Names of the current commit, as a reset target
+HEAD_NAMES = {"HEAD", "@"}
+
+# =============================================================================
+# INDEX FORMAT - .git/index, versions 2 to 4
+# =============================================================================
+INDEX_SIGNATURE = b"DIRC"
+INDEX_HEADER = struct.Struct(">4sII")
+ENTRY_STAT = struct.Struct(">10I")
+FLAG_ASSUME_VALID = 0x8000
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE = 0x3000
+EXTENDED_SKIP_WORKTREE = 0x4000
+EXTENDED_INTENT_TO_ADD = 0x2000
+
+# Index extensions this reader can't interpret (split and sparse indexes)
+UNSUPPORTED_EXTENSIONS = {b"link", b"sdir"}
+
+MODE_TYPE = 0o170000
+MODE_SYMLINK = 0o120000
+MODE_GITLINK = 0o160000
+
+PACK_IDX_SIGNATURE = b"\377tOc"
+PACK_COMMIT = 1
+
+
+class IndexEntry(NamedTuple):
+    """One stage-0 (or conflicted) path of the index, with its stat data."""
+    path: str
+    ctime_ns: int
+    mtime_ns: int
+    ino: int
+    mode: int
+    size: int
+    oid: bytes
+    pending: bool       # conflicted or intent-to-add: the index doesn't hold the content
+    skip: bool          # assume-valid or skip-worktree: git doesn't look at the file
+
+
+class Index(NamedTuple):
+    entries: tuple[IndexEntry, ...]
+    root_tree: bytes | None     # cached tree of the whole index, None if invalidated
+    mtime_ns: int               # entries modified at or after this are "racy"
+
+
+def get_worktree_config() -> dict:
+    """Get dirty worktree check config with defaults."""
+    config = load_config().get("bash_safety", {}).get("dirty_worktree", {})
+    return {
+        "enabled": config.get("enabled", True),
+        "max_seconds": config.get("max_seconds", MAX_CHECK_SECONDS),
+    }
+
+
+def _varint(data: bytes, pos: int) -> tuple[int, int]:
+    """git's offset varint (index v4 name prefixes). Returns (value, next position)."""
+    byte = data[pos]
+    value = byte & 0x7F
+    while byte & 0x80:
+        pos += 1
+        byte = data[pos]
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos + 1
+
+
+def _cache_tree_root(data: bytes, hash_size: int) -> bytes | None:
+    """Root tree ID from a TREE extension, or None if it was invalidated."""
+    path_end = data.index(b"\0")
+    line_end = data.index(b"\n", path_end)
+    entry_count = int(data[path_end + 1:line_end].split(b" ")[0])
+    return data[line_end + 1:line_end + 1 + hash_size] if path_end == 0 and entry_count >= 0 else None
+
+
+def parse_index(data: bytes, hash_size: int = 20, mtime_ns: int = 0) -> Index:
+    """Parse an index file. Raises ValueError for formats it doesn't support."""
+    signature, version, count = INDEX_HEADER.unpack_from(data)
+    if signature != INDEX_SIGNATURE or version not in (2, 3, 4):
+        raise ValueError(f"index version {version}")
+    entries = []
+    pos = INDEX_HEADER.size
+    name = b""
+    for _ in range(count):
+        start = pos
+        ctime_s, ctime_ns, mtime_s, mtime_ns_part, _dev, ino, mode, _uid, _gid, size = \
+            ENTRY_STAT.unpack_from(data, pos)
+        pos += ENTRY_STAT.size
+        oid = data[pos:pos + hash_size]
+        (flags,) = struct.unpack_from(">H", data, pos + hash_size)
+        pos += hash_size + 2
+        extended = 0
+        if flags & FLAG_EXTENDED:
+            (extended,) = struct.unpack_from(">H", data, pos)
+            pos += 2
+        if version == 4:
+            strip, pos = _varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = name[:len(name) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            pos = start + ((end - start + 8) & ~7)
+        entries.append(IndexEntry(
+            name.decode("utf-8", "surrogateescape"), ctime_s * 10**9 + ctime_ns, mtime_s * 10**9 + mtime_ns_part,
+            ino, mode, size, oid, bool(flags & FLAG_STAGE or extended & EXTENDED_INTENT_TO_ADD),
+            bool(flags & FLAG_ASSUME_VALID or extended & EXTENDED_SKIP_WORKTREE)))
+
+    root_tree = None
+    end = len(data) - hash_size
+    while pos + 8 <= end:
+        signature, size = struct.unpack_from(">4sI", data, pos)
+        if signature in UNSUPPORTED_EXTENSIONS:
+            raise ValueError(f"index extension {signature.decode('ascii', 'replace')}")
+        if signature == b"TREE" and size:
+            root_tree = _cache_tree_root(data[pos + 8:pos + 8 + size], hash_size)
+        pos += 8 + size
+    return Index(tuple(entries), root_tree, mtime_ns)
+
+
+# =============================================================================
+# Ignore rules - .gitignore, info/exclude, core.excludesFile, clean -e
+# =============================================================================
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regex over /-separated paths."""
+    out, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i) and i + 2 == len(pattern):
+            out.append(".*")
+            break
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2:]:
+            close = pattern.index("]", i + 2)
+            body = pattern[i + 1:close]
+            out.append("[" + ("^" + body[1:] if body[:1] in ("!", "^") else body).replace("\\", "\\\\") + "]")
+            i = close
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRule(NamedTuple):
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def parse_ignore(lines: list[str]) -> list[IgnoreRule]:
+    """Compile the lines of an ignore file."""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        line = line[1:] if negate else line
+        if line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        rules.append(IgnoreRule(re.compile(regex if anchored else "(?:.*/)?" + regex), negate, dir_only))
+    return rules
+
+
+def _read_lines(path: str) -> list[str]:
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def ignored(rel: str, is_dir: bool, sources: list[tuple[str, list[IgnoreRule]]]) -> bool:
+    """
+    True if a worktree-relative path is ignored. sources are (base directory,
+    rules) from lowest to highest precedence; the last matching rule wins.
+    """
+    for base, rules in reversed(sources):
+        if base and not rel.startswith(base + "/"):
+            continue
+        local = rel[len(base) + 1:] if base else rel
+        for rule in reversed(rules):
+            if (is_dir or not rule.dir_only) and rule.regex.fullmatch(local):
+                return not rule.negate
+    return False
+
+
+# =============================================================================
+# Worktree
+# =============================================================================
+
+def _git_config_value(text: str, section: str, key: str) -> str | None:
+    """Value of key in [section] of a git config file (no includes, last wins)."""
+    value, current = None, ""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("["):
+            current = line.strip("[]").split()[0].lower() if line.strip("[]").split() else ""
+        elif current == section and "=" in line:
+            name, _, raw = line.partition("=")
+            if name.strip().lower() == key:
+                value = raw.strip().strip('"')
+    return value
+
+
+class Worktree:
+    """Lazily read state of the git worktree containing a directory."""
+
+    def __init__(self, root: str, git_dir: str, budget: Deadline):
+        self.root = root
+        self.git_dir = git_dir
+        self.budget = budget
+        common = _read_lines(os.path.join(git_dir, "commondir"))
+        self.common_dir = os.path.normpath(os.path.join(git_dir, common[0].strip())) if common else git_dir
+        self.config = "".join(_read_lines(os.path.join(self.common_dir, "config")))
+        object_format = _git_config_value(self.config, "extensions", "objectformat") or "sha1"
+        self.hash_name = "sha256" if object_format.lower() == "sha256" else "sha1"
+        self.hash_size = 32 if self.hash_name == "sha256" else 20
+        self._index = None
+
+    @classmethod
+    def find(cls, directory: str, budget: Deadline) -> "Worktree | None":
+        """The worktree containing directory, or None outside any repository."""
+        path = os.path.abspath(directory)
+        while True:
+            dot_git = os.path.join(path, ".git")
+            if os.path.isdir(dot_git):
+                return cls(path, dot_git, budget)
+            if os.path.isfile(dot_git):
+                with open(dot_git) as f:
+                    line = f.readline().strip()
+                if line.startswith("gitdir:"):
+                    return cls(path, os.path.normpath(os.path.join(path, line[7:].strip())), budget)
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+    def index(self) -> Index:
+        """The parsed index; an unborn repository without one has no entries."""
+        if self._index is None:
+            path = os.path.join(self.git_dir, "index")
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                    mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            except FileNotFoundError:
+                data, mtime_ns = INDEX_HEADER.pack(INDEX_SIGNATURE, 2, 0), 0
+            self._index = parse_index(data, self.hash_size, mtime_ns)
+        return self._index
+
+    def _blob_id(self, path: str, entry: IndexEntry) -> bytes:
+        if entry.mode & MODE_TYPE == MODE_SYMLINK:
+            data = os.fsencode(os.readlink(path))
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+        return hashlib.new(self.hash_name, b"blob %d\0" % len(data) + data).digest()
+
+    def _changed(self, entry: IndexEntry) -> bool:
+        """True if the file no longer matches its index entry."""
+        path = os.path.join(self.root, entry.path)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return True
+        if entry.mode & MODE_TYPE != st.st_mode & MODE_TYPE:
+            return True
+        if entry.mode & MODE_TYPE != MODE_SYMLINK and (entry.mode & 0o100) != (st.st_mode & 0o100):
+            return True
+        if entry.size != st.st_size & 0xFFFFFFFF:
+            return True
+        same_stat = (entry.mtime_ns == _truncate(st.st_mtime_ns, entry.mtime_ns)
+                     and entry.ctime_ns == _truncate(st.st_ctime_ns, entry.ctime_ns)
+                     and entry.ino in (0, st.st_ino & 0xFFFFFFFF))
+        racy = entry.mtime_ns >= self.index().mtime_ns
+        if same_stat and not racy:
+            return False
+        self.budget.check("worktree content")
+        return st.st_size > MAX_HASH_BYTES or self._blob_id(path, entry) != entry.oid
+
+    def modified(self, prefixes: list[str] | None) -> list[str]:
+        """Tracked paths under prefixes (None: everywhere) whose content differs from the index."""
+        found = []
+        for entry in self.index().entries:
+            if entry.skip or entry.mode & MODE_TYPE == MODE_GITLINK or not _under(entry.path, prefixes):
+                continue
+            self.budget.check("worktree stat")
+            if entry.pending or self._changed(entry):
+                found.append(entry.path)
+                if len(found) > MAX_NAMED_PATHS:
+                    break
+        return found
+
+    def head_tree(self) -> bytes | None:
+        """Tree ID of HEAD's commit, or None if it can't be read."""
+        oid = self._resolve("HEAD")
+        commit = self._read_commit(oid) if oid else None
+        if commit is None or not commit.startswith(b"tree "):
+            return None
+        return bytes.fromhex(commit[5:commit.index(b"\n")].decode("ascii"))
+
+    def staged(self) -> bool:
+        """True unless the index's cached tree is known to equal HEAD's tree."""
+        index = self.index()
+        if not index.entries:
+            return False
+        return index.root_tree is None or index.root_tree != self.head_tree()
+
+    def has_stash(self) -> bool:
+        """True if refs/stash exists (or reftables hide whether it does)."""
+        if os.path.isfile(os.path.join(self.common_dir, "refs", "stash")):
+            return True
+        if os.path.isdir(os.path.join(self.common_dir, "reftable")):
+            return True  # can't tell without reading reftables
+        return any(line.rstrip().endswith(" refs/stash")
+                   for line in _read_lines(os.path.join(self.common_dir, "packed-refs")))
+
+    def _resolve(self, ref: str, depth: int = 0) -> bytes | None:
+        for base in (self.git_dir, self.common_dir):
+            lines = _read_lines(os.path.join(base, ref))
+            if lines:
+                value = lines[0].strip()
+                if value.startswith("ref:"):
+                    return self._resolve(value[4:].strip(), depth + 1) if depth < 5 else None
+                return bytes.fromhex(value) if len(value) == 2 * self.hash_size else None
+        for line in _read_lines(os.path.join(self.common_dir, "packed-refs")):
+            value, _, name = line.strip().partition(" ")
+            if name == ref:
+                return bytes.fromhex(value)
+        return None
+
+    def _read_commit(self, oid: bytes) -> bytes | None:
+        """Body of a commit object, loose or packed (undeltified), else None."""
+        objects = os.path.join(self.common_dir, "objects")
+        hex_id = oid.hex()
+        try:
+            with open(os.path.join(objects, hex_id[:2], hex_id[2:]), "rb") as f:
+                data = zlib.decompress(f.read())
+            return data[data.index(b"\0") + 1:] if data.startswith(b"commit ") else None
+        except (OSError, zlib.error, ValueError):
+            pass
+        pack_dir = os.path.join(objects, "pack")
+        try:
+            names = sorted(name for name in os.listdir(pack_dir) if name.endswith(".idx"))
+        except OSError:
+            return None
+        for name in names:
+            self.budget.check("pack index")
+            offset = _pack_offset(os.path.join(pack_dir, name), oid, self.hash_size)
+            if offset is not None:
+                return _packed_commit(os.path.join(pack_dir, name[:-4] + ".pack"), offset)
+        return None
+
+    def untracked(self, prefixes: list[str] | None, directories: bool, mode: str,
+                  excludes: list[str]) -> list[str]:
+        """
+        Untracked files `git clean` would remove under prefixes. mode is
+        "normal" (not ignored), "all" (-x) or "ignored" (-X); without
+        directories, untracked directories are left alone as clean does.
+        """
+        tracked = {entry.path for entry in self.index().entries}
+        tracked_dirs = {""}
+        for path in tracked:
+            while "/" in path:
+                path = path.rpartition("/")[0]
+                if path in tracked_dirs:
+                    break
+                tracked_dirs.add(path)
+        command_line = [("", parse_ignore(excludes))]
+        found = []
+        pending = [("", [("", parse_ignore(_read_lines(_excludes_file(self.config)))),
+                         ("", parse_ignore(_read_lines(os.path.join(self.common_dir, "info", "exclude"))))],
+                    False)]
+        while pending and len(found) <= MAX_NAMED_PATHS:
+            rel, sources, parent_ignored = pending.pop()
+            directory = os.path.join(self.root, rel)
+            sources = sources + [(rel, parse_ignore(_read_lines(os.path.join(directory, ".gitignore"))))]
+            try:
+                with os.scandir(directory) as it:
+                    children = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            for entry in children:
+                self.budget.check("untracked files")
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.name == ".git" or child in tracked:
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not _under(child, prefixes) and not (
+                        is_dir and any(prefix.startswith(child + "/") for prefix in prefixes)):
+                    continue
+                is_ignored = parent_ignored or ignored(child, is_dir, sources + command_line)
+                if is_dir:
+                    # clean leaves untracked directories alone without -d, and nested repositories always
+                    if child in tracked_dirs or (directories and not (is_ignored and mode == "normal")
+                                                 and not os.path.exists(os.path.join(entry.path, ".git"))):
+                        pending.append((child, sources, is_ignored))
+                elif mode == "all" or (mode == "ignored") == is_ignored:
+                    found.append(child)
+        return found
+
+
+def _truncate(stat_ns: int, entry_ns: int) -> int:
+    """A filesystem timestamp as the index stores it (seconds only if it has no nanoseconds)."""
+    seconds = (stat_ns // 10**9) & 0xFFFFFFFF
+    return seconds * 10**9 + (stat_ns % 10**9 if entry_ns % 10**9 else 0)
+
+
+def _under(path: str, prefixes: list[str] | None) -> bool:
+    return prefixes is None or any(not prefix or path == prefix or path.startswith(prefix + "/")
+                                   for prefix in prefixes)
+
+
+def _excludes_file(config: str) -> str:
+    configured = _git_config_value(config, "core", "excludesfile")
+    if configured:
+        return os.path.expanduser(configured)
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "git", "ignore")
+
+
+def _pack_offset(idx_path: str, oid: bytes, hash_size: int) -> int | None:
+    """Offset of an object in a version 2 pack index, or None."""
+    with open(idx_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:4] != PACK_IDX_SIGNATURE or struct.unpack_from(">I", data, 4)[0] != 2:
+            return None
+        fanout = 8
+        lo = struct.unpack_from(">I", data, fanout + 4 * (oid[0] - 1))[0] if oid[0] else 0
+        hi = struct.unpack_from(">I", data, fanout + 4 * oid[0])[0]
+        count = struct.unpack_from(">I", data, fanout + 4 * 255)[0]
+        names = fanout + 256 * 4
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if data[names + mid * hash_size:names + (mid + 1) * hash_size] < oid:
+                lo = mid + 1
+            else:
+                hi = mid
+        if data[names + lo * hash_size:names + (lo + 1) * hash_size] != oid:
+            return None
+        i = lo
+        offsets = names + count * (hash_size + 4)
+        (offset,) = struct.unpack_from(">I", data, offsets + 4 * i)
+        if offset & 0x80000000:
+            (offset,) = struct.unpack_from(">Q", data, offsets + 4 * count + 8 * (offset & 0x7FFFFFFF))
+        return offset
+
+
+def _packed_commit(pack_path: str, offset: int) -> bytes | None:
+    """Inflate an undeltified commit at offset in a pack, else None."""
+    with open(pack_path, "rb") as f:
+        f.seek(offset)
+        header = f.read(16)
+        kind = (header[0] >> 4) & 7
+        size, shift, pos = header[0] & 0x0F, 4, 0
+        while header[pos] & 0x80:
+            pos += 1
+            size |= (header[pos] & 0x7F) << shift
+            shift += 7
+        if kind != PACK_COMMIT:
+            return None
+        f.seek(offset + pos + 1)
+        inflater = zlib.decompressobj()
+        body = b""
+        while len(body) < size:
+            chunk = f.read(65536)
+            if not chunk:
+                return None
+            body += inflater.decompress(chunk, size - len(body))
+        return body
+
+
+# =============================================================================
+# Commands
+# =============================================================================
+
+class Operation(NamedTuple):
+    """A git segment that can discard work, and what it needs checked."""
+    kind: str                   # "reset", "checkout", "restore", "clean" or "stash"
+    directory: str | None       # where git runs; None if unknown
+    paths: list[str] | None     # pathspecs; None for the whole worktree
+    staged: bool                # also overwrites the index
+    options: dict
+
+
+def _pathspecs(operands: list[str]) -> list[str] | None:
+    return None if not operands or any(PATHSPEC_MAGIC.search(p) for p in operands) else operands
+
+
+def parse_operation(argv: tuple[str, ...], directory: str | None) -> Operation | None:
+    """The discarding git operation a segment runs, or None."""
+    if not argv or argv[0] != "git":
+        return None
+    args = list(argv[1:])
+    while args and args[0].startswith("-"):
+        name, eq, value = args.pop(0).partition("=")
+        if name in GIT_GLOBAL_OPTIONS_WITH_VALUE and not eq:
+            value = args.pop(0) if args else ""
+        if name in ("-C", "--work-tree"):
+            directory = None if directory is None or "$" in value else \
+                os.path.normpath(os.path.join(directory, os.path.expanduser(value)))
+        elif name == "--git-dir":
+            directory = None
+    if not args:
+        return None
+    subcommand, rest = args[0], args[1:]
+    if subcommand == "reset" and "--hard" in rest:
+        # A commit other than HEAD also moves the branch, dropping the commits after it
+        targets = [arg for arg in rest if not arg.startswith("-") and arg not in HEAD_NAMES]
+        return Operation("reset", directory, None, True, {"target": targets[0] if targets else ""})
+    if subcommand == "checkout" and "--" in rest:
+        split = rest.index("--")
+        tree_ish = [arg for arg in rest[:split] if not arg.startswith("-")]
+        return Operation("checkout", directory, _pathspecs(rest[split + 1:]), bool(tree_ish), {})
+    if subcommand == "restore":
+        staged, worktree, operands, i = False, False, [], 0
+        while i < len(rest):
+            name = rest[i].partition("=")[0]
+            if name == "--pathspec-from-file":
+                return Operation("restore", directory, None, True, {})
+            if name in RESTORE_OPTIONS_WITH_VALUE and "=" not in rest[i]:
+                i += 1
+            elif rest[i] == "--":
+                operands.extend(rest[i + 1:])
+                break
+            elif name == "--staged":
+                staged = True
+            elif name == "--worktree":
+                worktree = True
+            elif name.startswith("-") and not name.startswith("--"):
+                staged = staged or "S" in name
+                worktree = worktree or "W" in name
+            elif not name.startswith("-"):
+                operands.append(rest[i])
+            i += 1
+        if staged and not worktree:
+            return None  # the worktree is untouched, staged content stays in the object store
+        return Operation("restore", directory, _pathspecs(operands), staged, {})
+    if subcommand == "clean":
+        flags, operands, excludes, i = set(), [], [], 0
+        while i < len(rest):
+            name, eq, value = rest[i].partition("=")
+            if name in CLEAN_OPTIONS_WITH_VALUE:
+                if not eq:
+                    value = rest[i + 1] if i + 1 < len(rest) else ""
+                    i += 1
+                excludes.append(value)
+            elif rest[i] == "--":
+                operands.extend(rest[i + 1:])
+                break
+            elif name.startswith("--"):
+                flags.add(name)
+            elif name.startswith("-"):
+                flags.update(f"-{c}" for c in name[1:])
+            else:
+                operands.append(rest[i])
+            i += 1
+        if "-n" in flags or "--dry-run" in flags or not ({"-f", "--force"} & flags):
+            return None
+        mode = "all" if "-x" in flags else "ignored" if "-X" in flags else "normal"
+        return Operation("clean", directory, _pathspecs(operands), False,
+                         {"directories": "-d" in flags, "mode": mode, "excludes": excludes})
+    if subcommand == "stash" and rest[:1] in (["drop"], ["clear"]):
+        return Operation("stash", directory, None, False, {})
+    return None
+
+
+def _repo_paths(worktree: Worktree, directory: str, paths: list[str] | None) -> list[str] | None:
+    """Pathspecs relative to the worktree root."""
+    if paths is None:
+        return None
+    resolved = []
+    for path in paths:
+        rel = os.path.relpath(os.path.normpath(os.path.join(directory, path)), worktree.root)
+        if rel.startswith(".."):
+            return None
+        resolved.append("" if rel == "." else rel)
+    return resolved
+
+
+def _describe(paths: list[str], what: str) -> str:
+    named = ", ".join(paths[:MAX_NAMED_PATHS])
+    return f"{what} {named}" + (" and more" if len(paths) > MAX_NAMED_PATHS else "")
+
+
+def at_risk(operation: Operation, budget: Deadline) -> str | None:
+    """
+    What the operation would discard ("" if nothing), or None if it
+    can't be told.
+    """
+    if operation.directory is None:
+        return None
+    worktree = Worktree.find(operation.directory, budget)
+    if worktree is None:
+        return ""  # git fails outside a repository
+    if operation.kind == "stash":
+        return "existing stash entries" if worktree.has_stash() else ""
+    paths = _repo_paths(worktree, operation.directory, operation.paths)
+    if operation.kind == "clean":
+        untracked = worktree.untracked(paths, operation.options["directories"], operation.options["mode"],
+                                       operation.options["excludes"])
+        return _describe(untracked, "untracked") if untracked else ""
+    modified = worktree.modified(paths)
+    if modified:
+        return _describe(modified, "modified")
+    if operation.staged and worktree.staged():
+        return "staged changes"
+    if operation.options.get("target"):
+        return f"moves the branch to {operation.options['target']}, commits after it may be lost"
+    return ""
+
+
+def check_command(command: str, verdict: Verdict, cwd: str = "", deadline: Deadline = NO_DEADLINE,
+                  config: dict | None = None) -> Verdict:
+    """
+    Keep verdict (a destructive git rule's ask) if any discarding git
+    operation in the command would lose work, or if that can't be told
+    within the budget; otherwise allow.
+    Returns: Verdict
+    """
+    config = config or get_worktree_config()
+    if not config["enabled"]:
+        return verdict
+    directory = os.path.abspath(cwd) if cwd else None
+    operations = []
+    for segment in parse_command(command):
+        if segment.argv[:1] in (("cd",), ("pushd",)):
+            operands = [arg for arg in segment.argv[1:] if not arg.startswith("-")]
+            target = os.path.expanduser(operands[0] if operands else "~")
+            directory = None if directory is None or "$" in target else os.path.normpath(
+                os.path.join(directory, target))
+            continue
+        operation = parse_operation(segment.argv, directory)
+        if operation:
+            operations.append(operation)
+    if not operations:
+        return verdict  # the rule matched something this parser doesn't follow
+
+    deadline.check("worktree state")
+    budget = Deadline(min(config["max_seconds"], deadline.remaining()), started=time.monotonic())
+    for operation in operations:
+        try:
+            risk = at_risk(operation, budget)
+        except DeadlineExceeded:
+            return Verdict(verdict.decision, f"{verdict.message} (worktree not checked within "
+                                             f"{budget.seconds:g}s)", verdict.rule_id)
+        except (OSError, ValueError, IndexError, struct.error, zlib.error):
+            risk = None
+        if risk is None or risk:
+            return Verdict(verdict.decision, f"{verdict.message}: {risk}" if risk else verdict.message,
+                           verdict.rule_id)
+    return ALLOW
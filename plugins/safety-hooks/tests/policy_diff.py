@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Offline policy diff for safety hooks.
+
+Evaluates a corpus of tool calls against two policy versions and reports
+every call whose decision changes, grouped by hook, transition and rule.
+A version is a hooks directory or a git revision, optionally with another
+config.json swapped in:
+
+  python3 tests/policy_diff.py --old HEAD corpus.jsonl
+  python3 tests/policy_diff.py --old hooks --new-config /tmp/config.json commands.txt
+
+Corpus files hold one tool call per line, either hook input JSON
+({"tool_name": "Bash", "tool_input": {...}}) or a plain Bash command.
+Identical calls are evaluated once. Each version runs in its own pool of
+spawned worker processes, which import that version's policy engine (or,
+for older versions, its hook scripts) once and share its compiled policy
+table; both pools work through the corpus in parallel.
+"""
+import argparse
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+HOOKS_DIR = Path(__file__).resolve().parent.parent / "hooks"
+
+# Hooks registered per tool in hooks.json, in the order they run
+TOOL_HOOKS = {
+    "Bash": ("bash-safety-hook.py", "git-branch-protection-hook.py"),
+    "Write": ("file-safety-hook.py",),
+    "Edit": ("file-safety-hook.py",),
+    "Read": ("read-safety-hook.py",),
+    "Grep": ("read-safety-hook.py",),
+    "Glob": ("read-safety-hook.py",),
+    "WebFetch": ("egress-safety-hook.py",),
+}
+
+# Hook script -> policy name in safety_hooks.engine
+HOOK_POLICIES = {
+    "bash-safety-hook.py": "bash",
+    "git-branch-protection-hook.py": "git",
+    "file-safety-hook.py": "file",
+    "read-safety-hook.py": "read",
+    "egress-safety-hook.py": "egress",
+}
+
+# Package holding a version's policy engine, if it has one
+POLICY_PACKAGE = "safety_hooks"
+
+# Input field a reader recognizes a call by
+SUBJECT_FIELDS = {"Bash": "command", "Write": "file_path", "Edit": "file_path",
+                  "Read": "file_path", "Grep": "path", "Glob": "pattern", "WebFetch": "url"}
+
+# Unique calls per task sent to a worker
+CHUNK_SIZE = 2000
+
+
+class Change(NamedTuple):
+    """A tool call whose decision differs between the two versions."""
+    hook: str
+    old: tuple[str, str]
+    new: tuple[str, str]
+    tool_name: str
+    subject: str
+    count: int
+
+
+# =============================================================================
+# Versions
+# =============================================================================
+
+def materialize(version: str, config: str | None, dest: Path) -> Path:
+    """
+    Copy a version's hooks directory to dest: either an existing directory
+    or the hooks directory at a git revision. Returns the hooks path.
+    """
+    hooks = dest / "hooks"
+    if Path(version).is_dir():
+        shutil.copytree(version, hooks, ignore=shutil.ignore_patterns("__pycache__"))
+    else:
+        # Run from the hooks directory, git archives just that subtree
+        archive = subprocess.run(["git", "archive", "--format=tar", version, "--", "."],
+                                 cwd=HOOKS_DIR, capture_output=True, check=True).stdout
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            if hasattr(tarfile, "data_filter"):
+                # Rejects absolute paths, links out of hooks and special files
+                tar.extractall(hooks, filter="data")
+            else:
+                tar.extractall(hooks)
+    if config:
+        shutil.copyfile(config, hooks / "config.json")
+    return hooks
+
+
+# =============================================================================
+# Corpus
+# =============================================================================
+
+def parse_call(line: str) -> tuple[str, dict] | None:
+    """Parse one corpus line into (tool_name, tool_input), or None to skip it."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        tool_input = data.get("tool_input")
+        if data.get("tool_name") not in TOOL_HOOKS or not isinstance(tool_input, dict):
+            return None
+        return data["tool_name"], tool_input
+    return "Bash", {"command": line}
+
+
+def load_corpus(paths: list[str]) -> tuple[list[tuple[str, dict]], list[int]]:
+    """Read corpus files and deduplicate calls. Returns (calls, occurrence counts)."""
+    index = {}
+    calls = []
+    counts = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                call = parse_call(line)
+                if call is None:
+                    continue
+                key = (call[0], json.dumps(call[1], sort_keys=True))
+                if key in index:
+                    counts[index[key]] += 1
+                else:
+                    index[key] = len(calls)
+                    calls.append(call)
+                    counts.append(1)
+    return calls, counts
+
+
+def call_subject(tool_name: str, tool_input: dict) -> str:
+    """The part of a call a reader recognizes it by: command, path or pattern."""
+    return str(tool_input.get(SUBJECT_FIELDS[tool_name], ""))
+
+
+# =============================================================================
+# Workers
+# =============================================================================
+
+_modules = {}
+
+
+def _load_hook(hooks_dir: str, hook_name: str):
+    """Import a hook script as a module, without running its main()."""
+    name = hook_name.removesuffix(".py").replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(hooks_dir, hook_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _init_worker(hooks_dir: str, branch: str | None) -> None:
+    """
+    Import one version's hooks in a fresh worker process: its policy engine,
+    or for versions that predate it, the hook scripts themselves.
+    """
+    # Spawned workers re-import the parent's __main__, which may already
+    # have imported shared modules (hook_utils, ...) of another version
+    for path in Path(hooks_dir).glob("*.py"):
+        sys.modules.pop(path.stem, None)
+    for name in [name for name in sys.modules if name.split(".")[0] == POLICY_PACKAGE]:
+        del sys.modules[name]
+    sys.path.insert(0, hooks_dir)
+
+    if (Path(hooks_dir) / POLICY_PACKAGE / "engine.py").exists():
+        _modules["engine"] = importlib.import_module(f"{POLICY_PACKAGE}.engine")
+        git = importlib.import_module(f"{POLICY_PACKAGE}.git_policy")
+    else:
+        for hook_name in {name for names in TOOL_HOOKS.values() for name in names}:
+            if (Path(hooks_dir) / hook_name).exists():
+                _modules[hook_name] = _load_hook(hooks_dir, hook_name)
+        git = _modules["git-branch-protection-hook.py"]
+    if branch is not None:
+        git.get_current_branch = lambda *args, **kwargs: branch
+    else:
+        # The branch can't change during a diff; ask git once per worker
+        git.get_current_branch = lru_cache(maxsize=1)(git.get_current_branch)
+
+
+def evaluate(hook_name: str, tool_name: str, tool_input: dict) -> tuple[str, str]:
+    """Evaluate one call with one hook's policy in this worker's version."""
+    if "engine" in _modules:
+        if HOOK_POLICIES[hook_name] not in _modules["engine"].POLICIES:
+            return "allow", ""
+        return tuple(_modules["engine"].check(HOOK_POLICIES[hook_name], tool_name, tool_input)[:2])
+    if hook_name not in _modules:
+        return "allow", ""
+    return _evaluate_legacy(hook_name, _modules[hook_name], tool_name, tool_input)
+
+
+def _evaluate_legacy(hook_name: str, module, tool_name: str, tool_input: dict) -> tuple[str, str]:
+    """Evaluate one call with a hook script module, mirroring the hook's main()."""
+    if hook_name == "read-safety-hook.py":
+        return module.check_read(tool_name, tool_input)
+    if hook_name == "file-safety-hook.py":
+        file_path = tool_input.get("file_path", "")
+        if not file_path:
+            return "allow", ""
+        result = module.check_path(file_path)
+        content = tool_input.get("content" if tool_name == "Write" else "new_string", "")
+        if result[0] == "allow" and content and isinstance(content, str) and hasattr(module, "check_content"):
+            scan_config = module.get_scan_config()
+            if scan_config["enabled"]:
+                result = module.check_content(content, scan_config)
+        return result
+    command = tool_input.get("command", "")
+    if not command:
+        return "allow", ""
+    return module.check_command(command)
+
+
+def _evaluate_chunk(chunk: list[tuple[str, dict]]) -> list[tuple[tuple[str, str], ...]]:
+    """Evaluate calls with every hook registered for their tool."""
+    results = []
+    for tool_name, tool_input in chunk:
+        decisions = []
+        for hook_name in TOOL_HOOKS[tool_name]:
+            try:
+                decisions.append(tuple(evaluate(hook_name, tool_name, tool_input)))
+            except Exception as e:  # a crash is a decision change worth reporting
+                decisions.append(("error", f"{type(e).__name__}: {e}"))
+        results.append(tuple(decisions))
+    return results
+
+
+# =============================================================================
+# Diff
+# =============================================================================
+
+def diff_policies(old_dir: Path, new_dir: Path, calls: list[tuple[str, dict]], counts: list[int],
+                  workers: int | None = None, branch: str | None = None,
+                  chunk_size: int = CHUNK_SIZE) -> list[Change]:
+    """Evaluate calls under both versions in parallel and return every change."""
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+    chunks = [calls[i:i + chunk_size] for i in range(0, len(calls), chunk_size)]
+    context = multiprocessing.get_context("spawn")
+    changes = []
+    with context.Pool(workers, _init_worker, (str(old_dir), branch)) as old_pool, \
+            context.Pool(workers, _init_worker, (str(new_dir), branch)) as new_pool:
+        old_results = old_pool.imap(_evaluate_chunk, chunks)
+        new_results = new_pool.imap(_evaluate_chunk, chunks)
+        position = 0
+        for old_chunk, new_chunk in zip(old_results, new_results):
+            for old_decisions, new_decisions in zip(old_chunk, new_chunk):
+                tool_name, tool_input = calls[position]
+                for hook_name, old, new in zip(TOOL_HOOKS[tool_name], old_decisions, new_decisions):
+                    if old[0] != new[0]:
+                        changes.append(Change(hook_name, old, new, tool_name,
+                                              call_subject(tool_name, tool_input), counts[position]))
+                position += 1
+    return changes
+
+
+def group_changes(changes: list[Change]) -> dict[tuple[str, str, str, str], list[Change]]:
+    """
+    Group changes by (hook, old decision, new decision, rule), where the rule
+    is the reason of whichever side didn't allow. Largest groups first.
+    """
+    groups = {}
+    for change in changes:
+        rule = change.new[1] if change.new[0] != "allow" else change.old[1]
+        groups.setdefault((change.hook, change.old[0], change.new[0], rule), []).append(change)
+    return dict(sorted(groups.items(), key=lambda item: -sum(c.count for c in item[1])))
+
+
+def format_report(changes: list[Change], unique: int, total: int) -> str:
+    """Render grouped changes as plain text."""
+    changed = sum(change.count for change in changes)
+    lines = [f"{total} calls ({unique} unique): {changed} decision changes in {len(changes)} unique calls"]
+    for (hook, old, new, rule), group in group_changes(changes).items():
+        lines.append("")
+        lines.append(f"{hook}: {old} -> {new}  [{rule or 'no rule'}]  ({sum(c.count for c in group)} calls)")
+        for change in sorted(group, key=lambda c: -c.count):
+            lines.append(f"  {change.count:>6}  {change.subject}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report tool calls whose decision changes between two policy versions.")
+    parser.add_argument("corpus", nargs="+", help="corpus files: hook input JSONL or one Bash command per line")
+    parser.add_argument("--old", required=True, help="old version: hooks directory or git revision")
+    parser.add_argument("--new", default=str(HOOKS_DIR), help="new version (default: working tree hooks)")
+    parser.add_argument("--old-config", help="config.json to use with the old version")
+    parser.add_argument("--new-config", help="config.json to use with the new version")
+    parser.add_argument("--workers", type=int, help="worker processes per version (default: half the CPUs)")
+    parser.add_argument("--branch", help="current git branch to assume (default: ask git once)")
+    parser.add_argument("--json", action="store_true", help="print changes as JSON lines")
+    args = parser.parse_args()
+
+    calls, counts = load_corpus(args.corpus)
+    with tempfile.TemporaryDirectory(prefix="safety-hooks-diff-") as tmp:
+        tmp = Path(tmp)
+        # Compiled tables for both versions live and die with this run
+        os.environ["SAFETY_HOOKS_CACHE_DIR"] = str(tmp / "cache")
+        old_dir = materialize(args.old, args.old_config, tmp / "old")
+        new_dir = materialize(args.new, args.new_config, tmp / "new")
+        changes = diff_policies(old_dir, new_dir, calls, counts, args.workers, args.branch)
+
+    if args.json:
+        for change in changes:
+            print(json.dumps(change._asdict()))
+    else:
+        print(format_report(changes, len(calls), sum(counts)))
+    sys.exit(1 if changes else 0)
+
+
+if __name__ == "__main__":
+    main()